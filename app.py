@@ -1,30 +1,87 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session
+from flask import Flask, render_template, jsonify, request, redirect, url_for, session, g, Response, send_from_directory
 from functools import wraps
-from database import QuizDatabase
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from werkzeug.exceptions import HTTPException
+from datetime import date
+from database import QuizDatabase, SessionSweeper
+from metrics import metrics, env_flag
+from session_tokens import StatelessSessionTokens, INSECURE_DEFAULT_SECRET, signing_secret
+from response_encoding import CompactJSONProvider, ResponseCompressor
+from quiz_packs import QuizPacks
+from generation_pool import GenerationPool, GenerationQueueFull
+from app_logging import configure_logging
+import hashlib
+import hmac
+import logging
+import os
 import sqlite3
+import threading
+import time
 
-try:
-    from question_generators import QuestionGenerator
-    print("✅ QuestionGenerator נטען בהצלחה!")
-except ImportError as e:
-    print(f"❌ שגיאה בייבוא QuestionGenerator: {e}")
-    exit(1)
+configure_logging()
+logger = logging.getLogger(__name__)
+
+from question_generators import QuestionGenerator
 
 app = Flask(__name__)
-app.secret_key = 'your-secret-key-change-this-in-production'
+app.secret_key = INSECURE_DEFAULT_SECRET
+app.json = CompactJSONProvider(app)
 
-try:
-    question_gen = QuestionGenerator()
-    print("✅ QuestionGenerator אותחל בהצלחה!")
-    
-    db = QuizDatabase()
-    print("✅ מסד נתונים אותחל בהצלחה!")
-except Exception as e:
-    print(f"❌ שגיאה באתחול: {e}")
-    exit(1)
+# השירותים נבנים ב-create_app() ולא בייבוא - כך wsgi.py יכול לבנות אותם פעם אחת לפני fork
+question_gen = None
+db = None
+generation_pool = None
+session_sweeper = None
+session_tokens = None
+quiz_packs = None
+duplicate_preventer = None
+smart_quiz = None
+
+# === מדדים (Prometheus) ===
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    if metrics.enabled and 'request_start' in g:
+        metrics.observe('calcmaster_http_request_seconds', time.perf_counter() - g.request_start,
+                        endpoint=request.endpoint or 'unknown', method=request.method,
+                        status=str(response.status_code))
+    return response
+
+# בלי טוקן /metrics נגיש רק מהשרת עצמו (scraper מקומי או דרך reverse proxy שמוסיף את הטוקן)
+METRICS_TOKEN = os.environ.get('CALCMASTER_METRICS_TOKEN')
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+def metrics_authorized():
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode())
+    return request.remote_addr in LOCAL_ADDRESSES
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if not metrics.enabled:
+        return jsonify({"error": "מדדים כבויים (CALCMASTER_METRICS=1)"}), 404
+    if not metrics_authorized():
+        return jsonify({"error": "אין הרשאה למדדים (CALCMASTER_METRICS_TOKEN)"}), 403
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# נרשם אחרי מדידת ה-latency כדי שזמן הדחיסה ייכלל בה
+response_compressor = ResponseCompressor(app)
 
 # === Decorators (MUST BE FIRST) ===
 
+def resolve_session_user(session_token):
+    if session_tokens:
+        return session_tokens.load(session_token)
+    return db.get_user_by_session(session_token)
+
 def login_required(f):
     """דקורטור שדורש התחברות"""
     @wraps(f)
@@ -33,7 +90,7 @@ def login_required(f):
         if not session_token:
             return redirect(url_for('login'))
         
-        user = db.get_user_by_session(session_token)
+        user = resolve_session_user(session_token)
         if not user:
             session.clear()
             return redirect(url_for('login'))
@@ -45,7 +102,7 @@ def login_required(f):
 def get_current_user():
     session_token = session.get('session_token')
     if session_token:
-        return db.get_user_by_session(session_token)
+        return resolve_session_user(session_token)
     return None
 
 # === מערכת כפילויות פשוטה ===
@@ -56,7 +113,7 @@ class SimpleDuplicationPreventer:
     def __init__(self, db):
         self.db = db
         self.session_questions = {}
-        print("✅ מערכת כפילויות פשוטה הוכנה")
+        logger.info("✅ מערכת כפילויות פשוטה הוכנה")
     
     def is_duplicate_in_session(self, user_id, question_text):
         if user_id not in self.session_questions:
@@ -64,54 +121,56 @@ class SimpleDuplicationPreventer:
         
         # בדוק שהטקסט לא ריק
         if not question_text or not isinstance(question_text, str):
-            print(f"⚠️ טקסט שאלה לא תקין: {question_text}")
+            logger.warning("⚠️ טקסט שאלה לא תקין: %s", question_text)
             return True  # נחשב ככפילות כדי לא לכלול
         
         clean_text = question_text.lower().replace(" ", "").replace("\\", "")
         
         if clean_text in self.session_questions[user_id]:
-            print(f"🔄 כפילות: {question_text[:30]}...")
+            logger.debug("🔄 כפילות: %s...", question_text[:30])
             return True
         
         self.session_questions[user_id].add(clean_text)
         return False
     
     def filter_session_duplicates(self, questions, user_id):
+        with metrics.timer('calcmaster_generation_stage_seconds', generator='app', stage='dedup'):
+            return self._filter_session_duplicates(questions, user_id)
+    
+    def _filter_session_duplicates(self, questions, user_id):
         unique_questions = []
         
         for question in questions:
             # בדוק שהשאלה לא ריקה ושהיא dictionary
             if not question or not isinstance(question, dict):
-                print(f"⚠️ שאלה לא תקינה: {question}")
+                logger.warning("⚠️ שאלה לא תקינה: %s", question)
                 continue
                 
             question_text = question.get('question', '')
             if not question_text:
-                print(f"⚠️ שאלה ללא טקסט: {question}")
+                logger.warning("⚠️ שאלה ללא טקסט: %s", question)
                 continue
                 
             if not self.is_duplicate_in_session(user_id, question_text):
                 unique_questions.append(question)
         
-        print(f"📝 מתוך {len(questions)} שאלות, {len(unique_questions)} ייחודיות")
+        logger.debug("📝 מתוך %s שאלות, %s ייחודיות", len(questions), len(unique_questions))
         return unique_questions
     
     def clear_session(self, user_id):
         if user_id in self.session_questions:
             del self.session_questions[user_id]
-        print(f"🔄 Session נוקה למשתמש {user_id}")
-
-duplicate_preventer = SimpleDuplicationPreventer(db)
+        logger.debug("🔄 Session נוקה למשתמש %s", user_id)
 
 # === הוסיפי את זה ל-app.py אחרי השורה: duplicate_preventer = QuestionDuplicationPreventer(db) ===
 
 class SimplePersonalizedQuiz:
     """מחולל מבחנים אישיים פשוט"""
     
-    def __init__(self, db, question_gen):
+    def __init__(self, db, generation_pool):
         self.db = db
-        self.question_gen = question_gen
-        print("✅ מחולל מבחנים אישיים מוכן")
+        self.generation_pool = generation_pool
+        logger.info("✅ מחולל מבחנים אישיים מוכן")
     
     def get_user_weak_topic(self, user_id):
         """מצא את הנושא הכי חלש של המשתמש"""
@@ -149,7 +208,7 @@ class SimplePersonalizedQuiz:
                 }
                 
         except Exception as e:
-            print(f"❌ שגיאה בניתוח: {e}")
+            logger.error("❌ שגיאה בניתוח: %s", e)
             return {'topic': 'derivatives', 'avg_score': 0, 'attempts': 0, 'needs_work': True}
     
     def generate_smart_quiz(self, user_id):
@@ -191,29 +250,265 @@ class SimplePersonalizedQuiz:
     def _get_topic_questions(self, topic, count):
         """קבל שאלות לנושא ספציפי"""
         try:
-            if topic == 'derivatives':
-                return self.question_gen.generate_derivative_questions(count)
-            elif topic == 'integrals':
-                return self.question_gen.generate_integral_questions(count)
-            elif topic == 'limits':
-                return self.question_gen.generate_limit_questions(count)
-            elif topic == 'criticalpoints':
-                return self.question_gen.generate_critical_points_questions(count)
-            else:
-                return self.question_gen.generate_mixed_questions(count)
+            return self.generation_pool.generate(topic, 'basic', count)
+        except GenerationQueueFull:
+            raise
         except:
             # fallback
-            return self.question_gen.generate_mixed_questions(count)
+            return self.generation_pool.generate('general', 'mixed', count)
     
     def _get_mixed_questions(self, count):
         """קבל שאלות מעורבות"""
         try:
-            return self.question_gen.generate_mixed_questions(count)
+            return self.generation_pool.generate('general', 'mixed', count)
+        except GenerationQueueFull:
+            raise
         except:
             # fallback פשוט
-            return self.question_gen.generate_derivative_questions(count)
+            return self.generation_pool.generate('derivatives', 'basic', count)
+
+# === Cache לסטטיסטיקות לפי גרסת תוצאות ===
+
+class StatsResponseCache:
+    """cache בצד השרת לתשובות הסטטיסטיקה של כל משתמש, תקף כל עוד גרסת התוצאות לא השתנתה"""
+    
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, user_id, key, version):
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end((user_id, key))
+            return entry[1]
+    
+    def put(self, user_id, key, version, body):
+        with self._lock:
+            self._entries[(user_id, key)] = (version, body)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id):
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[cache_key]
+
+stats_cache = StatsResponseCache()
+
+def versioned_stats(daily=False):
+    """ETag חזק + 304 + cache בצד השרת, לפי גרסת התוצאות של המשתמש (result_version)"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_id = request.current_user['id']
+            version = db.get_user_result_version(user_id)
+            key = request.full_path
+            if daily:
+                # חלון "X הימים האחרונים" זז גם בלי מבחנים חדשים
+                key += f"#{date.today().isoformat()}"
+            etag = hashlib.sha1(f"{user_id}:{version}:{key}".encode('utf-8')).hexdigest()
+            
+            if request.if_none_match.contains_weak(etag):
+                metrics.cache_hit('stats.etag')
+                response = Response(status=304)
+            else:
+                body = stats_cache.get(user_id, key, version)
+                if body is not None:
+                    metrics.cache_hit('stats.response')
+                    response = Response(body, mimetype='application/json')
+                else:
+                    metrics.cache_miss('stats.response')
+                    response = app.make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    stats_cache.put(user_id, key, version, response.get_data())
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+# === הסברים בטעינה עצלה ===
 
-smart_quiz = SimplePersonalizedQuiz(db, question_gen)
+def explanation_key(text):
+    """מזהה ההסבר לפי hash של התוכן - אותו הסבר נשמר פעם אחת"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+LAZY_EXPLANATIONS = env_flag('CALCMASTER_LAZY_EXPLANATIONS')
+
+def questions_payload(questions):
+    """עם ?explanations=lazy (או CALCMASTER_LAZY_EXPLANATIONS) ההסבר מוחלף ב-explanation_id
+    
+    ההסברים נשמרים במסד הנתונים, כך שכל worker יכול להגיש אותם.
+    """
+    mode = request.args.get('explanations', 'lazy' if LAZY_EXPLANATIONS else 'inline')
+    if mode != 'lazy':
+        return questions
+    
+    payload, explanations = [], {}
+    for question in questions:
+        question = dict(question)
+        explanation = question.pop('explanation', None)
+        if explanation:
+            question['explanation_id'] = explanation_key(explanation)
+            explanations[question['explanation_id']] = explanation
+        payload.append(question)
+    
+    if explanations and not db.save_explanations(explanations):
+        # בלי שמירה ה-id לא יימצא - עדיף להחזיר את ההסברים עצמם
+        return questions
+    return payload
+
+@app.route('/api/questions/explanation/<explanation_id>')
+@login_required
+def get_question_explanation(explanation_id):
+    explanation = db.get_explanation(explanation_id)
+    if explanation is None:
+        return jsonify({"error": "ההסבר לא נמצא"}), 404
+    response = jsonify({"explanation": explanation})
+    # התוכן לא משתנה לאותו id, אבל הסברים ישנים נמחקים בניקוי - בלי immutable
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+# === הזמנת המבחן הבא מראש ===
+
+class QuizReservations:
+    """המבחן הבא של כל משתמש, שנוצר ברקע ומוגש מיד בבקשה הבאה לאותו מבחן
+    
+    הזמנה אחת לכל משתמש - הזמנה חדשה מחליפה (ומבטלת) את הקודמת. המפתח הוא
+    (endpoint, view_args) ולכן query string לא יוצר הזמנות נפרדות לאותו מבחן.
+    """
+    
+    def __init__(self, max_workers=2, ttl=600, max_pending=8):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._executor = None
+    
+    @staticmethod
+    def key(endpoint, view_args):
+        return endpoint, tuple(sorted((view_args or {}).items()))
+    
+    def _get_executor(self):
+        # נוצר בשימוש הראשון - כך שטעינה מוקדמת לפני fork לא יוצרת threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='quiz-reserve')
+            return self._executor
+    
+    def _drop_expired(self, now):
+        # future.cancel() עוצר יצירה שעוד לא התחילה; יצירה שכבר רצה מסתיימת ונזרקת
+        for user_id in [user_id for user_id, (_, expiry, _) in self._entries.items() if expiry <= now]:
+            self._entries.pop(user_id)[2].cancel()
+    
+    def reserve(self, user_id, key, generate):
+        """מתחיל ליצור ברקע; False אם כבר יש הזמנה בתוקף לאותו מבחן.
+        GenerationQueueFull כשיותר מ-max_pending הזמנות עוד ממתינות או רצות."""
+        executor = self._get_executor()
+        now = time.monotonic()
+        with self._lock:
+            self._drop_expired(now)
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == key:
+                return False
+            
+            previous = self._entries.pop(user_id, None)
+            if previous is not None:
+                previous[2].cancel()
+            if sum(not future.done() for _, _, future in self._entries.values()) >= self.max_pending:
+                raise GenerationQueueFull(f"{self.max_pending} quiz reservations pending")
+            self._entries[user_id] = (key, now + self.ttl, executor.submit(generate))
+        return True
+    
+    def take(self, user_id, key):
+        """השאלות השמורות (ממתין אם היצירה עוד רצה), או None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != key:
+                return None
+            del self._entries[user_id]
+        _, expiry, future = entry
+        if expiry <= time.monotonic():
+            future.cancel()
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning("⚠️ יצירת מבחן מוזמן נכשלה: %s", e)
+            return None
+    
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._entries.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+quiz_reservations = QuizReservations()
+
+def reservable_quiz(topic, difficulty=None, count=15):
+    """מבחן שאפשר להזמין מראש ב-/api/questions/reserve - difficulty=None לוקח אותו מהכתובת
+    
+    ברקע נוצרות רק השאלות הגולמיות (generation_pool), בלי Flask ובלי מצב המשתמש;
+    ניקוי הכפילויות והסינון רצים ב-view עצמו כשהבקשה הבאה מגיעה.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            questions = quiz_reservations.take(
+                request.current_user['id'], QuizReservations.key(request.endpoint, request.view_args))
+            if questions is not None:
+                metrics.cache_hit('quiz.reservation')
+                g.reserved_questions = questions
+            else:
+                metrics.cache_miss('quiz.reservation')
+            return f(*args, **kwargs)
+        # נשמר ב-__dict__ ולכן עובר גם דרך login_required
+        decorated_function.reservation = (topic, difficulty, count)
+        return decorated_function
+    return decorator
+
+def reserved_or_generate(topic, difficulty, count):
+    """השאלות שהוזמנו מראש לבקשה הזו, אחרת יצירה רגילה"""
+    questions = g.pop('reserved_questions', None)
+    if questions is not None:
+        return questions
+    return generation_pool.generate(topic, difficulty, count)
+
+@app.route('/api/questions/reserve', methods=['POST'])
+@login_required
+def reserve_next_quiz():
+    """קריאה זולה: השרת מתחיל ליצור את המבחן הבא ברקע ומחזיר 202 מיד"""
+    data = request.get_json(silent=True) or {}
+    parts = urlsplit(str(data.get('url', '')))
+    try:
+        endpoint, view_args = app.url_map.bind('localhost').match(parts.path, method='GET')
+    except HTTPException:
+        return jsonify({"success": False, "error": "כתובת מבחן לא תקינה"}), 400
+    
+    reservation = getattr(app.view_functions[endpoint], 'reservation', None)
+    if reservation is None:
+        return jsonify({"success": False, "error": "לא ניתן להזמין מבחן זה מראש"}), 400
+    
+    # רק השאלות הגולמיות ב-thread ברקע - בלי להיכנס ל-view ובלי לגעת במצב הכפילויות של המבחן הנוכחי
+    topic, difficulty, count = reservation
+    difficulty = difficulty or view_args['difficulty']
+    try:
+        reserved = quiz_reservations.reserve(
+            request.current_user['id'], QuizReservations.key(endpoint, view_args),
+            lambda: generation_pool.generate(topic, difficulty, count))
+    except GenerationQueueFull:
+        logger.warning("⚠️ יותר מדי מבחנים מוזמנים ממתינים - ההזמנה נדחתה")
+        return jsonify({"success": False, "error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
+    return jsonify({"success": True, "reserved": reserved}), 202
 
 
 @app.route('/api/questions/personalized')
@@ -222,12 +517,12 @@ def get_personalized_quiz():
     """מבחן אישי פשוט"""
     try:
         user_id = request.current_user['id']
-        print(f"🤖 יוצר מבחן אישי למשתמש {user_id}")
+        logger.info("🤖 יוצר מבחן אישי למשתמש %s", user_id)
         smart_quiz_data = smart_quiz.generate_smart_quiz(user_id)
         questions = smart_quiz_data.get('questions', [])
         if not questions:
-            print("❌ לא נוצרו שאלות - יוצר fallback")
-            questions = question_gen.generate_mixed_questions(10)
+            logger.error("❌ לא נוצרו שאלות - יוצר fallback")
+            questions = generation_pool.generate('general', 'mixed', 10)
         
         if hasattr(duplicate_preventer, 'filter_unique_questions'):
             try:
@@ -236,20 +531,20 @@ def get_personalized_quiz():
                     questions, user_id, 'personalized', 'mixed'
                 )
             except Exception as e:
-                print(f"⚠️ שגיאה בסינון כפילויות: {e}")
+                logger.warning("⚠️ שגיאה בסינון כפילויות: %s", e)
                 pass 
         
         questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         
         if len(questions) < 8:
-            print("⚡ יוצר שאלות נוספות...")
+            logger.info("⚡ יוצר שאלות נוספות...")
             try:
                 additional = smart_quiz._get_mixed_questions(10 - len(questions))
                 if additional:
                     additional = duplicate_preventer.filter_session_duplicates(additional, user_id)
                     questions.extend(additional)
             except Exception as e:
-                print(f"⚠️ שגיאה ביצירת שאלות נוספות: {e}")
+                logger.warning("⚠️ שגיאה ביצירת שאלות נוספות: %s", e)
         
         final_questions = questions[:10]
         
@@ -258,18 +553,18 @@ def get_personalized_quiz():
             if q and isinstance(q, dict) and q.get('question'):
                 valid_questions.append(q)
             else:
-                print(f"⚠️ שאלה לא תקינה הוסרה: {q}")
+                logger.warning("⚠️ שאלה לא תקינה הוסרה: %s", q)
         
         if len(valid_questions) < 5:
-            print("❌ לא מספיק שאלות תקינות - יוצר fallback בסיסי")
+            logger.error("❌ לא מספיק שאלות תקינות - יוצר fallback בסיסי")
             try:
-                fallback_questions = question_gen.generate_derivative_questions(10)
+                fallback_questions = generation_pool.generate('derivatives', 'basic', 10)
                 valid_questions = [q for q in fallback_questions if q and isinstance(q, dict) and q.get('question')][:10]
             except:
                 return jsonify({"error": "שגיאה ביצירת שאלות"}), 500
         
         result = {
-            'questions': valid_questions,
+            'questions': questions_payload(valid_questions),
             'quiz_info': {
                 'explanation': smart_quiz_data.get('explanation', 'מבחן מעורב כללי'),
                 'focus_topic': smart_quiz_data.get('focus_topic', 'general'),
@@ -278,16 +573,19 @@ def get_personalized_quiz():
             }
         }
         
-        print(f"✅ מבחן אישי מוכן: {len(valid_questions)} שאלות תקינות")
+        logger.info("✅ מבחן אישי מוכן: %s שאלות תקינות", len(valid_questions))
         return jsonify(result)
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה במבחן אישי: {str(e)}")
+        logger.error("❌ שגיאה במבחן אישי: %s", e)
         try:
-            fallback_questions = question_gen.generate_mixed_questions(10)
+            fallback_questions = generation_pool.generate('general', 'mixed', 10)
             valid_fallback = [q for q in fallback_questions if q and isinstance(q, dict) and q.get('question')][:10]
             return jsonify({
-                'questions': valid_fallback,
+                'questions': questions_payload(valid_fallback),
                 'quiz_info': {
                     'explanation': 'מבחן מעורב כללי',
                     'focus_topic': 'general',
@@ -296,7 +594,7 @@ def get_personalized_quiz():
                 }
             })
         except Exception as fallback_error:
-            print(f"❌ גם fallback נכשל: {fallback_error}")
+            logger.error("❌ גם fallback נכשל: %s", fallback_error)
             return jsonify({"error": f"שגיאה ביצירת מבחן: {str(e)}"}), 500
 
 @app.route('/api/personalized/analysis')
@@ -322,10 +620,17 @@ def get_simple_analysis():
         })
         
     except Exception as e:
-        print(f"❌ שגיאה בניתוח: {str(e)}")
+        logger.error("❌ שגיאה בניתוח: %s", e)
         return jsonify({"error": f"שגיאה בניתוח: {str(e)}"}), 500
 
 
+@app.route('/sw.js')
+def service_worker():
+    """ה-Service Worker מוגש מהשורש כדי שה-scope שלו יכסה את כל האתר"""
+    response = send_from_directory(app.static_folder, 'js/sw.js', mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/')
 def home():
     user = get_current_user()
@@ -368,7 +673,7 @@ def register():
 @app.route('/logout')
 def logout():
     session_token = session.get('session_token')
-    if session_token:
+    if session_token and not session_tokens:
         db.delete_session(session_token)
     session.clear()
     return redirect(url_for('home'))
@@ -397,11 +702,13 @@ def api_register():
         
         if result["success"]:
             return jsonify(result)
+        elif result.get("busy"):
+            return jsonify(result), 503
         else:
             return jsonify(result), 400
             
     except Exception as e:
-        print(f"❌ שגיאה בהרשמה: {str(e)}")
+        logger.error("❌ שגיאה בהרשמה: %s", e)
         return jsonify({"success": False, "error": "שגיאה בשרת"}), 500
 
 @app.route('/api/auth/login', methods=['POST'])
@@ -418,7 +725,10 @@ def api_login():
         
         if auth_result["success"]:
             user = auth_result["user"]
-            session_token = db.create_session(user["id"])
+            if session_tokens:
+                session_token = session_tokens.issue(user)
+            else:
+                session_token = db.create_session(user["id"])
             
             if session_token:
                 session['session_token'] = session_token
@@ -435,11 +745,13 @@ def api_login():
                 })
             else:
                 return jsonify({"success": False, "error": "שגיאה ביצירת session"}), 500
+        elif auth_result.get("busy"):
+            return jsonify(auth_result), 503
         else:
             return jsonify(auth_result), 401
             
     except Exception as e:
-        print(f"❌ שגיאה בהתחברות: {str(e)}")
+        logger.error("❌ שגיאה בהתחברות: %s", e)
         return jsonify({"success": False, "error": "שגיאה בשרת"}), 500
 
 @app.route('/api/auth/me')
@@ -453,24 +765,25 @@ def api_current_user():
 
 @app.route('/api/questions/derivatives/basic')
 @login_required
+@reservable_quiz('derivatives', 'basic')
 def get_derivative_basic_questions():
     try:
         user_id = request.current_user['id']
-        print(f"🚀 יוצר שאלות נגזרות למשתמש {user_id}")
+        logger.info("🚀 יוצר שאלות נגזרות למשתמש %s", user_id)
         
         duplicate_preventer.clear_session(user_id)
         
-        questions = question_gen.generate_derivative_questions(15)
+        questions = reserved_or_generate('derivatives', 'basic', 15)
         if not questions:
             return jsonify({"error": "לא ניתן ליצור שאלות"}), 500
             
-        print(f"📚 נוצרו {len(questions)} שאלות ראשוניות")
+        logger.info("📚 נוצרו %s שאלות ראשוניות", len(questions))
         
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         
         if len(unique_questions) < 8:
-            print("⚡ יוצר שאלות נוספות...")
-            more_questions = question_gen.generate_derivative_questions(20)
+            logger.info("⚡ יוצר שאלות נוספות...")
+            more_questions = generation_pool.generate('derivatives', 'basic', 20)
             if more_questions:
                 additional_unique = duplicate_preventer.filter_session_duplicates(more_questions, user_id)
                 unique_questions.extend(additional_unique)
@@ -479,213 +792,297 @@ def get_derivative_basic_questions():
         
         valid_questions = [q for q in final_questions if q and isinstance(q, dict) and q.get('question')]
         
-        print(f"✅ מחזיר {len(valid_questions)} שאלות נגזרות תקינות")
-        return jsonify(valid_questions)
+        logger.info("✅ מחזיר %s שאלות נגזרות תקינות", len(valid_questions))
+        return jsonify(questions_payload(valid_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         try:
-            fallback_questions = question_gen.generate_derivative_questions(10)
+            fallback_questions = generation_pool.generate('derivatives', 'basic', 10)
             valid_fallback = [q for q in fallback_questions if q and isinstance(q, dict) and q.get('question')][:10]
-            return jsonify(valid_fallback)
+            return jsonify(questions_payload(valid_fallback))
         except:
             return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 @app.route('/api/questions/derivatives/<difficulty>')
 @login_required
+@reservable_quiz('derivatives')
 def get_derivative_questions_by_difficulty(difficulty):
     try:
         user_id = request.current_user['id']
-        print(f"🚀 יוצר שאלות נגזרות {difficulty}")
+        logger.info("🚀 יוצר שאלות נגזרות %s", difficulty)
         
         duplicate_preventer.clear_session(user_id)
         
-        if difficulty == 'easy':
-            questions = question_gen.derivatives.generate_easy_questions(15)
-        elif difficulty == 'medium':
-            questions = question_gen.derivatives.generate_medium_questions(15)
-        elif difficulty == 'hard':
-            questions = question_gen.derivatives.generate_hard_questions(15)
-        else:
-            questions = question_gen.generate_derivative_questions(15)
+        questions = reserved_or_generate('derivatives', difficulty, 15)
         
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         final_questions = unique_questions[:10]
         
-        print(f"✅ מחזיר {len(final_questions)} שאלות נגזרות {difficulty}")
-        return jsonify(final_questions)
+        logger.info("✅ מחזיר %s שאלות נגזרות %s", len(final_questions), difficulty)
+        return jsonify(questions_payload(final_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 @app.route('/api/questions/integrals/basic')
 @login_required
+@reservable_quiz('integrals', 'basic')
 def get_integral_basic_questions():
     try:
         user_id = request.current_user['id']
         duplicate_preventer.clear_session(user_id)
         
-        questions = question_gen.generate_integral_questions(15)
+        questions = reserved_or_generate('integrals', 'basic', 15)
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         
         final_questions = unique_questions[:10]
-        print(f"✅ מחזיר {len(final_questions)} שאלות אינטגרלים")
-        return jsonify(final_questions)
+        logger.info("✅ מחזיר %s שאלות אינטגרלים", len(final_questions))
+        return jsonify(questions_payload(final_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 @app.route('/api/questions/integrals/<difficulty>')
 @login_required
+@reservable_quiz('integrals')
 def get_integral_questions_by_difficulty(difficulty):
     try:
         user_id = request.current_user['id']
         duplicate_preventer.clear_session(user_id)
         
-        if difficulty == 'easy':
-            questions = question_gen.integrals.generate_easy_questions(15)
-        elif difficulty == 'medium':
-            questions = question_gen.integrals.generate_medium_questions(15)
-        elif difficulty == 'hard':
-            questions = question_gen.integrals.generate_hard_questions(15)
-        else:
-            questions = question_gen.generate_integral_questions(15)
+        questions = reserved_or_generate('integrals', difficulty, 15)
         
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         final_questions = unique_questions[:10]
         
-        print(f"✅ מחזיר {len(final_questions)} שאלות אינטגרלים {difficulty}")
-        return jsonify(final_questions)
+        logger.info("✅ מחזיר %s שאלות אינטגרלים %s", len(final_questions), difficulty)
+        return jsonify(questions_payload(final_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 @app.route('/api/questions/limits/basic')
 @login_required
+@reservable_quiz('limits', 'basic')
 def get_limit_basic_questions():
     try:
         user_id = request.current_user['id']
         duplicate_preventer.clear_session(user_id)
         
-        questions = question_gen.generate_limit_questions(15)
+        questions = reserved_or_generate('limits', 'basic', 15)
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         
         final_questions = unique_questions[:10]
-        print(f"✅ מחזיר {len(final_questions)} שאלות גבולות")
-        return jsonify(final_questions)
+        logger.info("✅ מחזיר %s שאלות גבולות", len(final_questions))
+        return jsonify(questions_payload(final_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 @app.route('/api/questions/limits/<difficulty>')
 @login_required
+@reservable_quiz('limits')
 def get_limit_questions_by_difficulty(difficulty):
     try:
         user_id = request.current_user['id']
         duplicate_preventer.clear_session(user_id)
         
-        if difficulty == 'easy':
-            questions = question_gen.limits.generate_easy_questions(15)
-        elif difficulty == 'medium':
-            questions = question_gen.limits.generate_medium_questions(15)
-        elif difficulty == 'hard':
-            questions = question_gen.limits.generate_hard_questions(15)
-        else:
-            questions = question_gen.generate_limit_questions(15)
+        questions = reserved_or_generate('limits', difficulty, 15)
         
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         final_questions = unique_questions[:10]
         
-        print(f"✅ מחזיר {len(final_questions)} שאלות גבולות {difficulty}")
-        return jsonify(final_questions)
+        logger.info("✅ מחזיר %s שאלות גבולות %s", len(final_questions), difficulty)
+        return jsonify(questions_payload(final_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 @app.route('/api/questions/criticalpoints')
 @login_required
+@reservable_quiz('criticalpoints', 'basic')
 def get_criticalpoints_questions():
     try:
         user_id = request.current_user['id']
         duplicate_preventer.clear_session(user_id)
         
-        questions = question_gen.generate_critical_points_questions(15)
+        questions = reserved_or_generate('criticalpoints', 'basic', 15)
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         
         final_questions = unique_questions[:10]
-        print(f"✅ מחזיר {len(final_questions)} שאלות נקודות קיצון")
-        return jsonify(final_questions)
+        logger.info("✅ מחזיר %s שאלות נקודות קיצון", len(final_questions))
+        return jsonify(questions_payload(final_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 @app.route('/api/questions/criticalpoints/<difficulty>')
 @login_required
+@reservable_quiz('criticalpoints')
 def get_criticalpoints_questions_by_difficulty(difficulty):
     try:
         user_id = request.current_user['id']
         duplicate_preventer.clear_session(user_id)
         
-        if difficulty == 'easy':
-            questions = question_gen.critical_points.generate_easy_questions(15)
-        elif difficulty == 'medium':
-            questions = question_gen.critical_points.generate_medium_questions(15)
-        elif difficulty == 'hard':
-            questions = question_gen.critical_points.generate_hard_questions(15)
-        else:
-            questions = question_gen.generate_critical_points_questions(15)
+        questions = reserved_or_generate('criticalpoints', difficulty, 15)
         
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         final_questions = unique_questions[:10]
         
-        print(f"✅ מחזיר {len(final_questions)} שאלות נקודות קיצון {difficulty}")
-        return jsonify(final_questions)
+        logger.info("✅ מחזיר %s שאלות נקודות קיצון %s", len(final_questions), difficulty)
+        return jsonify(questions_payload(final_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 @app.route('/api/questions/general')
 @login_required
+@reservable_quiz('general', 'mixed', count=20)
 def get_general_questions():
     try:
         user_id = request.current_user['id']
         duplicate_preventer.clear_session(user_id)
         
-        questions = question_gen.generate_mixed_questions(20)
+        questions = reserved_or_generate('general', 'mixed', 20)
         unique_questions = duplicate_preventer.filter_session_duplicates(questions, user_id)
         
         final_questions = unique_questions[:15]
-        print(f"✅ מחזיר {len(final_questions)} שאלות מעורבות")
-        return jsonify(final_questions)
+        logger.info("✅ מחזיר %s שאלות מעורבות", len(final_questions))
+        return jsonify(questions_payload(final_questions))
         
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
     except Exception as e:
-        print(f"❌ שגיאה: {str(e)}")
+        logger.error("❌ שגיאה: %s", e)
         return jsonify({"error": f"שגיאה ביצירת שאלות: {str(e)}"}), 500
 
 
+@app.route('/api/questions/pack/<topic>/<difficulty>')
+@login_required
+def get_quiz_pack(topic, difficulty):
+    """חבילה חתומה של מבחנים מוכנים לתרגול אופליין: ?quizzes=N"""
+    if not quiz_packs:
+        return jsonify({"error": "חבילות מבחנים אופליין לא זמינות בשרת הזה"}), 404
+    try:
+        quizzes = request.args.get('quizzes', 5, type=int)
+        pack = quiz_packs.build(request.current_user['id'], topic, difficulty, quizzes)
+        logger.info("📦 חבילת %s מבחני %s/%s למשתמש %s", len(pack['quizzes']), topic, difficulty,
+                    request.current_user['id'])
+        response = jsonify(pack)
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+    except ValueError as e:
+        return jsonify({"error": f"נושא או רמה לא מוכרים: {str(e)}"}), 400
+    except GenerationQueueFull:
+        logger.warning("⚠️ תור יצירת השאלות מלא - הבקשה נדחתה")
+        return jsonify({"error": "השרת עמוס, נסה שוב בעוד רגע"}), 503
+    except Exception as e:
+        logger.error("❌ שגיאה ביצירת חבילת מבחנים: %s", e)
+        return jsonify({"error": f"שגיאה ביצירת חבילה: {str(e)}"}), 500
+
+MAX_SYNC_BATCH = 100
+
+def parse_quiz_result(data, user_id):
+    """בדיקת תוצאה אחת (בודדת או מתוך סנכרון) - מחזיר (result, error)"""
+    if not isinstance(data, dict):
+        return None, "תוצאה לא תקינה"
+    
+    topic = data.get('topic')
+    score = data.get('score')
+    total_questions = data.get('total_questions')
+    if not all([topic, score is not None, total_questions]):
+        return None, "חסרים נתונים חובה"
+    
+    details = dict(data.get('details') or {})
+    pack_token = data.get('pack_token')
+    if pack_token:
+        pack = quiz_packs.verify(pack_token, user_id) if quiz_packs else None
+        if pack is None:
+            return None, "חבילת המבחנים לא תקינה או שפג תוקפה"
+        details['pack_id'] = pack['pack_id']
+    
+    return {
+        'topic': topic,
+        'score': score,
+        'total_questions': total_questions,
+        'time_spent': data.get('time_spent'),
+        'details': details,
+        'client_result_id': data.get('client_result_id'),
+    }, None
+
+def save_quiz_results_batch(items, user_id):
+    """סנכרון תוצאות שנצברו בלי חיבור - כל הפריטים התקינים נשמרים בטרנזקציה אחת"""
+    if len(items) > MAX_SYNC_BATCH:
+        return jsonify({"error": f"יותר מ-{MAX_SYNC_BATCH} תוצאות בבקשה אחת"}), 413
+    
+    results, rejected = [], []
+    for index, item in enumerate(items):
+        result, error = parse_quiz_result(item, user_id)
+        if error:
+            client_result_id = item.get('client_result_id') if isinstance(item, dict) else None
+            rejected.append({"index": index, "client_result_id": client_result_id, "error": error})
+        else:
+            results.append(result)
+    
+    saved = db.save_quiz_results_batch(user_id, results) if results else []
+    if any(not item['duplicate'] for item in saved):
+        stats_cache.invalidate(user_id)
+    
+    return jsonify({"success": True, "saved": saved, "rejected": rejected})
+
 @app.route('/api/save-result', methods=['POST'])
 @login_required
 def save_quiz_result():
     try:
         data = request.json
-        topic = data.get('topic')
-        score = data.get('score')
-        total_questions = data.get('total_questions')
-        time_spent = data.get('time_spent')
-        details = data.get('details', {})
+        user_id = request.current_user['id']
         
-        if not all([topic, score is not None, total_questions]):
-            return jsonify({"error": "חסרים נתונים חובה"}), 400
+        if isinstance(data.get('results'), list):
+            # תור אופליין של משתמש אחר באותו דפדפן - לא נשמר בחשבון הנוכחי
+            if data.get('user_id') not in (None, user_id):
+                return jsonify({"error": "התוצאות שייכות למשתמש אחר"}), 409
+            return save_quiz_results_batch(data['results'], user_id)
         
-        user_id = request.current_user['id']
-        result_id = db.save_quiz_result(user_id, topic, score, total_questions, time_spent, details)
+        result, error = parse_quiz_result(data, user_id)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        result_id = db.save_quiz_result(user_id, result['topic'], result['score'], result['total_questions'],
+                                        result['time_spent'], result['details'], result['client_result_id'])
+        stats_cache.invalidate(user_id)
         
         return jsonify({
             "success": True,
@@ -694,11 +1091,12 @@ def save_quiz_result():
         })
         
     except Exception as e:
-        print(f"❌ שגיאה בשמירת תוצאה: {str(e)}")
+        logger.error("❌ שגיאה בשמירת תוצאה: %s", e)
         return jsonify({"error": f"שגיאה בשמירה: {str(e)}"}), 500
 
 @app.route('/api/stats/recent')
 @login_required
+@versioned_stats()
 def get_recent_results():
     try:
         limit = request.args.get('limit', 10, type=int)
@@ -710,6 +1108,7 @@ def get_recent_results():
 
 @app.route('/api/stats/by-topic')
 @login_required
+@versioned_stats()
 def get_stats_by_topic():
     try:
         user_id = request.current_user['id']
@@ -720,6 +1119,7 @@ def get_stats_by_topic():
 
 @app.route('/api/stats/general')
 @login_required
+@versioned_stats()
 def get_general_stats():
     try:
         user_id = request.current_user['id']
@@ -730,6 +1130,7 @@ def get_general_stats():
 
 @app.route('/api/stats/progress')
 @login_required
+@versioned_stats(daily=True)
 def get_progress_stats():
     try:
         days = request.args.get('days', 30, type=int)
@@ -739,6 +1140,89 @@ def get_progress_stats():
     except Exception as e:
         return jsonify({"error": f"שגיאה בקבלת התקדמות: {str(e)}"}), 500
 
+@app.route('/api/stats/dashboard')
+@login_required
+@versioned_stats(daily=True)
+def get_dashboard_stats():
+    """כל נתוני עמוד הסיכום בבקשה אחת: ?fields=general,by_topic,recent,progress"""
+    try:
+        fields = request.args.get('fields')
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(db.DASHBOARD_FIELDS)
+        unknown = [f for f in fields if f not in db.DASHBOARD_FIELDS]
+        if unknown:
+            return jsonify({"error": f"שדות לא מוכרים: {', '.join(unknown)}"}), 400
+        
+        limit = request.args.get('limit', 5, type=int)
+        days = request.args.get('days', 30, type=int)
+        user_id = request.current_user['id']
+        dashboard = db.get_user_dashboard(user_id, fields, recent_limit=limit, days=days)
+        if dashboard is None:
+            return jsonify({"error": "שגיאה בקבלת נתוני לוח הבקרה"}), 500
+        return jsonify(dashboard)
+    except Exception as e:
+        return jsonify({"error": f"שגיאה בקבלת נתוני לוח הבקרה: {str(e)}"}), 500
+
+# === Application factory ===
+
+def create_app(db_path=None, warm_up=None, start_services=True):
+    """בונה את המחוללים, מסד הנתונים והשירותים ומחזיר את האפליקציה (פעם אחת לתהליך)
+    
+    warm_up מחשב מראש את כל המאגרים (ברירת מחדל: CALCMASTER_WARM_UP). עם
+    start_services=False לא נוצרים threads ותהליכים - wsgi.py מפעיל אותם
+    אחרי ה-fork של כל worker דרך start_background_services().
+    """
+    global question_gen, db, generation_pool, session_sweeper, session_tokens, quiz_packs
+    global duplicate_preventer, smart_quiz
+    
+    if db is None:
+        question_gen = QuestionGenerator()
+        logger.info("✅ QuestionGenerator אותחל בהצלחה!")
+        if warm_up is None:
+            warm_up = env_flag('CALCMASTER_WARM_UP')
+        if warm_up:
+            question_gen.warm_up()
+        
+        db = QuizDatabase(db_path or os.environ.get('CALCMASTER_DB_PATH', 'quiz_results.db'))
+        logger.info("✅ מסד נתונים אותחל בהצלחה!")
+        
+        # יצירת השאלות בתהליכים נפרדים (CALCMASTER_GENERATION_WORKERS)
+        generation_pool = GenerationPool(question_gen)
+        session_sweeper = SessionSweeper(db)
+        
+        # טוקנים חתומים במקום שורה בטבלת user_sessions לכל התחברות - רק עם סוד ייעודי מהסביבה,
+        # אחרת כל אחד יכול לחתום טוקן בשם כל משתמש
+        secret = signing_secret()
+        session_tokens = None
+        if env_flag('CALCMASTER_STATELESS_SESSIONS'):
+            if secret:
+                session_tokens = StatelessSessionTokens(secret)
+            else:
+                logger.error("❌ CALCMASTER_STATELESS_SESSIONS דורש CALCMASTER_SESSION_SECRET - "
+                             "נשארים עם sessions בטבלה")
+        
+        # חבילות מבחנים לתרגול אופליין - הטוקן שלהן חתום באותו סוד ייעודי, ובלעדיו הן כבויות
+        quiz_packs = QuizPacks(secret, generation_pool) if secret else None
+        if not secret:
+            logger.warning("⚠️ חבילות מבחנים אופליין כבויות - חסר CALCMASTER_SESSION_SECRET")
+        
+        duplicate_preventer = SimpleDuplicationPreventer(db)
+        smart_quiz = SimplePersonalizedQuiz(db, generation_pool)
+    
+    if start_services:
+        start_background_services()
+    return app
+
+def start_background_services():
+    """תהליכי יצירת השאלות ו-session sweeper - threads ותהליכים לא עוברים fork, ולכן לכל worker בנפרד"""
+    generation_pool.start()
+    session_sweeper.start()
+
 if __name__ == '__main__':
-    print("🚀 מפעיל את השרת עם מערכת כפילויות פשוטה...")
+    try:
+        create_app()
+    except Exception as e:
+        logger.error("❌ שגיאה באתחול: %s", e)
+        exit(1)
+    
+    logger.info("🚀 מפעיל את השרת עם מערכת כפילויות פשוטה...")
     app.run(debug=True)
\ No newline at end of file
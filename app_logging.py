@@ -0,0 +1,98 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# שדות סטנדרטיים של LogRecord - כל השאר נחשב ל-extra ונכתב ל-JSON
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """פורמט JSON בשורה אחת לכל רשומה, כולל שדות extra"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _is_production():
+    return os.environ.get('CALCMASTER_ENV', 'development').lower() == 'production'
+
+
+def _sample_rate():
+    try:
+        return float(os.environ.get('CALCMASTER_LOG_SAMPLE_RATE', '1.0' if not _is_production() else '0.01'))
+    except ValueError:
+        return 1.0
+
+
+_SAMPLE_RATE = _sample_rate()
+
+
+def sample_debug(logger):
+    """האם לכתוב שורת debug לשאלה בודדת - נבדק לפני בניית ההודעה כדי לחסוך latex()"""
+    return logger.isEnabledFor(logging.DEBUG) and (_SAMPLE_RATE >= 1.0 or random.random() < _SAMPLE_RATE)
+
+
+def configure_logging(level=None, fmt=None):
+    """הגדרת לוגר השורש עם QueueHandler - הכתיבה בפועל מתבצעת ב-thread נפרד"""
+    global _listener, _SAMPLE_RATE
+    if _listener is not None:
+        return
+
+    production = _is_production()
+    level = level or os.environ.get('CALCMASTER_LOG_LEVEL', 'WARNING' if production else 'INFO')
+    fmt = fmt or os.environ.get('CALCMASTER_LOG_FORMAT', 'json' if production else 'text')
+    _SAMPLE_RATE = _sample_rate()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    os.register_at_fork(after_in_child=_restart_listener)
+
+
+def _restart_listener():
+    """ה-thread של ה-listener לא עובר fork (workers של gunicorn, תהליכי יצירה) - תור ו-listener חדשים"""
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    logging.getLogger().handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """ריקון התור וסגירת ה-listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
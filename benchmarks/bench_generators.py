@@ -0,0 +1,283 @@
+# File: benchmarks/bench_generators.py
+# Performance benchmark for the question generators
+#
+#   python benchmarks/bench_generators.py --output bench.json
+#   python benchmarks/bench_generators.py --baseline bench.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sympy
+from sympy.core.cache import clear_cache
+
+from question_generators import QuestionGenerator
+from question_generators.limit_templates import random_case
+
+DIFFICULTIES = ['easy', 'medium', 'hard', 'mixed']
+
+
+def pool_entries(question_gen):
+    """All pool entries as (generator, difficulty, label, symbolic call)"""
+    d = question_gen.derivatives
+    i = question_gen.integrals
+    l = question_gen.limits
+    c = question_gen.critical_points
+
+    entries = []
+    for difficulty in ['easy', 'medium', 'hard']:
+        for func in getattr(d, f'{difficulty}_functions'):
+            entries.append(('derivatives', difficulty, str(func),
+                            lambda func=func: d._compute_derivative(func)))
+            entries.append(('derivatives', difficulty, f"steps {func}",
+                            lambda func=func: d._compute_steps(func)))
+            # includes the derivation tree - pool sampling clears caches before each entry
+            entries.append(('derivatives', difficulty, f"distractors {func}",
+                            lambda func=func: d._compute_distractors(func)))
+        for func in getattr(i, f'{difficulty}_functions'):
+            entries.append(('integrals', difficulty, str(func),
+                            lambda func=func: i._compute_integral(func)))
+            entries.append(('integrals', difficulty, f"steps {func}",
+                            lambda func=func: i._compute_steps(func)))
+            entries.append(('integrals', difficulty, f"distractors {func}",
+                            lambda func=func: i._compute_distractors(func)))
+        for func, lower, upper in i.definite_cases[difficulty]:
+            # includes the antiderivative - pool sampling clears caches before each entry
+            entries.append(('integrals', difficulty, f"{func} from {lower} to {upper}",
+                            lambda func=func, lower=lower, upper=upper: i._compute_definite_integral(func, lower, upper)))
+        for func, point, expected, _ in getattr(l, f'{difficulty}_cases'):
+            entries.append(('limits', difficulty, f"{func} @ {point}",
+                            lambda func=func, point=point, expected=expected: l._compute_limit(func, point, expected)))
+        if difficulty == 'hard':
+            for func, point, direction, expected, _ in l.one_sided_cases:
+                entries.append(('limits', difficulty, f"{func} @ {point}{direction}",
+                                lambda func=func, point=point, expected=expected, direction=direction:
+                                l._compute_limit(func, point, expected, direction)))
+        for func, _, _ in getattr(c, f'{difficulty}_functions'):
+            entries.append(('criticalpoints', difficulty, str(func),
+                            lambda func=func: c._analyze_function(func)))
+    return entries
+
+
+def clear_generator_caches(question_gen):
+    """Drop generator-level caches too (e.g. the limit table), not just SymPy's"""
+    for generator in (question_gen.derivatives, question_gen.integrals,
+                      question_gen.limits, question_gen.critical_points):
+        generator.clear_caches()
+
+
+def time_call(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_generate(question_gen, args):
+    """generate_questions per generator and difficulty - cold/warm, with and without caches"""
+    generators = {
+        'derivatives': question_gen.derivatives,
+        'integrals': question_gen.integrals,
+        'limits': question_gen.limits,
+        'criticalpoints': question_gen.critical_points,
+    }
+    results = []
+    for name, generator in generators.items():
+        if args.only and name not in args.only:
+            continue
+        for difficulty in DIFFICULTIES:
+            for cache_enabled in (True, False):
+                generator.cache_enabled = cache_enabled
+                generator.clear_caches()
+                clear_cache()
+                random.seed(args.seed)
+                cold = time_call(lambda: generator.generate_questions(args.count, difficulty))
+
+                warm = [time_call(lambda: generator.generate_questions(args.count, difficulty))
+                        for _ in range(args.repeat)]
+                warm_median = statistics.median(warm)
+                for mode, seconds in (('cold', cold), ('warm', warm_median)):
+                    results.append({
+                        'key': f"generate/{name}/{difficulty}/{mode}/cache={'on' if cache_enabled else 'off'}",
+                        'generator': name,
+                        'difficulty': difficulty,
+                        'mode': mode,
+                        'cache': cache_enabled,
+                        'seconds': seconds,
+                        'questions_per_second': args.count / seconds if seconds else None,
+                    })
+                print(f"{name:<15} {difficulty:<7} cache={'on ' if cache_enabled else 'off'} "
+                      f"cold {cold * 1000:8.1f} ms   warm {warm_median * 1000:8.1f} ms")
+            generator.cache_enabled = True
+    return results
+
+
+def bench_mixed(question_gen, args):
+    """generate_mixed_questions - the /api/questions/general path"""
+    clear_cache()
+    random.seed(args.seed)
+    cold = time_call(lambda: question_gen.generate_mixed_questions(args.count))
+    warm = statistics.median(time_call(lambda: question_gen.generate_mixed_questions(args.count))
+                             for _ in range(args.repeat))
+    print(f"{'mixed':<15} {'':<7} cold {cold * 1000:8.1f} ms   warm {warm * 1000:8.1f} ms")
+    return [
+        {'key': 'mixed/cold', 'mode': 'cold', 'seconds': cold},
+        {'key': 'mixed/warm', 'mode': 'warm', 'seconds': warm},
+    ]
+
+
+def bench_pool_functions(question_gen, args):
+    """Uncached symbolic cost of every pool entry"""
+    results = []
+    for generator, difficulty, label, fn in pool_entries(question_gen):
+        if args.only and generator not in args.only:
+            continue
+        samples = []
+        for _ in range(args.pool_repeat):
+            clear_cache()
+            clear_generator_caches(question_gen)
+            samples.append(time_call(fn))
+        median = statistics.median(samples)
+        slow = median * 1000 >= args.slow_ms
+        results.append({
+            'key': f"pool/{generator}/{difficulty}/{label}",
+            'generator': generator,
+            'difficulty': difficulty,
+            'function': label,
+            'seconds': median,
+            'min_seconds': min(samples),
+            'slow': slow,
+        })
+        marker = "  🐢 SLOW" if slow else ""
+        print(f"{generator:<15} {difficulty:<7} {median * 1000:8.1f} ms  {label}{marker}")
+    return results
+
+
+def bench_limit_templates(question_gen, args):
+    """Parametric limit templates - cases per second, answers cross-checked against LimitEngine"""
+    random.seed(args.seed)
+    start = time.perf_counter()
+    cases = [random_case() for _ in range(args.template_cases)]
+    seconds = time.perf_counter() - start
+
+    limits = question_gen.limits
+    mismatches = []
+    for case in cases[:args.template_verify]:
+        computed = limits._format_limit(limits.limit_engine.evaluate(case.expr(), case.point, case.direction))
+        if computed != case.answer:
+            mismatches.append({'template': case.template, 'function': case.func_tex, 'point': case.point_tex,
+                               'answer': case.answer, 'computed': computed})
+            print(f"   ❌ {case.template}: {case.func_tex} @ {case.point_tex} -> {case.answer}, engine {computed}")
+
+    unique = len({(case.func_tex, case.point_tex) for case in cases})
+    print(f"{len(cases)} cases in {seconds * 1000:.1f} ms ({len(cases) / seconds:,.0f}/s), {unique} unique, "
+          f"{len(mismatches)} mismatches in {min(len(cases), args.template_verify)} verified")
+    return [{'key': 'templates/limits', 'seconds': seconds / len(cases), 'unique': unique,
+             'mismatches': mismatches}]
+
+
+def compare(report, baseline, threshold, min_delta_ms):
+    """Compare against a stored baseline report; returns the list of regressions"""
+    baseline_by_key = {}
+    for section in ('generate', 'mixed', 'pool_functions'):
+        for entry in baseline.get(section, []):
+            baseline_by_key[entry['key']] = entry['seconds']
+
+    regressions = []
+    print("\n" + "=" * 100)
+    print(f"{'Benchmark':<70} {'Baseline':>10} {'Current':>10} {'Ratio':>7}")
+    print("-" * 100)
+    for section in ('generate', 'mixed', 'pool_functions'):
+        for entry in report.get(section, []):
+            old = baseline_by_key.get(entry['key'])
+            if old is None:
+                continue
+            new = entry['seconds']
+            ratio = new / old if old else float('inf')
+            regressed = ratio >= threshold and (new - old) * 1000 >= min_delta_ms
+            if regressed:
+                regressions.append({'key': entry['key'], 'baseline': old, 'current': new, 'ratio': ratio})
+            marker = "  ❌ REGRESSION" if regressed else ""
+            print(f"{entry['key'][:70]:<70} {old * 1000:8.1f}ms {new * 1000:8.1f}ms {ratio:6.2f}x{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CalcMaster question generators")
+    parser.add_argument('--count', type=int, default=15, help="questions per generate call (default: 15, as in app.py)")
+    parser.add_argument('--repeat', type=int, default=3, help="warm repetitions per case")
+    parser.add_argument('--pool-repeat', type=int, default=3, help="repetitions per pool entry")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--only', nargs='*', choices=['derivatives', 'integrals', 'limits', 'criticalpoints'],
+                        help="limit to these generators")
+    parser.add_argument('--skip', nargs='*', default=[], choices=['generate', 'mixed', 'pool', 'templates'])
+    parser.add_argument('--template-cases', type=int, default=5000, help="parametric limit cases to generate")
+    parser.add_argument('--template-verify', type=int, default=200, help="cases cross-checked against LimitEngine")
+    parser.add_argument('--slow-ms', type=float, default=250.0, help="flag pool entries slower than this")
+    parser.add_argument('--output', help="write the JSON report to this path")
+    parser.add_argument('--baseline', help="compare against a stored JSON report")
+    parser.add_argument('--threshold', type=float, default=1.5, help="regression ratio vs baseline")
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help="ignore regressions smaller than this")
+    args = parser.parse_args()
+
+    question_gen = QuestionGenerator()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sympy': sympy.__version__,
+            'platform': platform.platform(),
+            'args': vars(args),
+        }
+    }
+
+    if 'generate' not in args.skip:
+        print("\n📊 generate_questions")
+        report['generate'] = bench_generate(question_gen, args)
+    if 'mixed' not in args.skip and not args.only:
+        print("\n📊 generate_mixed_questions")
+        report['mixed'] = bench_mixed(question_gen, args)
+    if 'pool' not in args.skip:
+        print("\n📊 Symbolic cost per pool entry")
+        report['pool_functions'] = bench_pool_functions(question_gen, args)
+
+    if 'templates' not in args.skip and (not args.only or 'limits' in args.only):
+        print("\n📊 Parametric limit templates")
+        report['templates'] = bench_limit_templates(question_gen, args)
+
+    slow = [entry for entry in report.get('pool_functions', []) if entry['slow']]
+    if slow:
+        print(f"\n🐢 {len(slow)} pool entries slower than {args.slow_ms:.0f} ms:")
+        for entry in sorted(slow, key=lambda e: -e['seconds']):
+            print(f"   {entry['generator']:<15} {entry['seconds'] * 1000:8.1f} ms  {entry['function']}")
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        report['regressions'] = regressions
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions (>= {args.threshold}x baseline)")
+            exit_code = 1
+        else:
+            print("\n✅ No regressions")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Report written to {args.output}")
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# File: benchmarks/load_test.py
+# HTTP load test for the Flask app against a temporary SQLite database
+#
+#   python benchmarks/load_test.py --users 50 --concurrency 20 --iterations 5
+#   python benchmarks/load_test.py --url http://127.0.0.1:5000 --users 10
+
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TOPICS = ['derivatives', 'integrals', 'limits', 'criticalpoints']
+DIFFICULTIES = ['easy', 'medium', 'hard']
+
+
+class Recorder:
+    """Collects latency samples per endpoint label"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(label, []).append(seconds)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+
+class Client:
+    """HTTP client with its own cookie jar - one per synthetic student"""
+
+    def __init__(self, base_url, recorder, timeout):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, label, path, payload=None):
+        data = None
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+
+        start = time.perf_counter()
+        status = None
+        body = None
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status = response.status
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            status = e.code
+            body = e.read()
+        except (urllib.error.URLError, OSError):
+            status = None
+        elapsed = time.perf_counter() - start
+
+        ok = status is not None and 200 <= status < 400
+        self.recorder.record(label, elapsed, ok)
+        if ok and body:
+            try:
+                return json.loads(body)
+            except ValueError:
+                return None
+        return None
+
+
+def start_local_server(db_path, port):
+    """Starts app.py in a background thread against a temporary database"""
+    os.environ['CALCMASTER_DB_PATH'] = db_path
+    os.environ.setdefault('CALCMASTER_LOG_LEVEL', 'WARNING')
+
+    from werkzeug.serving import make_server
+    import app as calcmaster_app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    server = make_server('127.0.0.1', port, calcmaster_app.create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def setup_user(base_url, recorder, timeout, index, run_id):
+    client = Client(base_url, recorder, timeout)
+    username = f"load_{run_id}_{index}"
+    client.request('POST /api/auth/register', '/api/auth/register', {
+        'username': username,
+        'email': f"{username}@example.com",
+        'password': 'password123',
+    })
+    result = client.request('POST /api/auth/login', '/api/auth/login', {
+        'username': username,
+        'password': 'password123',
+    })
+    return client if result and result.get('success') else None
+
+
+def student_flow(client, iterations, think_time):
+    """Realistic session: fetch quiz, save result, open the summary page"""
+    for _ in range(iterations):
+        topic = random.choice(TOPICS)
+        difficulty = random.choice(DIFFICULTIES)
+        questions = client.request(f'GET /api/questions/{topic}/<difficulty>',
+                                   f'/api/questions/{topic}/{difficulty}') or []
+
+        total = len(questions) if isinstance(questions, list) and questions else 10
+        client.request('POST /api/save-result', '/api/save-result', {
+            'topic': topic,
+            'score': random.randint(0, total),
+            'total_questions': total,
+            'time_spent': random.randint(60, 900),
+            'details': {'difficulty': difficulty},
+        })
+
+        client.request('GET /api/stats/dashboard', '/api/stats/dashboard?fields=general,by_topic,recent&limit=5')
+
+        if think_time:
+            time.sleep(random.uniform(0, think_time))
+
+
+def percentile(sorted_samples, p):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(p / 100 * (len(sorted_samples) - 1)))))
+    return sorted_samples[index]
+
+
+def summarize(recorder, wall_time):
+    summary = {}
+    for label, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        summary[label] = {
+            'requests': len(samples),
+            'errors': recorder.errors.get(label, 0),
+            'throughput_rps': len(samples) / wall_time if wall_time else 0,
+            'mean_ms': statistics.mean(samples) * 1000,
+            'p50_ms': percentile(ordered, 50) * 1000,
+            'p90_ms': percentile(ordered, 90) * 1000,
+            'p95_ms': percentile(ordered, 95) * 1000,
+            'p99_ms': percentile(ordered, 99) * 1000,
+            'max_ms': ordered[-1] * 1000,
+        }
+    return summary
+
+
+def print_summary(summary, wall_time):
+    print("\n" + "=" * 126)
+    print(f"{'Endpoint':<48} {'Reqs':>6} {'Err':>5} {'RPS':>8} {'Mean':>9} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9}")
+    print("-" * 126)
+    total = 0
+    for label, s in summary.items():
+        total += s['requests']
+        print(f"{label:<48} {s['requests']:>6} {s['errors']:>5} {s['throughput_rps']:>8.1f} "
+              f"{s['mean_ms']:>7.1f}ms {s['p50_ms']:>7.1f}ms {s['p90_ms']:>7.1f}ms "
+              f"{s['p95_ms']:>7.1f}ms {s['p99_ms']:>7.1f}ms")
+    print("-" * 126)
+    print(f"Total: {total} requests in {wall_time:.1f}s ({total / wall_time:.1f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the CalcMaster HTTP API")
+    parser.add_argument('--users', type=int, default=20, help="synthetic students to register")
+    parser.add_argument('--concurrency', type=int, default=10, help="concurrent students")
+    parser.add_argument('--iterations', type=int, default=3, help="quizzes per student")
+    parser.add_argument('--think-time', type=float, default=0.0, help="max random pause between quizzes (s)")
+    parser.add_argument('--timeout', type=float, default=120.0, help="per-request timeout (s)")
+    parser.add_argument('--url', help="target an already running server instead of a local temp instance")
+    parser.add_argument('--port', type=int, default=0, help="port for the local server (default: random)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help="write the JSON summary to this path")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = None
+    tmp_dir = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        tmp_dir = tempfile.TemporaryDirectory(prefix='calcmaster-load-')
+        server, base_url = start_local_server(os.path.join(tmp_dir.name, 'load_test.db'), args.port)
+    print(f"🎯 Target: {base_url}")
+
+    recorder = Recorder()
+    run_id = int(time.time())
+    try:
+        print(f"👥 Registering and logging in {args.users} users...")
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            clients = list(pool.map(lambda i: setup_user(base_url, recorder, args.timeout, i, run_id),
+                                    range(args.users)))
+        clients = [c for c in clients if c is not None]
+        print(f"✅ {len(clients)} users ready")
+
+        print(f"🚀 Running {args.iterations} quizzes per user at concurrency {args.concurrency}...")
+        flow_recorder = Recorder()
+        for client in clients:
+            client.recorder = flow_recorder
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda c: student_flow(c, args.iterations, args.think_time), clients))
+        wall_time = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    setup_summary = summarize(recorder, 1.0)
+    summary = summarize(flow_recorder, wall_time)
+    print("\n🔐 Setup (register/login):")
+    for label, s in setup_summary.items():
+        print(f"   {label:<30} {s['requests']:>5} reqs  p50 {s['p50_ms']:.1f}ms  p95 {s['p95_ms']:.1f}ms  errors {s['errors']}")
+    print_summary(summary, wall_time)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'wall_time': wall_time, 'setup': setup_summary,
+                       'endpoints': summary}, f, indent=2)
+        print(f"💾 Summary written to {args.output}")
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
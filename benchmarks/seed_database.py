@@ -0,0 +1,210 @@
+# File: benchmarks/seed_database.py
+# Bulk-load synthetic users, sessions and quiz results for scale testing
+#
+#   python benchmarks/seed_database.py --db scale.db --users 20000 --results 2000000
+#   python benchmarks/seed_database.py --db scale.db --topics derivatives=4,integrals=3,limits=2,criticalpoints=1
+
+import argparse
+import json
+import os
+import random
+import secrets
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import QuizDatabase
+
+DEFAULT_TOPICS = 'derivatives=4,integrals=3,limits=2,criticalpoints=1,general=1'
+DEFAULT_DIFFICULTIES = 'easy=3,medium=4,hard=2,mixed=1'
+
+# ממוצע ציון (אחוז הצלחה) לפי רמת קושי
+DIFFICULTY_MEAN_SCORE = {'easy': 0.8, 'medium': 0.65, 'hard': 0.5, 'mixed': 0.6}
+
+
+def parse_weights(spec):
+    """'a=3,b=1' -> (['a', 'b'], [3.0, 1.0])"""
+    names, weights = [], []
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        names.append(name.strip())
+        weights.append(float(weight) if weight else 1.0)
+    return names, weights
+
+
+def timestamp(dt):
+    # אותו פורמט כמו CURRENT_TIMESTAMP של SQLite
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def chunked_executemany(conn, sql, rows, batch_size, label):
+    """executemany על זרם שורות, commit אחד לכל batch גדול"""
+    cursor = conn.cursor()
+    batch = []
+    total = 0
+    start = time.perf_counter()
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(sql, batch)
+            conn.commit()
+            total += len(batch)
+            batch.clear()
+            rate = total / (time.perf_counter() - start)
+            print(f"   {label}: {total:,} rows ({rate:,.0f} rows/s)", end='\r')
+    if batch:
+        cursor.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+    elapsed = time.perf_counter() - start
+    print(f"   {label}: {total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    return total
+
+
+def generate_users(first_id, count, password_hash, salt, hash_scheme, now, days, run_tag):
+    for i in range(count):
+        user_id = first_id + i
+        username = f"seed_{run_tag}_{user_id}"
+        created = now - timedelta(days=random.uniform(0, days), seconds=random.randint(0, 86399))
+        yield (user_id, username, f"{username}@example.com", password_hash, salt, hash_scheme,
+               f"Student {user_id}", timestamp(created), timestamp(now - timedelta(days=random.uniform(0, 7))))
+
+
+def user_activity_weights(user_ids, rng):
+    """התפלגות פעילות מוטה - מעט משתמשים עושים הרבה מבחנים"""
+    return [rng.paretovariate(1.5) for _ in user_ids]
+
+
+def generate_results(user_ids, count, args, stats, now):
+    rng = random.Random(args.seed + 1)
+    topics, topic_weights = parse_weights(args.topics)
+    difficulties, difficulty_weights = parse_weights(args.difficulties)
+    activity = user_activity_weights(user_ids, rng)
+    with_details = not args.no_details
+
+    # בחירה מראש בבלוקים - random.choices עם k גדול מהיר בהרבה מקריאה לכל שורה
+    block = 10000
+    produced = 0
+    while produced < count:
+        n = min(block, count - produced)
+        users = rng.choices(user_ids, weights=activity, k=n)
+        chosen_topics = rng.choices(topics, weights=topic_weights, k=n)
+        chosen_difficulties = rng.choices(difficulties, weights=difficulty_weights, k=n)
+        for user_id, topic, difficulty in zip(users, chosen_topics, chosen_difficulties):
+            total = 15 if topic == 'general' else 10
+            mean = DIFFICULTY_MEAN_SCORE.get(difficulty, 0.6)
+            score = max(0, min(total, round(rng.gauss(mean, 0.18) * total)))
+            percentage = score / total * 100
+            taken = now - timedelta(seconds=rng.randint(0, args.days * 86400))
+            time_spent = rng.randint(60, 1200)
+            details = json.dumps({'difficulty': difficulty}) if with_details else None
+
+            user_stats = stats.setdefault(user_id, [0, 0, 0])
+            user_stats[0] += 1
+            user_stats[1] += total
+            user_stats[2] += score
+
+            yield (user_id, topic, score, total, percentage, difficulty, timestamp(taken), time_spent, details)
+        produced += n
+
+
+def generate_user_stats(stats, now):
+    for user_id, (quizzes, questions, correct) in stats.items():
+        average = correct / questions * 100 if questions else 0
+        yield (user_id, quizzes, questions, correct, average, timestamp(now))
+
+
+def generate_sessions(user_ids, per_user, expired_ratio, now):
+    for user_id in user_ids:
+        for _ in range(per_user):
+            created = now - timedelta(days=random.uniform(0, 60))
+            if random.random() < expired_ratio:
+                expires = created + timedelta(days=random.uniform(0, 30))
+                expires = min(expires, now - timedelta(minutes=1))
+            else:
+                expires = now + timedelta(days=random.uniform(1, 30))
+            is_active = 0 if random.random() < expired_ratio / 2 else 1
+            yield (user_id, secrets.token_urlsafe(24), timestamp(created), timestamp(expires), is_active)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a CalcMaster database with synthetic data")
+    parser.add_argument('--db', default='scale_test.db', help="database file (created if missing)")
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--results', type=int, default=1000000, help="total quiz_results rows")
+    parser.add_argument('--sessions-per-user', type=int, default=3)
+    parser.add_argument('--expired-sessions', type=float, default=0.6, help="fraction of sessions already expired")
+    parser.add_argument('--days', type=int, default=365, help="spread results over the last N days")
+    parser.add_argument('--topics', default=DEFAULT_TOPICS, help="topic weights, e.g. derivatives=4,limits=1")
+    parser.add_argument('--difficulties', default=DEFAULT_DIFFICULTIES, help="difficulty weights")
+    parser.add_argument('--batch-size', type=int, default=50000, help="rows per executemany/commit")
+    parser.add_argument('--no-details', action='store_true', help="leave quiz_results.details NULL")
+    parser.add_argument('--safe', action='store_true', help="keep synchronous=FULL and the rollback journal")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    now = datetime.utcnow()
+
+    print(f"🏗️ Preparing schema in {args.db}")
+    db = QuizDatabase(args.db)
+
+    # PBKDF2 בודד לכל ההרצה - 100,000 איטרציות לכל משתמש היו לוקחות שעות
+    password_hash, salt, hash_scheme = db.password_hasher.hash('password123')
+
+    conn = sqlite3.connect(args.db)
+    if not args.safe:
+        conn.execute('PRAGMA journal_mode = MEMORY')
+        conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -200000')
+
+    first_id = (conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0]) + 1
+    user_ids = list(range(first_id, first_id + args.users))
+    run_tag = secrets.token_hex(3)
+    total_start = time.perf_counter()
+
+    print("👥 Users")
+    chunked_executemany(conn, '''
+        INSERT INTO users (id, username, email, password_hash, salt, hash_scheme, display_name,
+                           created_at, last_login)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', generate_users(first_id, args.users, password_hash, salt, hash_scheme, now, args.days, run_tag),
+        args.batch_size, 'users')
+
+    print("📊 Quiz results")
+    stats = {}
+    chunked_executemany(conn, '''
+        INSERT INTO quiz_results (user_id, topic, score, total_questions, percentage, difficulty,
+                                  date_taken, time_spent, details)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', generate_results(user_ids, args.results, args, stats, now), args.batch_size, 'quiz_results')
+
+    print("📈 User stats")
+    chunked_executemany(conn, '''
+        INSERT OR REPLACE INTO user_stats (user_id, total_quizzes, total_questions, total_correct,
+                                           average_score, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', generate_user_stats(stats, now), args.batch_size, 'user_stats')
+
+    print("🔐 Sessions")
+    chunked_executemany(conn, '''
+        INSERT INTO user_sessions (user_id, session_token, created_at, expires_at, is_active)
+        VALUES (?, ?, ?, ?, ?)
+    ''', generate_sessions(user_ids, args.sessions_per_user, args.expired_sessions, now),
+        args.batch_size, 'user_sessions')
+
+    print("🧮 ANALYZE")
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+
+    print(f"\n✅ Seeded {args.users:,} users and {args.results:,} quiz results "
+          f"in {time.perf_counter() - total_start:.1f}s")
+    print(f"   Sample login: seed_{run_tag}_{first_id} / password123")
+
+
+if __name__ == '__main__':
+    main()
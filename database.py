@@ -1,15 +1,22 @@
 import sqlite3
 import json
 from datetime import datetime
-import hashlib
 import secrets
 import os
+import logging
+import threading
+import time
+from password_hashing import PasswordHasher, HashingQueueFull, LEGACY_SCHEME
+from metrics import env_flag
+
+logger = logging.getLogger(__name__)
 
 class QuizDatabase:
     """מחלקה לניהול מסד נתונים של ציונים ומשתמשים"""
     
     def __init__(self, db_path="quiz_results.db"):
         self.db_path = db_path
+        self.password_hasher = PasswordHasher()
         self.init_database()
     
     def init_database(self):
@@ -17,6 +24,10 @@ class QuizDatabase:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # WAL: קריאות (התחברות, סטטיסטיקות) לא ממתינות לכתיבת תוצאות ולהפך - נשמר בקובץ עצמו
+        if env_flag('CALCMASTER_DB_WAL', True):
+            cursor.execute('PRAGMA journal_mode=WAL')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -24,6 +35,7 @@ class QuizDatabase:
                 email TEXT UNIQUE NOT NULL,
                 password_hash TEXT NOT NULL,
                 salt TEXT NOT NULL,
+                hash_scheme TEXT DEFAULT 'pbkdf2_sha256$100000',
                 display_name TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_login TIMESTAMP,
@@ -43,6 +55,7 @@ class QuizDatabase:
                 date_taken TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 time_spent INTEGER,  -- בשניות
                 details TEXT,  -- JSON עם פרטים נוספים
+                client_result_id TEXT,  -- מזהה מהדפדפן, למניעת כפילויות בסנכרון אופליין
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         ''')
@@ -55,6 +68,7 @@ class QuizDatabase:
                 total_questions INTEGER DEFAULT 0,
                 total_correct INTEGER DEFAULT 0,
                 average_score REAL DEFAULT 0,
+                result_version INTEGER DEFAULT 0,
                 last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
@@ -73,27 +87,56 @@ class QuizDatabase:
             )
         ''')
         
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sessions_expires_at ON user_sessions (expires_at)')
+        
+        # הסברי שאלות בטעינה עצלה - משותפים לכל ה-workers, המפתח הוא hash של התוכן
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_explanations (
+                id TEXT PRIMARY KEY,
+                explanation TEXT NOT NULL,
+                last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_question_explanations_last_used_at ON question_explanations (last_used_at)')
+        
+        self._migrate_schema(cursor)
+        
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_quiz_results_client_id
+            ON quiz_results (user_id, client_result_id)
+        ''')
+        
         conn.commit()
         conn.close()
-        print("✅ מסד נתונים הוכן בהצלחה עם מערכת משתמשים!")
+        logger.info("✅ מסד נתונים הוכן בהצלחה עם מערכת משתמשים!")
+    
+    def _migrate_schema(self, cursor):
+        """הוספת עמודות חדשות למסדי נתונים קיימים"""
+        cursor.execute('PRAGMA table_info(users)')
+        user_columns = {row[1] for row in cursor.fetchall()}
+        if 'hash_scheme' not in user_columns:
+            cursor.execute(f"ALTER TABLE users ADD COLUMN hash_scheme TEXT DEFAULT '{LEGACY_SCHEME}'")
+        
+        cursor.execute('PRAGMA table_info(user_stats)')
+        stats_columns = {row[1] for row in cursor.fetchall()}
+        if 'result_version' not in stats_columns:
+            cursor.execute('ALTER TABLE user_stats ADD COLUMN result_version INTEGER DEFAULT 0')
+        
+        cursor.execute('PRAGMA table_info(quiz_results)')
+        result_columns = {row[1] for row in cursor.fetchall()}
+        if 'client_result_id' not in result_columns:
+            cursor.execute('ALTER TABLE quiz_results ADD COLUMN client_result_id TEXT')
     
     
     def hash_password(self, password):
-        """יצירת hash מאובטח לסיסמה"""
-        salt = secrets.token_hex(32)
-        password_hash = hashlib.pbkdf2_hmac('sha256', 
-                                          password.encode('utf-8'), 
-                                          salt.encode('utf-8'), 
-                                          100000)
-        return password_hash.hex(), salt
+        """יצירת hash מאובטח לסיסמה (ב-thread pool של ה-hashing)"""
+        password_hash, salt, _ = self.password_hasher.hash(password)
+        return password_hash, salt
     
-    def verify_password(self, password, password_hash, salt):
-        """אימות סיסמה"""
-        computed_hash = hashlib.pbkdf2_hmac('sha256',
-                                          password.encode('utf-8'),
-                                          salt.encode('utf-8'),
-                                          100000)
-        return computed_hash.hex() == password_hash
+    def verify_password(self, password, password_hash, salt, scheme=LEGACY_SCHEME):
+        """אימות סיסמה לפי ה-scheme שבו נשמרה"""
+        return self.password_hasher.verify(password, password_hash, salt, scheme)
     
     def create_user(self, username, email, password, display_name=None):
         """יצירת משתמש חדש"""
@@ -106,12 +149,12 @@ class QuizDatabase:
             if cursor.fetchone():
                 return {"success": False, "error": "שם משתמש או אימייל כבר קיימים"}
             
-            password_hash, salt = self.hash_password(password)
+            password_hash, salt, scheme = self.password_hasher.hash(password)
             
             cursor.execute('''
-                INSERT INTO users (username, email, password_hash, salt, display_name)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (username, email, password_hash, salt, display_name or username))
+                INSERT INTO users (username, email, password_hash, salt, hash_scheme, display_name)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (username, email, password_hash, salt, scheme, display_name or username))
             
             user_id = cursor.lastrowid
             
@@ -121,13 +164,16 @@ class QuizDatabase:
             ''', (user_id,))
             
             conn.commit()
-            print(f"✅ משתמש חדש נוצר: {username}")
+            logger.info("✅ משתמש חדש נוצר: %s", username)
             return {"success": True, "user_id": user_id, "message": "משתמש נוצר בהצלחה!"}
             
         except sqlite3.IntegrityError as e:
             return {"success": False, "error": "שם משתמש או אימייל כבר קיימים"}
+        except HashingQueueFull:
+            logger.warning("⚠️ תור ה-hashing מלא - הרשמה נדחתה")
+            return {"success": False, "busy": True, "error": "השרת עמוס, נסה שוב בעוד רגע"}
         except Exception as e:
-            print(f"❌ שגיאה ביצירת משתמש: {e}")
+            logger.error("❌ שגיאה ביצירת משתמש: %s", e)
             return {"success": False, "error": f"שגיאה ביצירת משתמש: {str(e)}"}
         finally:
             if conn:
@@ -141,7 +187,7 @@ class QuizDatabase:
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT id, username, email, password_hash, salt, display_name 
+                SELECT id, username, email, password_hash, salt, display_name, hash_scheme 
                 FROM users 
                 WHERE username = ? AND is_active = 1
             ''', (username,))
@@ -150,9 +196,16 @@ class QuizDatabase:
             if not user:
                 return {"success": False, "error": "שם משתמש או סיסמה שגויים"}
             
-            user_id, username, email, password_hash, salt, display_name = user
+            user_id, username, email, password_hash, salt, display_name, hash_scheme = user
             
-            if self.verify_password(password, password_hash, salt):
+            if self.verify_password(password, password_hash, salt, hash_scheme):
+                if self.password_hasher.needs_rehash(hash_scheme):
+                    # שדרוג שקוף של ה-hash לפרמטרים הנוכחיים - הסיסמה זמינה רק עכשיו
+                    new_hash, new_salt, new_scheme = self.password_hasher.hash(password)
+                    cursor.execute('UPDATE users SET password_hash = ?, salt = ?, hash_scheme = ? WHERE id = ?',
+                                 (new_hash, new_salt, new_scheme, user_id))
+                    logger.info("🔐 hash הסיסמה שודרג למשתמש %s: %s -> %s", user_id, hash_scheme, new_scheme)
+                
                 cursor.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?', 
                              (user_id,))
                 conn.commit()
@@ -169,8 +222,11 @@ class QuizDatabase:
             else:
                 return {"success": False, "error": "שם משתמש או סיסמה שגויים"}
                 
+        except HashingQueueFull:
+            logger.warning("⚠️ תור ה-hashing מלא - התחברות נדחתה")
+            return {"success": False, "busy": True, "error": "השרת עמוס, נסה שוב בעוד רגע"}
         except Exception as e:
-            print(f"❌ שגיאה באימות משתמש: {e}")
+            logger.error("❌ שגיאה באימות משתמש: %s", e)
             return {"success": False, "error": "שגיאה באימות"}
         finally:
             if conn:
@@ -197,7 +253,7 @@ class QuizDatabase:
             return session_token
             
         except Exception as e:
-            print(f"❌ שגיאה ביצירת session: {e}")
+            logger.error("❌ שגיאה ביצירת session: %s", e)
             return None
         finally:
             if conn:
@@ -231,7 +287,7 @@ class QuizDatabase:
             return None
             
         except Exception as e:
-            print(f"❌ שגיאה בקבלת משתמש: {e}")
+            logger.error("❌ שגיאה בקבלת משתמש: %s", e)
             return None
         finally:
             if conn:
@@ -244,44 +300,164 @@ class QuizDatabase:
             conn = sqlite3.connect(self.db_path, timeout=20.0)
             cursor = conn.cursor()
             
-            cursor.execute('UPDATE user_sessions SET is_active = 0 WHERE session_token = ?', 
+            cursor.execute('DELETE FROM user_sessions WHERE session_token = ?', 
                          (session_token,))
             conn.commit()
             return True
             
         except Exception as e:
-            print(f"❌ שגיאה במחיקת session: {e}")
+            logger.error("❌ שגיאה במחיקת session: %s", e)
+            return False
+        finally:
+            if conn:
+                conn.close()
+    
+    def purge_expired_sessions(self, batch_size=1000, max_batches=None, pause=0.05):
+        """מחיקת sessions שפגו או בוטלו במנות חסומות - כל מנה בטרנזקציה קצרה משלה"""
+        conn = None
+        deleted = 0
+        batches = 0
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=20.0)
+            cursor = conn.cursor()
+            
+            while max_batches is None or batches < max_batches:
+                cursor.execute('''
+                    DELETE FROM user_sessions WHERE id IN (
+                        SELECT id FROM user_sessions
+                        WHERE expires_at <= CURRENT_TIMESTAMP OR is_active = 0
+                        LIMIT ?
+                    )
+                ''', (batch_size,))
+                conn.commit()
+                deleted += cursor.rowcount
+                batches += 1
+                if cursor.rowcount < batch_size:
+                    break
+                # משחרר את נעילת הכתיבה בין מנות כדי לא לעכב בקשות
+                time.sleep(pause)
+            
+            if deleted:
+                logger.info("🧹 נמחקו %s sessions שפגו", deleted)
+            return deleted
+            
+        except sqlite3.OperationalError as e:
+            logger.error("❌ שגיאה בניקוי sessions: %s", e)
+            return deleted
+        finally:
+            if conn:
+                conn.close()
+    
+    
+    def save_explanations(self, explanations):
+        """שמירת הסברים {id: טקסט} בטרנזקציה אחת - הסבר קיים רק מתעדכן בזמן השימוש"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=20.0)
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO question_explanations (id, explanation) VALUES (?, ?)
+                ON CONFLICT(id) DO UPDATE SET last_used_at = CURRENT_TIMESTAMP
+            ''', explanations.items())
+            conn.commit()
+            return True
+            
+        except Exception as e:
+            logger.error("❌ שגיאה בשמירת הסברים: %s", e)
             return False
         finally:
             if conn:
                 conn.close()
     
+    def get_explanation(self, explanation_id):
+        """טקסט ההסבר, או None אם לא קיים (או נמחק בניקוי)"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=20.0)
+            cursor = conn.cursor()
+            cursor.execute('SELECT explanation FROM question_explanations WHERE id = ?', (explanation_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+            
+        except Exception as e:
+            logger.error("❌ שגיאה בקבלת הסבר: %s", e)
+            return None
+        finally:
+            if conn:
+                conn.close()
     
-    def save_quiz_result(self, user_id, topic, score, total_questions, time_spent=None, details=None):
+    def purge_stale_explanations(self, max_age_days=7):
+        """מחיקת הסברים שלא הוגשו במבחן כבר max_age_days ימים"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=20.0)
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM question_explanations WHERE last_used_at <= datetime('now', ?)
+            ''', (f'-{int(max_age_days)} days',))
+            conn.commit()
+            if cursor.rowcount:
+                logger.info("🧹 נמחקו %s הסברים ישנים", cursor.rowcount)
+            return cursor.rowcount
+            
+        except sqlite3.OperationalError as e:
+            logger.error("❌ שגיאה בניקוי הסברים: %s", e)
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def save_quiz_result(self, user_id, topic, score, total_questions, time_spent=None, details=None,
+                         client_result_id=None):
         """שמירת תוצאת מבחן למשתמש ספציפי"""
         percentage = (score / total_questions) * 100 if total_questions > 0 else 0
-        difficulty = details.get('difficulty', 'mixed') if details else 'mixed'
         
         conn = None
         try:
             conn = sqlite3.connect(self.db_path, timeout=20.0)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT INTO quiz_results (user_id, topic, score, total_questions, percentage, difficulty, time_spent, details)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (user_id, topic, score, total_questions, percentage, difficulty, time_spent, json.dumps(details) if details else None))
+            result_id, _ = self._insert_quiz_result(cursor, user_id, topic, score, total_questions,
+                                                    time_spent, details, client_result_id)
             
-            result_id = cursor.lastrowid
+            conn.commit()
+            logger.info("✅ נשמר למשתמש %s: %s - %s/%s (%.1f%%)", user_id, topic, score, total_questions, percentage)
+            return result_id
+            
+        except sqlite3.OperationalError as e:
+            logger.error("❌ שגיאה במסד נתונים: %s", e)
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+    
+    def save_quiz_results_batch(self, user_id, results):
+        """שמירת כמה תוצאות (סנכרון אופליין) בטרנזקציה אחת - תוצאה עם client_result_id שכבר נשמר מדולגת"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=20.0)
+            cursor = conn.cursor()
             
-            self._update_user_stats_in_same_connection(cursor, user_id, score, total_questions)
+            saved = []
+            for result in results:
+                result_id, inserted = self._insert_quiz_result(
+                    cursor, user_id, result['topic'], result['score'], result['total_questions'],
+                    result.get('time_spent'), result.get('details'), result.get('client_result_id'))
+                saved.append({
+                    'client_result_id': result.get('client_result_id'),
+                    'result_id': result_id,
+                    'duplicate': not inserted
+                })
             
             conn.commit()
-            print(f"✅ נשמר למשתמש {user_id}: {topic} - {score}/{total_questions} ({percentage:.1f}%)")
-            return result_id
+            logger.info("✅ נשמרו למשתמש %s %s תוצאות מסנכרון (%s כפולות)", user_id,
+                        len(saved), sum(1 for item in saved if item['duplicate']))
+            return saved
             
         except sqlite3.OperationalError as e:
-            print(f"❌ שגיאה במסד נתונים: {e}")
+            logger.error("❌ שגיאה במסד נתונים: %s", e)
             if conn:
                 conn.rollback()
             raise
@@ -289,6 +465,38 @@ class QuizDatabase:
             if conn:
                 conn.close()
     
+    def _insert_quiz_result(self, cursor, user_id, topic, score, total_questions, time_spent, details,
+                            client_result_id):
+        """מחזיר (result_id, inserted) - אם client_result_id כבר נשמר מוחזרת השורה הקיימת"""
+        if client_result_id:
+            existing = self._find_client_result(cursor, user_id, client_result_id)
+            if existing:
+                return existing, False
+        
+        percentage = (score / total_questions) * 100 if total_questions > 0 else 0
+        difficulty = details.get('difficulty', 'mixed') if details else 'mixed'
+        try:
+            cursor.execute('''
+                INSERT INTO quiz_results (user_id, topic, score, total_questions, percentage, difficulty, time_spent,
+                                          details, client_result_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, topic, score, total_questions, percentage, difficulty, time_spent,
+                  json.dumps(details) if details else None, client_result_id))
+        except sqlite3.IntegrityError:
+            # סנכרון מקביל של אותה תוצאה הקדים אותנו
+            return self._find_client_result(cursor, user_id, client_result_id), False
+        
+        result_id = cursor.lastrowid
+        self._update_user_stats_in_same_connection(cursor, user_id, score, total_questions)
+        return result_id, True
+    
+    @staticmethod
+    def _find_client_result(cursor, user_id, client_result_id):
+        cursor.execute('SELECT id FROM quiz_results WHERE user_id = ? AND client_result_id = ?',
+                       (user_id, client_result_id))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
     def _update_user_stats_in_same_connection(self, cursor, user_id, score, total_questions):
         """עדכון סטטיסטיקות משתמש באותה חיבור - FIXED VERSION"""
         cursor.execute('''
@@ -313,16 +521,30 @@ class QuizDatabase:
                     total_questions = ?,
                     total_correct = ?,
                     average_score = ?,
+                    result_version = result_version + 1,
                     last_updated = CURRENT_TIMESTAMP
                 WHERE user_id = ?
             ''', (new_total_quizzes, new_total_questions, new_total_correct, new_average, user_id))
         else:
             average = (score / total_questions) * 100 if total_questions > 0 else 0
             cursor.execute('''
-                INSERT INTO user_stats (user_id, total_quizzes, total_questions, total_correct, average_score)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO user_stats (user_id, total_quizzes, total_questions, total_correct, average_score, result_version)
+                VALUES (?, ?, ?, ?, ?, 1)
             ''', (user_id, 1, total_questions, score, average))
     
+    def get_user_result_version(self, user_id):
+        """גרסת התוצאות של המשתמש - עולה בכל שמירת מבחן, משמשת ל-ETag ול-cache"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=20.0)
+            cursor = conn.cursor()
+            cursor.execute('SELECT result_version FROM user_stats WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            return (row[0] or 0) if row else 0
+        finally:
+            if conn:
+                conn.close()
+    
     def get_user_recent_results(self, user_id, limit=10):
         """קבלת התוצאות האחרונות של משתמש"""
         conn = None
@@ -330,28 +552,10 @@ class QuizDatabase:
             conn = sqlite3.connect(self.db_path, timeout=20.0)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT topic, score, total_questions, percentage, date_taken, time_spent, difficulty
-                FROM quiz_results 
-                WHERE user_id = ?
-                ORDER BY date_taken DESC 
-                LIMIT ?
-            ''', (user_id, limit))
-            
-            results = cursor.fetchall()
-            
-            return [{
-                'topic': row[0],
-                'score': row[1],
-                'total_questions': row[2],
-                'percentage': row[3],
-                'date': row[4],
-                'time_spent': row[5],
-                'difficulty': row[6]
-            } for row in results]
+            return self._query_recent_results(cursor, user_id, limit)
             
         except sqlite3.OperationalError as e:
-            print(f"❌ שגיאה בקריאת נתונים: {e}")
+            logger.error("❌ שגיאה בקריאת נתונים: %s", e)
             return []
         finally:
             if conn:
@@ -364,35 +568,10 @@ class QuizDatabase:
             conn = sqlite3.connect(self.db_path, timeout=20.0)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT 
-                    topic,
-                    COUNT(*) as attempts,
-                    AVG(percentage) as avg_score,
-                    MAX(percentage) as best_score,
-                    MIN(percentage) as worst_score,
-                    SUM(total_questions) as total_questions,
-                    SUM(score) as total_correct
-                FROM quiz_results 
-                WHERE user_id = ?
-                GROUP BY topic
-                ORDER BY avg_score DESC
-            ''', (user_id,))
-            
-            results = cursor.fetchall()
-            
-            return [{
-                'topic': row[0],
-                'attempts': row[1],
-                'avg_score': round(row[2], 1),
-                'best_score': round(row[3], 1),
-                'worst_score': round(row[4], 1),
-                'total_questions': row[5],
-                'total_correct': row[6]
-            } for row in results]
+            return self._query_stats_by_topic(cursor, user_id)
             
         except Exception as e:
-            print(f"❌ שגיאה בקבלת סטטיסטיקות: {e}")
+            logger.error("❌ שגיאה בקבלת סטטיסטיקות: %s", e)
             return []
         finally:
             if conn:
@@ -405,30 +584,10 @@ class QuizDatabase:
             conn = sqlite3.connect(self.db_path, timeout=20.0)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT user_id, total_quizzes, total_questions, total_correct, average_score 
-                FROM user_stats 
-                WHERE user_id = ?
-            ''', (user_id,))
-            stats = cursor.fetchone()
-            
-            if not stats:
-                return {
-                    'total_quizzes': 0,
-                    'total_questions': 0,
-                    'total_correct': 0,
-                    'average_score': 0
-                }
-            
-            return {
-                'total_quizzes': stats[1],  # total_quizzes
-                'total_questions': stats[2],  # total_questions
-                'total_correct': stats[3],  # total_correct
-                'average_score': round(stats[4], 1)  # average_score
-            }
+            return self._query_general_stats(cursor, user_id)
             
         except Exception as e:
-            print(f"❌ שגיאה בקבלת סטטיסטיקות: {e}")
+            logger.error("❌ שגיאה בקבלת סטטיסטיקות: %s", e)
             return {
                 'total_quizzes': 0,
                 'total_questions': 0,
@@ -446,28 +605,161 @@ class QuizDatabase:
             conn = sqlite3.connect(self.db_path, timeout=20.0)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT 
-                    DATE(date_taken) as date,
-                    AVG(percentage) as avg_score,
-                    COUNT(*) as quizzes_taken
-                FROM quiz_results 
-                WHERE user_id = ? AND date_taken >= datetime('now', '-{} days')
-                GROUP BY DATE(date_taken)
-                ORDER BY date
-            '''.format(days), (user_id,))
-            
-            results = cursor.fetchall()
-            
-            return [{
-                'date': row[0],
-                'avg_score': round(row[1], 1),
-                'quizzes_taken': row[2]
-            } for row in results]
+            return self._query_progress(cursor, user_id, days)
             
         except Exception as e:
-            print(f"❌ שגיאה בקבלת התקדמות: {e}")
+            logger.error("❌ שגיאה בקבלת התקדמות: %s", e)
             return []
         finally:
             if conn:
-                conn.close()
\ No newline at end of file
+                conn.close()
+
+    DASHBOARD_FIELDS = ('general', 'by_topic', 'recent', 'progress')
+
+    def get_user_dashboard(self, user_id, fields=DASHBOARD_FIELDS, recent_limit=5, days=30):
+        """כל נתוני עמוד הסיכום בחיבור אחד ובטרנזקציית קריאה אחת - תמונת מצב עקבית"""
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=20.0, isolation_level=None)
+            cursor = conn.cursor()
+            cursor.execute('BEGIN')
+            
+            dashboard = {}
+            if 'general' in fields:
+                dashboard['general'] = self._query_general_stats(cursor, user_id)
+            if 'by_topic' in fields:
+                dashboard['by_topic'] = self._query_stats_by_topic(cursor, user_id)
+            if 'recent' in fields:
+                dashboard['recent'] = self._query_recent_results(cursor, user_id, recent_limit)
+            if 'progress' in fields:
+                dashboard['progress'] = self._query_progress(cursor, user_id, days)
+            
+            cursor.execute('COMMIT')
+            return dashboard
+            
+        except Exception as e:
+            logger.error("❌ שגיאה בקבלת נתוני לוח הבקרה: %s", e)
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _query_recent_results(cursor, user_id, limit):
+        cursor.execute('''
+            SELECT topic, score, total_questions, percentage, date_taken, time_spent, difficulty
+            FROM quiz_results 
+            WHERE user_id = ?
+            ORDER BY date_taken DESC 
+            LIMIT ?
+        ''', (user_id, limit))
+        
+        return [{
+            'topic': row[0],
+            'score': row[1],
+            'total_questions': row[2],
+            'percentage': row[3],
+            'date': row[4],
+            'time_spent': row[5],
+            'difficulty': row[6]
+        } for row in cursor.fetchall()]
+
+    @staticmethod
+    def _query_stats_by_topic(cursor, user_id):
+        cursor.execute('''
+            SELECT 
+                topic,
+                COUNT(*) as attempts,
+                AVG(percentage) as avg_score,
+                MAX(percentage) as best_score,
+                MIN(percentage) as worst_score,
+                SUM(total_questions) as total_questions,
+                SUM(score) as total_correct
+            FROM quiz_results 
+            WHERE user_id = ?
+            GROUP BY topic
+            ORDER BY avg_score DESC
+        ''', (user_id,))
+        
+        return [{
+            'topic': row[0],
+            'attempts': row[1],
+            'avg_score': round(row[2], 1),
+            'best_score': round(row[3], 1),
+            'worst_score': round(row[4], 1),
+            'total_questions': row[5],
+            'total_correct': row[6]
+        } for row in cursor.fetchall()]
+
+    @staticmethod
+    def _query_general_stats(cursor, user_id):
+        cursor.execute('''
+            SELECT user_id, total_quizzes, total_questions, total_correct, average_score 
+            FROM user_stats 
+            WHERE user_id = ?
+        ''', (user_id,))
+        stats = cursor.fetchone()
+        
+        if not stats:
+            return {
+                'total_quizzes': 0,
+                'total_questions': 0,
+                'total_correct': 0,
+                'average_score': 0
+            }
+        
+        return {
+            'total_quizzes': stats[1],  # total_quizzes
+            'total_questions': stats[2],  # total_questions
+            'total_correct': stats[3],  # total_correct
+            'average_score': round(stats[4], 1)  # average_score
+        }
+
+    @staticmethod
+    def _query_progress(cursor, user_id, days):
+        cursor.execute('''
+            SELECT 
+                DATE(date_taken) as date,
+                AVG(percentage) as avg_score,
+                COUNT(*) as quizzes_taken
+            FROM quiz_results 
+            WHERE user_id = ? AND date_taken >= datetime('now', ?)
+            GROUP BY DATE(date_taken)
+            ORDER BY date
+        ''', (user_id, '-{} days'.format(int(days))))
+        
+        return [{
+            'date': row[0],
+            'avg_score': round(row[1], 1),
+            'quizzes_taken': row[2]
+        } for row in cursor.fetchall()]
+
+
+class SessionSweeper:
+    """thread רקע שמנקה מעת לעת sessions שפגו והסברים שלא בשימוש"""
+    
+    def __init__(self, db, interval=None, batch_size=1000):
+        self.db = db
+        self.interval = interval if interval is not None else float(
+            os.environ.get('CALCMASTER_SESSION_SWEEP_INTERVAL', 3600))
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='session-sweeper', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.db.purge_expired_sessions(self.batch_size)
+                self.db.purge_stale_explanations()
+            except Exception as e:
+                logger.error("❌ שגיאה ב-session sweeper: %s", e)
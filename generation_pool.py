@@ -0,0 +1,127 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+GENERATION_TOPICS = ('derivatives', 'integrals', 'limits', 'criticalpoints', 'general')
+GENERATION_DIFFICULTIES = ('easy', 'medium', 'hard')
+
+metrics.describe('calcmaster_generation_queue_seconds', 'Time a quiz generation waited for a generation worker process')
+metrics.describe('calcmaster_generation_rejected_total', 'Quiz generations rejected because the generation queue was full')
+
+# המחולל בתהליכי העבודה - עובר אליהם ב-fork (copy-on-write), כולל המאגרים וה-caches החמים
+_worker_generator = None
+
+
+class GenerationQueueFull(Exception):
+    """התור של תהליכי יצירת השאלות מלא - השרת עמוס מדי"""
+
+
+def generate_topic_questions(question_gen, topic, difficulty, count):
+    """שאלות לנושא - easy/medium/hard לפי רמה, כל ערך אחר (basic/mixed) הוא תערובת של הנושא"""
+    if topic == 'general':
+        return question_gen.generate_mixed_questions(count)
+    generator = {
+        'derivatives': question_gen.derivatives,
+        'integrals': question_gen.integrals,
+        'limits': question_gen.limits,
+        'criticalpoints': question_gen.critical_points,
+    }[topic]
+    if difficulty in GENERATION_DIFFICULTIES:
+        return generator.generate_questions(count, difficulty)
+    return generator.generate_questions(count)
+
+
+def _init_worker():
+    # מדדים מתהליך בן לא מגיעים ל-/metrics, ונעילה שהוחזקה ברגע ה-fork הייתה תוקעת אותו
+    metrics.enabled = False
+    _worker_generator.derivatives.math.after_fork()
+
+
+def _generate_in_worker(topic, difficulty, count, submitted):
+    waited = time.time() - submitted
+    return waited, generate_topic_questions(_worker_generator, topic, difficulty, count)
+
+
+class GenerationPool:
+    """מריץ את יצירת השאלות בתהליכים נפרדים עם תור חסום
+
+    SymPy מחזיק את ה-GIL לאורך כל החישוב, כך שיצירה ב-threads של השרת
+    מעכבת גם התחברות, סטטיסטיקות ושמירת תוצאות. כאן ה-thread של הבקשה רק
+    ממתין לתוצאה. CALCMASTER_GENERATION_WORKERS=0 (ברירת המחדל בהרצה ישירה
+    של app.py) - יצירה ב-thread של הבקשה; wsgi.py (gunicorn) קובע 1 אם לא הוגדר.
+    """
+
+    def __init__(self, question_gen, max_workers=None, max_queue=None, queue_timeout=None):
+        self.question_gen = question_gen
+        self.max_workers = max_workers if max_workers is not None else int(
+            os.environ.get('CALCMASTER_GENERATION_WORKERS', 0))
+        self.max_queue = max_queue if max_queue is not None else int(
+            os.environ.get('CALCMASTER_GENERATION_QUEUE', 32))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(
+            os.environ.get('CALCMASTER_GENERATION_QUEUE_TIMEOUT', 30))
+        if self.max_workers and 'fork' not in multiprocessing.get_all_start_methods():
+            logger.warning("⚠️ אין fork בפלטפורמה הזו - יצירת השאלות תרוץ בתהליך הראשי")
+            self.max_workers = 0
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_workers > 0
+
+    def _get_executor(self):
+        global _worker_generator
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    _worker_generator = self.question_gen
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         mp_context=multiprocessing.get_context('fork'),
+                                                         initializer=_init_worker)
+        return self._executor
+
+    def start(self):
+        """יוצר את תהליכי העבודה מיד - רצוי לפני שהשרת פותח threads"""
+        if self.enabled:
+            self._get_executor().submit(int).result()
+            logger.info("✅ %s תהליכי יצירת שאלות מוכנים", self.max_workers)
+
+    def generate(self, topic, difficulty, count):
+        if topic not in GENERATION_TOPICS:
+            raise ValueError(f"Unknown topic: {topic}")
+        if not self.enabled:
+            return generate_topic_questions(self.question_gen, topic, difficulty, count)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            metrics.inc('calcmaster_generation_rejected_total')
+            raise GenerationQueueFull("Question generation queue is full")
+        try:
+            executor = self._get_executor()
+            waited, questions = executor.submit(_generate_in_worker, topic, difficulty, count, time.time()).result()
+        except BrokenProcessPool:
+            # תהליך עבודה נפל - הבקשה הבאה תקבל pool חדש, והנוכחית נוצרת כאן
+            logger.error("❌ תהליך יצירת שאלות נפל - יוצר pool חדש")
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            return generate_topic_questions(self.question_gen, topic, difficulty, count)
+        finally:
+            self._slots.release()
+
+        metrics.observe('calcmaster_generation_queue_seconds', waited, topic=topic)
+        return questions
+
+    def shutdown(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,26 @@
+import os
+
+# gunicorn -c gunicorn.conf.py wsgi:application
+bind = os.environ.get('CALCMASTER_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('CALCMASTER_WORKERS', os.cpu_count() or 1))
+threads = int(os.environ.get('CALCMASTER_THREADS', 4))
+
+# המחוללים ומסד הנתונים נבנים בתהליך הראשי לפני fork; ה-socket נפתח רק אחרי ה-warm-up
+preload_app = True
+
+# יצירת מבחן קשה לוקחת כמה שניות - ברירת המחדל (30) קרובה מדי
+timeout = int(os.environ.get('CALCMASTER_WORKER_TIMEOUT', 120))
+graceful_timeout = 30
+max_requests = int(os.environ.get('CALCMASTER_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def post_fork(server, worker):
+    from app import start_background_services
+    start_background_services()
+
+
+def worker_exit(server, worker):
+    from app import generation_pool, quiz_reservations
+    generation_pool.shutdown()
+    quiz_reservations.shutdown()
@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# גבולות ה-buckets בשניות - מכסים גם diff מהיר וגם integrate איטי
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_TIMER = nullcontext()
+
+
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Histogram:
+    """היסטוגרמה מצטברת בפורמט של Prometheus"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """רישום מדדים (מונים והיסטוגרמות) עם ייצוא בפורמט טקסט של Prometheus"""
+
+    def __init__(self, enabled=None):
+        self.enabled = env_flag('CALCMASTER_METRICS') if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._buckets = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def set_buckets(self, name, buckets):
+        """buckets מותאמים למדד שאינו זמן (למשל גודל בבתים)"""
+        self._buckets[name] = tuple(buckets)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def timer(self, name, **labels):
+        """מודד זמן של בלוק - כשהמדדים כבויים מחזיר context ריק ללא עלות"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def cache_hit(self, cache):
+        self.inc('calcmaster_cache_requests_total', cache=cache, result='hit')
+
+    def cache_miss(self, cache):
+        self.inc('calcmaster_cache_requests_total', cache=cache, result='miss')
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self):
+        """ייצוא כל המדדים בפורמט text/plain של Prometheus"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (h.buckets, list(h.counts), h.sum, h.count)
+                          for key, h in self._histograms.items()}
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            self._write_header(lines, name, 'counter')
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        hit_ratio_lines = self._cache_hit_ratios(counters)
+        if hit_ratio_lines:
+            self._write_header(lines, 'calcmaster_cache_hit_ratio', 'gauge')
+            lines.extend(hit_ratio_lines)
+
+        for name in sorted({name for name, _ in histograms}):
+            self._write_header(lines, name, 'histogram')
+            for (metric, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (('le', _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def _write_header(self, lines, name, metric_type):
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    def _cache_hit_ratios(self, counters):
+        totals = {}
+        for (name, labels), value in counters.items():
+            if name != 'calcmaster_cache_requests_total':
+                continue
+            label_map = dict(labels)
+            hits, requests = totals.get(label_map['cache'], (0, 0))
+            if label_map['result'] == 'hit':
+                hits += value
+            totals[label_map['cache']] = (hits, requests + value)
+
+        return [f"calcmaster_cache_hit_ratio{_format_labels((('cache', cache),))} {_format_value(hits / requests)}"
+                for cache, (hits, requests) in sorted(totals.items()) if requests]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+metrics = MetricsRegistry()
+metrics.describe('calcmaster_generation_stage_seconds', 'Time spent in each question generation stage')
+metrics.describe('calcmaster_pool_function_seconds', 'Time to build one question for a pool function')
+metrics.describe('calcmaster_questions_generated_total', 'Questions generated per generator')
+metrics.describe('calcmaster_cache_requests_total', 'Cache lookups by cache and result')
+metrics.describe('calcmaster_cache_hit_ratio', 'Cache hits divided by lookups')
+metrics.describe('calcmaster_http_request_seconds', 'HTTP request latency per endpoint')
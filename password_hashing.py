@@ -0,0 +1,86 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+from metrics import metrics
+
+# הפורמט של hash_scheme: "<algorithm>$<params>" - נשמר לכל משתמש כדי שאפשר יהיה לשדרג בשקיפות
+LEGACY_SCHEME = 'pbkdf2_sha256$100000'
+DEFAULT_SCHEME = os.environ.get('CALCMASTER_PASSWORD_SCHEME', LEGACY_SCHEME)
+
+metrics.describe('calcmaster_password_hash_queue_seconds', 'Time a password hash waited for a free hashing slot')
+metrics.describe('calcmaster_password_hash_seconds', 'Time spent computing a password hash')
+metrics.describe('calcmaster_password_hash_rejected_total', 'Password hashes rejected because the queue was full')
+
+
+class HashingQueueFull(Exception):
+    """התור של מחשבי ה-hash מלא - השרת עמוס מדי"""
+
+
+def compute_hash(password, salt, scheme):
+    """חישוב hash לפי scheme - pbkdf2_sha256$<iterations> או scrypt$<n>$<r>$<p>"""
+    algorithm, _, params = scheme.partition('$')
+    if algorithm == 'pbkdf2_sha256':
+        iterations = int(params)
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations)
+    elif algorithm == 'scrypt':
+        n, r, p = (int(value) for value in params.split('$'))
+        digest = hashlib.scrypt(password.encode('utf-8'), salt=salt.encode('utf-8'), n=n, r=r, p=p,
+                                maxmem=128 * n * r * p + 1024 * 1024, dklen=32)
+    else:
+        raise ValueError(f"Unknown password hash scheme: {scheme}")
+    return digest.hex()
+
+
+class PasswordHasher:
+    """חישובי hash עם מקביליות ותור חסומים
+
+    החישוב רץ ב-thread של הבקשה עצמה - הבקשה ממתינה לו בכל מקרה, ו-pbkdf2_hmac
+    ו-scrypt כבר משחררים את ה-GIL. מה שהמחלקה מספקת הוא גבול: לכל היותר
+    max_workers חישובים במקביל (כך שהתחברויות רבות בתחילת שיעור לא תופסות את כל
+    ה-CPU), ולכל היותר max_queue ממתינים - מעבר לזה HashingQueueFull (503).
+    """
+
+    def __init__(self, scheme=None, max_workers=None, max_queue=None, queue_timeout=None):
+        self.scheme = scheme or DEFAULT_SCHEME
+        self.max_workers = max_workers or int(os.environ.get('CALCMASTER_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get('CALCMASTER_HASH_QUEUE', 64))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(
+            os.environ.get('CALCMASTER_HASH_QUEUE_TIMEOUT', 10))
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._workers = threading.BoundedSemaphore(self.max_workers)
+
+    def _run(self, password, salt, scheme):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            metrics.inc('calcmaster_password_hash_rejected_total')
+            raise HashingQueueFull("Password hashing queue is full")
+        try:
+            submitted = time.perf_counter()
+            with self._workers:
+                return self._timed_hash(password, salt, scheme, submitted)
+        finally:
+            self._slots.release()
+
+    def _timed_hash(self, password, salt, scheme, submitted):
+        started = time.perf_counter()
+        metrics.observe('calcmaster_password_hash_queue_seconds', started - submitted)
+        try:
+            return compute_hash(password, salt, scheme)
+        finally:
+            metrics.observe('calcmaster_password_hash_seconds', time.perf_counter() - started,
+                            scheme=scheme.partition('$')[0])
+
+    def hash(self, password):
+        """מחזיר (hash, salt, scheme) לפי ה-scheme הנוכחי"""
+        salt = secrets.token_hex(32)
+        return self._run(password, salt, self.scheme), salt, self.scheme
+
+    def verify(self, password, password_hash, salt, scheme=None):
+        computed = self._run(password, salt, scheme or LEGACY_SCHEME)
+        return hmac.compare_digest(computed, password_hash)
+
+    def needs_rehash(self, scheme):
+        return (scheme or LEGACY_SCHEME) != self.scheme
@@ -2,6 +2,10 @@ from .derivatives import DerivativesGenerator
 from .integrals import IntegralsGenerator
 from .limits import LimitsGenerator
 from .critical_points import CriticalPointsGenerator
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 # מחלקה ראשית שמאחדת את כולם
 class QuestionGenerator:
@@ -10,7 +14,15 @@ class QuestionGenerator:
         self.integrals = IntegralsGenerator()
         self.limits = LimitsGenerator()
         self.critical_points = CriticalPointsGenerator()
-        print("✅ כל מחוללי השאלות מוכנים!")
+        logger.info("✅ כל מחוללי השאלות מוכנים!")
+    
+    def warm_up(self):
+        """מילוי ה-caches הסימבוליים של כל המאגרים - מחזיר כמה פריטים חושבו"""
+        start = time.perf_counter()
+        entries = sum(generator.warm_up() for generator in
+                      (self.derivatives, self.integrals, self.limits, self.critical_points))
+        logger.info("🔥 %s פריטי מאגר חושבו מראש (%.1f שניות)", entries, time.perf_counter() - start)
+        return entries
     
     def generate_derivative_questions(self, count=10):
         return self.derivatives.generate_questions(count)
@@ -1,19 +1,78 @@
 from sympy import symbols, diff, integrate, latex, sin, cos, tan, exp, log, sqrt, solve, limit
+from metrics import metrics, env_flag
+from .math_render import math_renderer
+import logging
 import random
 
+logger = logging.getLogger(__name__)
+
 class BaseQuestionGenerator:    
+    topic = 'base'
+    
     def __init__(self):
         self.x = symbols('x')
-        print(f"✅ {self.__class__.__name__} מוכן!")
+        self.cache_enabled = env_flag('CALCMASTER_SYMBOLIC_CACHE', default=True)
+        self._caches = {}
+        self.math = math_renderer
+        logger.info("✅ %s מוכן!", self.__class__.__name__)
+    
+    def stage(self, stage):
+        """טיימר לשלב ביצירת שאלה (symbolic, normalize, distractors, latex, explanation)"""
+        return metrics.timer('calcmaster_generation_stage_seconds', generator=self.topic, stage=stage)
+    
+    def pool_function_timer(self, func, difficulty):
+        """טיימר לזמן יצירת שאלה שלמה עבור פונקציה מתוך המאגר"""
+        if not metrics.enabled:
+            return self.stage('question')
+        return metrics.timer('calcmaster_pool_function_seconds', generator=self.topic,
+                             difficulty=difficulty, function=str(func))
+    
+    def cached(self, cache_name, key, compute):
+        """מחזיר תוצאה שמורה לפי מפתח או מחשב ושומר - המאגרים קבועים ולכן התוצאות דטרמיניסטיות"""
+        if not self.cache_enabled:
+            return compute()
+        
+        cache = self._caches.setdefault(cache_name, {})
+        full_name = f"{self.topic}.{cache_name}"
+        if key in cache:
+            metrics.cache_hit(full_name)
+            return cache[key]
+        
+        metrics.cache_miss(full_name)
+        value = compute()
+        cache[key] = value
+        return value
+    
+    def clear_caches(self):
+        self._caches.clear()
+        self.math.clear()
+    
+    def symbolic_entries(self):
+        """(cache_name, key, compute) לכל פריט במאגר - אותם מפתחות כמו ב-generate_questions"""
+        return []
+    
+    def warm_up(self):
+        """חישוב מראש של כל המאגר - בתהליך הראשי לפני fork, כך שה-workers חולקים את ה-caches"""
+        if not self.cache_enabled:
+            return 0
+        entries = self.symbolic_entries()
+        for cache_name, key, compute in entries:
+            self.cached(cache_name, key, compute)
+        return len(entries)
     
     def format_question(self, question_text, options, correct_answer, explanation, question_id=None):
-        return {
+        metrics.inc('calcmaster_questions_generated_total', generator=self.topic)
+        question = {
             "id": question_id,
             "question": question_text,
             "options": options,
             "correct": correct_answer,
             "explanation": explanation
         }
+        if self.math.enabled:
+            with self.stage('mathml'):
+                question["mathml"] = self.math.render_question(question_text, options)
+        return question
     
     def generate_wrong_answers(self, correct_answer, common_wrongs=None):
         if common_wrongs is None:
@@ -1,8 +1,15 @@
 from .base_generator import BaseQuestionGenerator
-from sympy import diff, latex, solve, sin, cos, exp, log, pi, simplify
+from .function_analysis import NO_EXTREMA, analyze_function, format_points, format_x
+from .polynomial_analysis import CriticalPoint, KIND_NAMES, INFLECTION, MAXIMUM, MINIMUM
+from sympy import E, S, latex, sin, cos, exp, log, oo, pi, sqrt
+from app_logging import sample_debug
+import logging
 import random
 
+logger = logging.getLogger(__name__)
+
 class CriticalPointsGenerator(BaseQuestionGenerator):
+    topic = 'criticalpoints'
     
     def __init__(self):
         super().__init__()
@@ -29,7 +36,7 @@ class CriticalPointsGenerator(BaseQuestionGenerator):
             (self.x**3 - 6*self.x**2 + 9*self.x, "x = 1, 3", "מעוקב מורכב"),
             (self.x**4 - 4*self.x**2, "x = -√2, 0, √2", "פולינום מדרגה 4"),
             (self.x**4 - 2*self.x**2 + 1, "x = -1, 0, 1", "פולינום זוגי"),
-            (2*self.x**3 - 6*self.x**2 + 6*self.x, "x = 1", "מעוקב עם נקודת פיתול"),
+            (2*self.x**3 - 6*self.x**2 + 6*self.x, NO_EXTREMA, "מעוקב עם נקודת פיתול"),
             (self.x**3 - 12*self.x + 16, "x = -2, 2", "מעוקב עם שורש"),
             (-self.x**3 + 3*self.x**2, "x = 0, 2", "מעוקב שלילי"),
             (self.x**4 - 8*self.x**2 + 16, "x = -2, 0, 2", "פולינום מדרגה 4 מורכב")
@@ -43,7 +50,7 @@ class CriticalPointsGenerator(BaseQuestionGenerator):
             (log(self.x) - self.x, "x = 1", "לוגריתם מינוס ליניארי"),
             (self.x**2*log(self.x), "x = 1/√e", "פולינום כפול לוגריתם"),
             (exp(self.x) - self.x, "x = 0", "אקספוננט מינוס ליניארי"),
-            (sin(self.x) + cos(self.x), "x = 3π/4 + 2πn", "סכום טריגונומטרי"),
+            (sin(self.x) + cos(self.x), "x = π/4 + πn", "סכום טריגונומטרי"),
             (self.x*sin(self.x), "x = tan(x)", "מכפלה טריגונומטרית מורכבת"),
             (self.x**2/(self.x**2 + 1), "x = 0", "פונקציית רציונלית"),
             (log(self.x**2 + 1), "x = 0", "לוגריתם של פולינום")
@@ -55,6 +62,14 @@ class CriticalPointsGenerator(BaseQuestionGenerator):
             'medium': 'בינוני 🟡', 
             'hard': 'קשה 🔴'
         }
+        
+        # משקל כל סוג שאלה - כולם נגזרים מאותו ניתוח שמור של הפונקציה
+        self.question_types = {
+            'location': 4,
+            'type': 2,
+            'value': 2,
+            'monotonic': 2,
+        }
     
     def generate_questions(self, count=10, difficulty='mixed'):
         """יוצר שאלות נקודות קיצון לפי רמת קושי"""
@@ -81,46 +96,52 @@ class CriticalPointsGenerator(BaseQuestionGenerator):
                 method = "פרבולה פשוטה"
                 current_difficulty = 'easy'
             
-            try:
-                derivative = diff(func, self.x)
+            with self.pool_function_timer(func, current_difficulty):
+                analysis = self.cached('function_analysis', func, lambda: self._analyze_function(func))
+                question_type = self._choose_question_type(analysis)
                 
-                # ניסיון לפתור את המשוואה f'(x) = 0
-                try:
-                    critical_points = solve(derivative, self.x)
-                    if critical_points:
-                        # המרה לפורמט יפה
-                        points_str = self._format_critical_points(critical_points)
-                        if points_str and points_str != "אין פתרון":
-                            calculated_answer = points_str
-                        else:
-                            calculated_answer = expected_answer
-                    else:
-                        calculated_answer = "אין נקודות קיצון"
-                except:
-                    calculated_answer = expected_answer
-                    
-            except:
-                calculated_answer = expected_answer
-                derivative = diff(func, self.x)
-            
-            print(f"פונקציה: {latex(func)} | נקודות: {calculated_answer} | קושי: {current_difficulty}")
-            
-            wrong_answers = self._generate_wrong_answers(calculated_answer, current_difficulty)
-            all_options = self.shuffle_options(calculated_answer, wrong_answers)
-            explanation = self._generate_detailed_explanation(func, derivative, calculated_answer, method, current_difficulty)
-            
-            question = self.format_question(
-                question_text=f"מהן נקודות הקיצון של \\( f(x) = {latex(func)} \\)? ({self.difficulty_names[current_difficulty]})",
-                options=all_options,
-                correct_answer=calculated_answer,
-                explanation=explanation,
-                question_id=i + 1
-            )
+                if sample_debug(logger):
+                    logger.debug("פונקציה: %s | סוג: %s | נקודות: %s | קושי: %s",
+                                 latex(func), question_type, analysis.answer or expected_answer, current_difficulty)
+                
+                build = {
+                    'location': self._location_question,
+                    'type': self._type_question,
+                    'value': self._value_question,
+                    'monotonic': self._monotonic_question,
+                }[question_type]
+                question_text, correct_answer, wrong_answers, explanation = build(
+                    func, analysis, expected_answer, method, current_difficulty)
+                all_options = self.shuffle_options(correct_answer, wrong_answers)
+                question = self.format_question(
+                    question_text=question_text,
+                    options=all_options,
+                    correct_answer=correct_answer,
+                    explanation=explanation,
+                    question_id=i + 1
+                )
             
             questions.append(question)
         
         return questions
     
+    def symbolic_entries(self):
+        return [('function_analysis', func, lambda func=func: self._analyze_function(func))
+                for func, _, _ in self.easy_functions + self.medium_functions + self.hard_functions]
+    
+    def _analyze_function(self, func):
+        """נקודות קריטיות, סיווג, ערכים ותחומי מונוטוניות - חישוב סימבולי אחד לכל סוגי השאלות"""
+        return analyze_function(func, self.x, stage=self.stage)
+    
+    def _choose_question_type(self, analysis):
+        """סוג שאלה אקראי מבין אלה שהניתוח מאפשר - בלי נקודות סגורות נשארת רק שאלת המיקום"""
+        available = ['location']
+        if analysis.points:
+            available += ['type', 'value']
+        if analysis.intervals:
+            available.append('monotonic')
+        return random.choices(available, weights=[self.question_types[name] for name in available])[0]
+    
     def _identify_function_difficulty(self, func_data):
         """זיהוי רמת הקושי של פונקציה"""
         if func_data in self.easy_functions:
@@ -132,28 +153,139 @@ class CriticalPointsGenerator(BaseQuestionGenerator):
         else:
             return 'easy'
     
-    def _format_critical_points(self, points):
-        """עיצוב נקודות קיצון לפורמט יפה"""
-        if not points:
-            return "אין נקודות קיצון"
-        
-        try:
-            formatted_points = []
-            for point in points:
-                point_simplified = simplify(point)
-                if point_simplified.is_real:
-                    formatted_points.append(str(point_simplified))
-            
-            if formatted_points:
-                return "x = " + ", ".join(formatted_points)
+    def _function_tex(self, func):
+        """'\\( f(x) = ... \\)' לטקסט השאלה"""
+        with self.stage('latex'):
+            return f"\\( {self.math.function(func)} \\)"
+    
+    @staticmethod
+    def _window_text(analysis):
+        """' בתחום [-π, π]' כשהנקודות נמצאו נומרית בקטע, אחרת ''"""
+        if analysis.window is None:
+            return ""
+        return f" בתחום \\( {latex(analysis.window)} \\)"
+    
+    def _location_question(self, func, analysis, expected_answer, method, difficulty):
+        """מהן נקודות הקיצון - השאלה המקורית; נקודות פיתול מופיעות רק בהסבר"""
+        answer = analysis.answer or expected_answer
+        with self.stage('distractors'):
+            if analysis.window is not None:
+                wrong_answers = self._window_wrong_answers(answer, analysis, difficulty)
             else:
-                return "אין נקודות קיצון ממשיות"
-                
-        except:
-            return "אין פתרון"
+                wrong_answers = self._generate_wrong_answers(answer, difficulty)
+        with self.stage('explanation'):
+            explanation = self._generate_detailed_explanation(func, analysis.derivative, answer, method,
+                                                              difficulty, analysis.points)
+            if analysis.window is not None:
+                explanation += (f" למשוואה \\( f'(x) = 0 \\) אינסוף פתרונות או שאין לה פתרון סגור, ולכן הנקודות"
+                                f" נמצאו{self._window_text(analysis)} בסריקת סימן של הנגזרת ושיטת Brent.")
+        question_text = (f"מהן נקודות הקיצון של {self._function_tex(func)}{self._window_text(analysis)}? "
+                         f"({self.difficulty_names[difficulty]})")
+        return question_text, answer, wrong_answers, explanation
+    
+    def _type_question(self, func, analysis, expected_answer, method, difficulty):
+        """מה סוג הנקודה הקריטית"""
+        point = random.choice(analysis.points)
+        answer = KIND_NAMES[point.kind]
+        wrong_answers = [name for name in list(KIND_NAMES.values()) + ["אף אחת מהן"] if name != answer]
+        reason = {
+            MINIMUM: "הנגזרת עוברת משלילית לחיובית",
+            MAXIMUM: "הנגזרת עוברת מחיובית לשלילית",
+            INFLECTION: "הנגזרת מתאפסת אך לא מחליפה סימן",
+        }[point.kind]
+        with self.stage('explanation'):
+            explanation = (f"\\( f'(x) = {latex(analysis.derivative)} \\) מתאפסת ב-\\( x = {latex(point.x)} \\). "
+                           f"{reason}, ולכן התשובה היא: {answer}.")
+        question_text = (f"מה סוג הנקודה הקריטית \\( x = {latex(point.x)} \\) של {self._function_tex(func)}"
+                         f"{self._window_text(analysis)}? ({self.difficulty_names[difficulty]})")
+        return question_text, answer, wrong_answers, explanation
+    
+    def _value_question(self, func, analysis, expected_answer, method, difficulty):
+        """מהו ערך הפונקציה בנקודה קריטית"""
+        point = random.choice(analysis.points)
+        answer = self._tex_option(point.value)
+        with self.stage('distractors'):
+            candidates = [other.value for other in analysis.points if other is not point]
+            candidates += [point.x, -point.value, point.value + 1, point.value - 1, S.Zero,
+                           point.value + 2, point.value - 2]
+            wrong_answers = self._unique_wrong_answers(answer, [self._tex_option(value) for value in candidates])
+        with self.stage('explanation'):
+            explanation = (f"הנקודה \\( x = {latex(point.x)} \\) היא {KIND_NAMES[point.kind]}. "
+                           f"מציבים בפונקציה: \\( f({latex(point.x)}) = {latex(point.value)} \\).")
+        question_text = (f"מהו ערך הפונקציה {self._function_tex(func)} בנקודה הקריטית \\( x = {latex(point.x)} \\)? "
+                         f"({self.difficulty_names[difficulty]})")
+        return question_text, answer, wrong_answers, explanation
+    
+    def _monotonic_question(self, func, analysis, expected_answer, method, difficulty):
+        """באיזה תחום הפונקציה עולה/יורדת"""
+        increasing = random.choice(sorted({interval.increasing for interval in analysis.intervals}))
+        answer = self._intervals_text(analysis.intervals, increasing)
+        with self.stage('distractors'):
+            candidates = [self._intervals_text(analysis.intervals, not increasing),
+                          self._interval_option(analysis.intervals[0].start, analysis.intervals[-1].end)]
+            candidates += [self._interval_option(interval.start, interval.end) for interval in analysis.intervals]
+            random.shuffle(candidates)
+            candidates += [self._interval_option(start, end) for start, end in ((-oo, 0), (0, oo), (-oo, oo),
+                                                                                (-1, 1), (0, 1))]
+            wrong_answers = self._unique_wrong_answers(answer, candidates)
+        with self.stage('explanation'):
+            explanation = (f"\\( f'(x) = {latex(analysis.derivative)} \\). בודקים את סימן הנגזרת בין הנקודות "
+                           f"הקריטיות: הפונקציה עולה ב-{self._intervals_text(analysis.intervals, True) or 'אף תחום'} "
+                           f"ויורדת ב-{self._intervals_text(analysis.intervals, False) or 'אף תחום'}.")
+        direction = "עולה" if increasing else "יורדת"
+        question_text = (f"באיזה תחום הפונקציה {self._function_tex(func)} {direction}"
+                         f"{self._window_text(analysis)}? ({self.difficulty_names[difficulty]})")
+        return question_text, answer, wrong_answers, explanation
+    
+    def _window_wrong_answers(self, answer, analysis, difficulty):
+        """מסיחים לתשובה נומרית: חלק מהנקודות, רק החיוביות, או עם קצות הקטע"""
+        points = analysis.points
+        candidates = [format_points(points[:i] + points[i + 1:]) for i in range(len(points))]
+        candidates.append(format_points([point for point in points if point.x > 0]))
+        edges = [CriticalPoint(analysis.window.start, None, None), CriticalPoint(analysis.window.end, None, None)]
+        candidates.append(format_points(edges[:1] + points + edges[1:]))
+        random.shuffle(candidates)
+        candidates += self._generate_wrong_answers(answer, difficulty)
+        return self._unique_wrong_answers(answer, candidates)
+    
+    @staticmethod
+    def _unique_wrong_answers(answer, candidates):
+        """שלושת המועמדים הראשונים שאינם ריקים, שונים מהתשובה ושונים זה מזה"""
+        wrong_answers = []
+        for candidate in candidates:
+            if candidate and candidate != answer and candidate not in wrong_answers:
+                wrong_answers.append(candidate)
+        return wrong_answers[:3]
     
-    def _generate_detailed_explanation(self, func, derivative, result, method, difficulty):
+    def _tex_option(self, expr):
+        """ערך כתשובה - LaTeX כמו בשאר התשובות"""
+        return f"\\( {self.math.tex(expr)} \\)"
+    
+    @staticmethod
+    def _interval_text(start, end):
+        """'(a, b)' ב-LaTeX, בלי עטיפה"""
+        return f"\\left({latex(start)}, {latex(end)}\\right)"
+    
+    def _interval_option(self, start, end):
+        return f"\\( {self._interval_text(start, end)} \\)"
+    
+    def _intervals_text(self, intervals, increasing):
+        """איחוד התחומים בכיוון המבוקש כתשובה, או '' אם אין כאלה"""
+        parts = [self._interval_text(interval.start, interval.end)
+                 for interval in intervals if interval.increasing == increasing]
+        if not parts:
+            return ""
+        return "\\( " + " \\cup ".join(parts) + " \\)"
+    
+    def _generate_detailed_explanation(self, func, derivative, result, method, difficulty, classified=None):
         """יצירת הסבר מפורט לפי רמת קושי"""
+        if classified is not None:
+            if not classified:
+                return f"\\( f'(x) = {latex(derivative)} \\) אינה מתאפסת, ולכן {NO_EXTREMA}. {method}."
+            zeros = ", ".join(latex(point.x) for point in classified)
+            return (f"\\( f'(x) = {latex(derivative)} \\) מתאפסת ב-\\( x = {zeros} \\). "
+                    f"{self._classification_text(classified)}. התשובה: {result}. {method}.")
+        
         base_explanation = f"\\( f'(x) = {latex(derivative)} \\) מתאפסת ב-{result}"
         
         if difficulty == 'easy':
@@ -174,34 +306,37 @@ class CriticalPointsGenerator(BaseQuestionGenerator):
         
         return base_explanation
     
+    def _classification_text(self, classified):
+        """סוג כל נקודה קריטית, עם ערך הפונקציה בה"""
+        parts = []
+        for point in classified:
+            parts.append(f"\\( x = {latex(point.x)} \\): {KIND_NAMES[point.kind]}, "
+                         f"\\( f({latex(point.x)}) = {latex(point.value)} \\)")
+        text = "סיווג לפי סימן הנגזרת סביב כל נקודה - " + "; ".join(parts)
+        if any(point.kind == INFLECTION for point in classified):
+            text += ". בנקודת פיתול הנגזרת מתאפסת אך לא מחליפה סימן, ולכן היא אינה קיצון"
+        return text
+    
     def _generate_wrong_answers(self, correct_answer, difficulty):
         """יוצר תשובות שגויות לנקודות קיצון לפי רמת קושי"""
         
         if difficulty == 'easy':
             # שגיאות פשוטות בפונקציות ריבועיות
-            wrong_options = [
-                "x = 0", "x = 1", "x = -1", "x = 2", "x = -2", 
-                "x = 3", "x = -3", "אין נקודות קיצון"
-            ]
+            wrong_options = [format_x([value]) for value in (0, 1, -1, 2, -2, 3, -3)] + [NO_EXTREMA]
         
         elif difficulty == 'medium':
             # שגיאות בפונקציות מעוקבות
-            wrong_options = [
-                "x = 0", "x = 1", "x = -1", "x = 2", "x = -2",
-                "x = 0, 1", "x = -1, 1", "x = 1, 2", "x = -2, 2",
-                "אין נקודות קיצון"
-            ]
+            wrong_options = [format_x(values) for values in ([0], [1], [-1], [2], [-2],
+                                                             [0, 1], [-1, 1], [1, 2], [-2, 2])]
+            wrong_options.append(NO_EXTREMA)
         
         elif difficulty == 'hard':
             # שגיאות בפונקציות מורכבות
-            wrong_options = [
-                "x = 0", "x = 1", "x = e", "x = 1/e", "x = π/2",
-                "x = ln(2)", "אין נקודות קיצון", "x = √2", 
-                "x = π/4", "לא ניתן לחישוב"
-            ]
+            wrong_options = [format_x([value]) for value in (0, 1, E, 1/E, pi/2, log(2), sqrt(2), pi/4)]
+            wrong_options += [NO_EXTREMA, "לא ניתן לחישוב"]
         
         else:
-            wrong_options = ["x = 0", "x = 1", "x = -1", "אין נקודות קיצון"]
+            wrong_options = [format_x([value]) for value in (0, 1, -1)] + [NO_EXTREMA]
         
         wrong_answers = [w for w in wrong_options if w != correct_answer]
         return random.sample(wrong_answers, min(3, len(wrong_answers)))
@@ -0,0 +1,94 @@
+from collections import namedtuple
+from sympy import cos, exp, lambdify, sin
+from .derivative_steps import combine
+import math
+
+# מסיח: שם הטעות הנפוצה והנגזרת השגויה שהיא נותנת
+Mutation = namedtuple('Mutation', 'name derivative')
+
+# נקודות הבדיקה הנומרית - חיוביות כדי להיות בתחום של log ו-sqrt
+SAMPLE_POINTS = (0.7, 1.3, 2.1, 2.9)
+
+
+def _local_mutations(step, derivatives):
+    """טעויות בכלל של הצומת עצמו, כשנגזרות הילדים נכונות"""
+    rule, expr, parts = step.rule, step.expr, step.parts
+    if rule == 'constant':
+        return [('constant_kept', expr)]
+    if rule == 'power':
+        # (x)' = 1 - אין טעות טבעית בחזקה 1
+        if not expr.is_Pow:
+            return []
+        return [('exponent_kept', expr.exp * expr), ('coefficient_dropped', expr.base**(expr.exp - 1))]
+    if rule == 'table':
+        argument = expr.args[0]
+        if expr.func in (sin, cos):
+            return [('trig_sign', -step.derivative)]
+        if expr.func == exp:
+            return [('exp_power_rule', argument * exp(argument - 1))]
+        return []
+    if rule == 'constant_factor':
+        return [('factor_dropped', derivatives[0])]
+    if rule == 'chain':
+        mutations = [('chain_factor_dropped', parts['outer'])]
+        if expr.func in (sin, cos):
+            mutations.append(('trig_sign', -parts['outer'] * derivatives[0]))
+        return mutations
+    if rule == 'product':
+        u, v = parts['u'], parts['v']
+        du, dv = derivatives
+        return [('product_term_dropped', du * v), ('product_term_dropped', u * dv),
+                ('product_of_derivatives', du * dv)]
+    if rule == 'quotient':
+        u, v = parts['u'], parts['v']
+        du, dv = derivatives
+        return [('quotient_sign', (u * dv - du * v) / v**2), ('quotient_square_dropped', (du * v - u * dv) / v),
+                ('quotient_of_derivatives', du / dv)]
+    return []
+
+
+def mutations(step):
+    """כל הנגזרות השגויות מטעות אחת בצומת אחד בעץ - בלי diff, רק הרכבה מחדש כלפי מעלה"""
+    derivatives = [child.derivative for child in step.children]
+    found = [Mutation(name, derivative) for name, derivative in _local_mutations(step, derivatives)]
+    for index, child in enumerate(step.children):
+        for mutation in mutations(child):
+            mutated = derivatives[:index] + [mutation.derivative] + derivatives[index + 1:]
+            found.append(Mutation(mutation.name, combine(step.rule, step.parts, mutated)))
+    return found
+
+
+def fingerprint(expr, x, points=SAMPLE_POINTS):
+    """ערכי הביטוי בנקודות הבדיקה (None בנקודה שבה הוא לא מוגדר)"""
+    try:
+        f = lambdify(x, expr, 'math')
+    except Exception:
+        return None
+    values = []
+    for t in points:
+        try:
+            value = float(f(t))
+        except (TypeError, ValueError, ZeroDivisionError, OverflowError, NameError):
+            value = None
+        values.append(value if value is not None and math.isfinite(value) else None)
+    return values
+
+
+def differs(a, b):
+    """שונים נומרית בלפחות נקודה אחת שבה שניהם מוגדרים"""
+    return any(p is not None and q is not None and abs(p - q) > 1e-9 * max(1.0, abs(p))
+               for p, q in zip(a, b))
+
+
+def distinct_mutations(step, x):
+    """מסיחים שונים נומרית מהנגזרת הנכונה ואחד מהשני, לפי סדר הופעתם בעץ"""
+    correct = fingerprint(step.derivative, x)
+    accepted, fingerprints = [], [correct]
+    for mutation in mutations(step):
+        values = fingerprint(mutation.derivative, x)
+        if values is None or sum(value is not None for value in values) < 2:
+            continue
+        if all(differs(values, other) for other in fingerprints):
+            accepted.append(mutation)
+            fingerprints.append(values)
+    return accepted
@@ -0,0 +1,131 @@
+from collections import namedtuple
+from sympy import Add, Mul, cos, diff, exp, fraction, latex, log, sin, sympify, tan
+import logging
+
+logger = logging.getLogger(__name__)
+
+# צומת בעץ הגזירה: הכלל, הביטוי, הנגזרת שלו, חלקי הכלל (u, v, פונקציה חיצונית...),
+# צמתי תתי-הביטויים ושדות LaTeX מוכנים להסבר - העץ נשמר ב-cache לכל פונקציה במאגר
+DerivativeStep = namedtuple('DerivativeStep', 'rule expr derivative parts children fields')
+
+# נגזרות מיידיות של פונקציות חיצוניות, כפונקציה של הארגומנט
+OUTER_DERIVATIVES = {
+    sin: cos,
+    cos: lambda u: -sin(u),
+    exp: exp,
+    log: lambda u: 1 / u,
+    tan: lambda u: 1 + tan(u)**2,
+}
+
+STEP_TEMPLATES = {
+    'constant': "נגזרת של קבוע היא 0: \\( ({expr})' = 0 \\)",
+    'power': "כלל החזקה \\( (x^n)' = n \\cdot x^{{n-1}} \\): \\( ({expr})' = {derivative} \\)",
+    'table': "נגזרת מיידית: \\( ({expr})' = {derivative} \\)",
+    'sum': "נגזרת של סכום היא סכום הנגזרות - גוזרים כל איבר בנפרד",
+    'constant_factor': "הקבוע \\( {factor} \\) נשאר כגורם וגוזרים את \\( {rest} \\)",
+    'chain': ("כלל השרשרת עם הפונקציה הפנימית \\( g = {inner} \\): "
+              "\\( ({expr})' = {outer} \\cdot g' = {derivative} \\)"),
+    'product': ("כלל המכפלה \\( (uv)' = u'v + uv' \\) עם \\( u = {u} \\), \\( v = {v} \\): "
+                "\\( ({expr})' = {derivative} \\)"),
+    'quotient': ("כלל המנה \\( (u/v)' = \\frac{{u'v - uv'}}{{v^2}} \\) עם \\( u = {u} \\), \\( v = {v} \\): "
+                 "\\( ({expr})' = {derivative} \\)"),
+    'advanced': "\\( ({expr})' = {derivative} \\)",
+}
+
+
+def combine(rule, parts, derivatives):
+    """הנגזרת של צומת פנימי מנגזרות הילדים שלו - לפי הכלל"""
+    if rule == 'sum':
+        return Add(*derivatives)
+    if rule == 'constant_factor':
+        return parts['factor'] * derivatives[0]
+    if rule == 'chain':
+        return parts['outer'] * derivatives[0]
+    if rule == 'product':
+        return derivatives[0] * parts['v'] + parts['u'] * derivatives[1]
+    if rule == 'quotient':
+        return (derivatives[0] * parts['v'] - parts['u'] * derivatives[1]) / parts['v']**2
+    raise ValueError(f"unknown rule {rule}")
+
+
+def _leaf(rule, expr, derivative):
+    return DerivativeStep(rule, expr, derivative, {}, [],
+                          {'expr': latex(expr), 'derivative': latex(derivative)})
+
+
+def _node(rule, expr, parts, children):
+    derivative = combine(rule, parts, [child.derivative for child in children])
+    fields = {'expr': latex(expr), 'derivative': latex(derivative)}
+    fields.update((name, latex(value)) for name, value in parts.items())
+    # 4x + 6 \cdot g' נקרא כ-4x + 6g' - סכום מקבל סוגריים
+    if rule == 'chain' and parts['outer'].is_Add:
+        fields['outer'] = f"\\left({fields['outer']}\\right)"
+    return DerivativeStep(rule, expr, derivative, parts, children, fields)
+
+
+def _chain_parts(expr, x):
+    """(פונקציה חיצונית גזורה בנקודה g, g) עבור f(g(x)) עם g שאינו x, או None"""
+    if expr.is_Pow and not expr.exp.has(x):
+        return expr.exp * expr.base**(expr.exp - 1), expr.base
+    if expr.func in OUTER_DERIVATIVES and len(expr.args) == 1:
+        return OUTER_DERIVATIVES[expr.func](expr.args[0]), expr.args[0]
+    return None
+
+
+def _trace(expr, x):
+    if not expr.has(x):
+        return _leaf('constant', expr, 0)
+
+    if expr.is_Add:
+        return _node('sum', expr, {}, [_trace(term, x) for term in expr.as_ordered_terms()])
+
+    factor, rest = expr.as_independent(x, as_Add=False)
+    if factor != 1:
+        return _node('constant_factor', expr, {'factor': factor, 'rest': rest}, [_trace(rest, x)])
+
+    if expr == x or (expr.is_Pow and expr.base == x and not expr.exp.has(x)):
+        exponent = 1 if expr == x else expr.exp
+        return _leaf('power', expr, exponent * x**(exponent - 1))
+
+    if expr.func in OUTER_DERIVATIVES and expr.args == (x,):
+        return _leaf('table', expr, OUTER_DERIVATIVES[expr.func](x))
+
+    if expr.is_Mul:
+        numerator, denominator = fraction(expr)
+        if denominator != 1 and numerator.has(x):
+            parts = {'u': numerator, 'v': denominator}
+            return _node('quotient', expr, parts, [_trace(numerator, x), _trace(denominator, x)])
+        if denominator == 1:
+            factors = Mul.make_args(expr)
+            u, v = factors[0], Mul(*factors[1:])
+            return _node('product', expr, {'u': u, 'v': v}, [_trace(u, x), _trace(v, x)])
+
+    chain = _chain_parts(expr, x)
+    if chain is not None:
+        outer, inner = chain
+        return _node('chain', expr, {'outer': outer, 'inner': inner}, [_trace(inner, x)])
+
+    return _leaf('advanced', expr, diff(expr, x))
+
+
+def derivative_steps(func, x):
+    """עץ הגזירה של func לפי כללי הגזירה, או None כשהבנייה נכשלה"""
+    try:
+        return _trace(sympify(func), x)
+    except Exception as e:
+        logger.warning("⚠️ בניית צעדי גזירה נכשלה עבור %s: %s", func, e)
+        return None
+
+
+def walk(step):
+    """כל צמתי העץ בסדר תחילי - הכלל החיצוני קודם"""
+    yield step
+    for child in step.children:
+        yield from walk(child)
+
+
+def render_steps(step):
+    """הצעדים כטקסט בעברית, משפט לכל צומת"""
+    if step is None:
+        return ""
+    return " ".join(STEP_TEMPLATES[node.rule].format(**node.fields) + "." for node in walk(step))
@@ -1,9 +1,16 @@
 from .base_generator import BaseQuestionGenerator
-from sympy import diff, latex, sin, cos, tan, exp, log, sqrt, integrate, simplify, nsimplify
+from sympy import diff, latex, sin, cos, tan, exp, log, sqrt, simplify, nsimplify
+from app_logging import sample_debug
+from .derivative_mutations import distinct_mutations
+from .derivative_steps import derivative_steps, render_steps
+import logging
 import random
 
+logger = logging.getLogger(__name__)
+
 class DerivativesGenerator(BaseQuestionGenerator):
     """מחולל שאלות נגזרות עם רמות קושי"""
+    topic = 'derivatives'
     
     def __init__(self):
         super().__init__()
@@ -65,29 +72,53 @@ class DerivativesGenerator(BaseQuestionGenerator):
             
             current_difficulty = self._identify_difficulty(func)
             
-            correct_derivative = diff(func, self.x)
-            correct_derivative = self.normalize_expression(correct_derivative)
-            correct_latex = f"\\( {latex(correct_derivative)} \\)"
-            
-            print(f"פונקציה: {latex(func)} | קושי: {current_difficulty}")
-            print(f"נגזרת: {latex(correct_derivative)}")
-            
-            wrong_answers = self._generate_smart_wrong_answers(func, correct_derivative)
-            all_options = self.shuffle_options(correct_latex, wrong_answers)
-            explanation = self._generate_detailed_explanation(func, correct_derivative, current_difficulty)
-            
-            question = self.format_question(
-                question_text=f"מה הנגזרת של \\( f(x) = {latex(func)} \\)? ({self.difficulty_names[current_difficulty]})",
-                options=all_options,
-                correct_answer=correct_latex,
-                explanation=explanation,
-                question_id=i + 1
-            )
+            with self.pool_function_timer(func, current_difficulty):
+                correct_derivative = self.cached('derivative', func, lambda: self._compute_derivative(func))
+                with self.stage('latex'):
+                    correct_latex = f"\\( {self.math.tex(correct_derivative)} \\)"
+                
+                if sample_debug(logger):
+                    logger.debug("פונקציה: %s | קושי: %s | נגזרת: %s",
+                                 latex(func), current_difficulty, latex(correct_derivative))
+                
+                with self.stage('distractors'):
+                    wrong_answers = self._generate_smart_wrong_answers(func, correct_derivative)
+                all_options = self.shuffle_options(correct_latex, wrong_answers)
+                with self.stage('explanation'):
+                    explanation = self._generate_detailed_explanation(func, correct_derivative, current_difficulty)
+                
+                question = self.format_question(
+                    question_text=f"מה הנגזרת של \\( {self.math.function(func)} \\)? ({self.difficulty_names[current_difficulty]})",
+                    options=all_options,
+                    correct_answer=correct_latex,
+                    explanation=explanation,
+                    question_id=i + 1
+                )
             
             questions.append(question)
         
         return questions
     
+    def symbolic_entries(self):
+        entries = []
+        for func in self.easy_functions + self.medium_functions + self.hard_functions:
+            entries.append(('derivative', func, lambda func=func: self._compute_derivative(func)))
+            entries.append(('derivative_steps', func, lambda func=func: self._compute_steps(func)))
+            entries.append(('derivative_distractors', func, lambda func=func: self._compute_distractors(func)))
+        return entries
+    
+    def _compute_derivative(self, func):
+        """גזירה ונרמול - החלק הסימבולי היקר שנשמר ב-cache לכל פונקציה"""
+        with self.stage('symbolic'):
+            derivative = diff(func, self.x)
+        with self.stage('normalize'):
+            return self.normalize_expression(derivative)
+    
+    def _compute_steps(self, func):
+        """עץ הגזירה להסבר ולמסיחים - נבנה פעם אחת לכל פונקציה במאגר"""
+        with self.stage('symbolic'):
+            return derivative_steps(func, self.x)
+    
     def _identify_difficulty(self, func):
         """זיהוי רמת הקושי של פונקציה"""
         if func in self.easy_functions:
@@ -100,60 +131,40 @@ class DerivativesGenerator(BaseQuestionGenerator):
             return 'medium'  
     
     def _generate_detailed_explanation(self, func, derivative, difficulty):
-        """יצירת הסבר מפורט לפי רמת קושי"""
-        base_explanation = f"הנגזרת של \\( {latex(func)} \\) היא \\( {latex(derivative)} \\)"
-        
-        if difficulty == 'easy':
-            if func == self.x**2:
-                return base_explanation + ". כלל החזקה: \\( (x^n)' = n \\cdot x^{n-1} \\)"
-            elif str(func).startswith('sin'):
-                return base_explanation + ". הנגזרת של sin(x) היא cos(x)"
-            elif str(func).startswith('cos'):
-                return base_explanation + ". הנגזרת של cos(x) היא -sin(x)"
-        
-        elif difficulty == 'medium':
-            return base_explanation + ". שימוש בכלל השרשרת: \\( (f(g(x)))' = f'(g(x)) \\cdot g'(x) \\)"
-        
-        elif difficulty == 'hard':
-            if '*' in str(func):
-                return base_explanation + ". שימוש בכלל המכפלה: \\( (u \\cdot v)' = u' \\cdot v + u \\cdot v' \\)"
-            elif '/' in str(func):
-                return base_explanation + ". שימוש בכלל המנה: \\( (u/v)' = \\frac{u' \\cdot v - u \\cdot v'}{v^2} \\)"
-        
-        return base_explanation
+        """הסבר מפורט: התוצאה ואחריה הכללים שהופעלו בכל צומת בעץ הגזירה השמור"""
+        steps = self.cached('derivative_steps', func, lambda: self._compute_steps(func))
+        base_explanation = f"הנגזרת של \\( {self.math.tex(func)} \\) היא \\( {self.math.tex(derivative)} \\)."
+        if steps is None:
+            return base_explanation
+        return f"{base_explanation} {render_steps(steps)}"
+    
+    def _compute_distractors(self, func):
+        """מסיחים מטעויות נפוצות בעץ הגזירה, מסוננים נומרית ומנורמלים - פעם אחת לכל פונקציה"""
+        steps = self.cached('derivative_steps', func, lambda: self._compute_steps(func))
+        with self.stage('symbolic'):
+            candidates = [mutation.derivative for mutation in distinct_mutations(steps, self.x)] if steps else []
+            # מעט מדי טעויות בעץ (log(x)) - הנגזרת השנייה והפונקציה עצמה
+            if len(candidates) < 3:
+                candidates += [diff(func, self.x, 2), func]
+        with self.stage('normalize'):
+            return list(dict.fromkeys(f"\\( {self.math.tex(self.normalize_expression(candidate))} \\)"
+                                      for candidate in candidates))
     
     def _generate_smart_wrong_answers(self, func, correct_derivative):
         """יוצר תשובות שגויות חכמות לנגזרות"""
-        wrong_answers = []
-        
-        try:
-            second_deriv = diff(func, self.x, 2)
-            second_deriv = self.normalize_expression(second_deriv)
-            if second_deriv != correct_derivative:
-                wrong_answers.append(f"\\( {latex(second_deriv)} \\)")
-        except:
-            wrong_answers.append("\\( 0 \\)")
-        
-        if func != correct_derivative:
-            normalized_func = self.normalize_expression(func)
-            wrong_answers.append(f"\\( {latex(normalized_func)} \\)")
-        else:
-            wrong_answers.append("\\( x \\)")
-        
-        try:
-            integral_func = integrate(func, self.x)
-            integral_func = self.normalize_expression(integral_func)
-            if integral_func != correct_derivative:
-                wrong_answers.append(f"\\( {latex(integral_func)} \\)")
-        except:
-            wrong_answers.append("\\( x^2 \\)")
+        correct_latex = f"\\( {self.math.tex(correct_derivative)} \\)"
+        wrong_answers = [candidate for candidate in self.cached('derivative_distractors', func,
+                                                                lambda: self._compute_distractors(func))
+                         if candidate != correct_latex]
+        if len(wrong_answers) >= 3:
+            return random.sample(wrong_answers, 3)
         
         common_wrong = ["\\( 0 \\)", "\\( 1 \\)", "\\( x \\)", "\\( 2x \\)"]
         for wrong in common_wrong:
-            if len(wrong_answers) < 3 and wrong not in wrong_answers:
+            if len(wrong_answers) < 3 and wrong not in wrong_answers and wrong != correct_latex:
                 wrong_answers.append(wrong)
         
-        return wrong_answers[:3]
+        return wrong_answers
     
     def generate_easy_questions(self, count=10):
         return self.generate_questions(count, 'easy')
@@ -0,0 +1,169 @@
+from collections import namedtuple
+from contextlib import nullcontext
+from sympy import FiniteSet, Float, Interval, S, diff, lambdify, latex, nsimplify, oo, pi, simplify, solveset
+from sympy.calculus.util import continuous_domain
+from .numeric_roots import find_roots
+from .polynomial_analysis import CriticalPoint, INFLECTION, MAXIMUM, MINIMUM, analyze_polynomial
+from metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('calcmaster_function_analysis_total',
+                 'Function analyses, by path (polynomial fast path, solveset, numeric scan, or unsolved)')
+
+NO_EXTREMA = "אין נקודות קיצון"
+
+# הקטע שבו מחפשים נקודות נומרית כשאין קבוצת פתרונות סופית - השאלה מציינת אותו
+NUMERIC_WINDOW = Interval(-pi, pi)
+
+# ספרות משמעותיות בנקודות ובערכים שנמצאו נומרית
+NUMERIC_DIGITS = 4
+
+# ניתוח מלא של פונקציה - מחושב פעם אחת וממנו נגזרים כל סוגי השאלות.
+# window הוא הקטע כשהנקודות נמצאו נומרית (None - על כל התחום);
+# answer (נקודות הקיצון בלבד), points (כל הנקודות הקריטיות) ו-intervals הם None כשגם החיפוש הנומרי לא הצליח
+FunctionAnalysis = namedtuple('FunctionAnalysis', 'derivative answer points intervals window', defaults=(None,))
+
+# תחום מונוטוניות: קצוות (±oo לאינסוף) והאם הפונקציה עולה בו
+MonotonicInterval = namedtuple('MonotonicInterval', 'start end increasing')
+
+
+def _no_stage(name):
+    return nullcontext()
+
+
+def _test_point(start, end):
+    """נקודה בתוך התחום לבדיקת סימן הנגזרת"""
+    if start == -oo and end == oo:
+        return S.Zero
+    if start == -oo:
+        return end - 1
+    if end == oo:
+        return start + 1
+    return (start + end) / 2
+
+
+def _intervals(derivative, x, domain, points):
+    """תחומי עלייה/ירידה בין הנקודות הקריטיות - לפני איחוד תחומים סמוכים"""
+    edges = [domain.start, *points, domain.end]
+    intervals = []
+    for start, end in zip(edges, edges[1:]):
+        slope = derivative.subs(x, _test_point(start, end)).evalf()
+        intervals.append(MonotonicInterval(start, end, bool(slope > 0)))
+    return intervals
+
+
+def _merge(intervals):
+    """איחוד תחומים סמוכים עם אותו כיוון (נקודת פיתול לא מחליפה כיוון)"""
+    merged = []
+    for interval in intervals:
+        if merged and merged[-1].increasing == interval.increasing:
+            merged[-1] = merged[-1]._replace(end=interval.end)
+        else:
+            merged.append(interval)
+    return merged
+
+
+def _classify_by_sign(left, right):
+    """מבחן הנגזרת הראשונה - החלפת כיוון משני צדי הנקודה"""
+    if left.increasing == right.increasing:
+        return INFLECTION
+    return MAXIMUM if left.increasing else MINIMUM
+
+
+def format_x(values):
+    """'\\( x = a, b \\)' - אותו עיצוב לתשובה ולמסיחים; ≈ כשיש ערך נומרי"""
+    relation = "\\approx" if any(isinstance(value, Float) for value in values) else "="
+    return f"\\( x {relation} " + ", ".join(latex(value) for value in values) + " \\)"
+
+
+def format_points(points):
+    """נקודות הקיצון (מינימום/מקסימום) כתשובה - נקודות פיתול אינן קיצון"""
+    points = [point for point in points if point.kind != INFLECTION]
+    if not points:
+        return NO_EXTREMA
+    return format_x([point.x for point in points])
+
+
+def _closed_form(root, derivative, x):
+    """שורש נומרי כביטוי סגור קצר (0, π/4) אם הנגזרת מתאפסת בו בדיוק, אחרת None"""
+    candidate = nsimplify(root, [pi], tolerance=1e-9)
+    if candidate.count_ops() > 4:
+        return None
+    return candidate if simplify(derivative.subs(x, candidate)) == 0 else None
+
+
+def _numeric_analysis(func, derivative, x, domain):
+    """סריקה נומרית של f' בקטע NUMERIC_WINDOW (בתוך תחום ההגדרה) - זמן חסום גם כשהפתרון מחזורי או לא סגור"""
+    window = domain.intersect(NUMERIC_WINDOW)
+    if not isinstance(window, Interval) or window.measure == 0:
+        return None
+    slope = lambdify(x, derivative, 'math')
+    values = lambdify(x, func, 'math')
+    start, end = float(window.start), float(window.end)
+
+    points = []
+    for root in find_roots(slope, start, end):
+        if not start < root < end:
+            continue
+        exact = _closed_form(root, derivative, x)
+        if exact is not None:
+            points.append((exact, simplify(func.subs(x, exact))))
+        else:
+            points.append((Float(root, NUMERIC_DIGITS), Float(values(root), NUMERIC_DIGITS)))
+
+    raw = _intervals(derivative, x, window, [point for point, _ in points])
+    points = [CriticalPoint(point, value, _classify_by_sign(left, right))
+              for (point, value), left, right in zip(points, raw, raw[1:])]
+    return FunctionAnalysis(derivative, format_points(points), points, _merge(raw), window)
+
+
+def analyze_function(func, x, stage=None):
+    """נקודות קריטיות, סיווגן, ערכי הפונקציה בהן ותחומי המונוטוניות
+
+    פולינומים עוברים במסלול המהיר (מקדמים, roots ומבחן הנגזרת השנייה); שאר
+    הפונקציות נפתרות ב-solveset על תחום הרציפות, ומסווגות לפי סימן הנגזרת
+    משני צדי כל נקודה.
+    """
+    stage = stage or _no_stage
+
+    with stage('symbolic'):
+        polynomial = analyze_polynomial(func, x)
+    if polynomial is not None:
+        metrics.inc('calcmaster_function_analysis_total', path='polynomial')
+        with stage('symbolic'):
+            raw = _intervals(polynomial.derivative, x, Interval(-oo, oo), [point.x for point in polynomial.points])
+        return FunctionAnalysis(polynomial.derivative, format_points(polynomial.points), polynomial.points,
+                                _merge(raw))
+
+    with stage('symbolic'):
+        derivative = diff(func, x)
+    try:
+        with stage('symbolic'):
+            domain = continuous_domain(func, x, S.Reals)
+            solutions = solveset(derivative, x, domain) if isinstance(domain, Interval) else None
+    except Exception as e:
+        logger.warning("⚠️ ניתוח נקודות קריטיות נכשל עבור %s: %s", func, e)
+        domain = solutions = None
+
+    # ConditionSet (x·sin x) או ImageSet מחזורי (sin x + cos x) - אין רשימה סופית, מחפשים נומרית בקטע
+    if not isinstance(solutions, FiniteSet) or not all(point.is_real for point in solutions):
+        numeric = None
+        if isinstance(domain, Interval):
+            with stage('numeric'):
+                try:
+                    numeric = _numeric_analysis(func, derivative, x, domain)
+                except Exception as e:
+                    logger.warning("⚠️ חיפוש נומרי של נקודות קריטיות נכשל עבור %s: %s", func, e)
+        metrics.inc('calcmaster_function_analysis_total', path='unsolved' if numeric is None else 'numeric')
+        return numeric or FunctionAnalysis(derivative, None, None, None)
+
+    metrics.inc('calcmaster_function_analysis_total', path='solveset')
+
+    with stage('symbolic'):
+        roots = sorted(solutions, key=float)
+        raw = _intervals(derivative, x, domain, roots)
+        points = [CriticalPoint(root, simplify(func.subs(x, root)), _classify_by_sign(left, right))
+                  for root, left, right in zip(roots, raw, raw[1:])]
+    return FunctionAnalysis(derivative, format_points(points), points, _merge(raw))
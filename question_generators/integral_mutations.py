@@ -0,0 +1,83 @@
+from sympy import Add, cos, diff, exp, integrate, sin, sympify
+from .derivative_mutations import differs, fingerprint
+
+# נקודות הבדיקה לאינטגרלים - חלקן בתוך (-1, 1) בשביל arcsin, כולן חיוביות בשביל log
+SAMPLE_POINTS = (0.2, 0.45, 0.7, 0.95, 1.6, 2.5)
+
+
+def _term_mistakes(term, x):
+    """פונקציות קדומות שגויות לאיבר אחד, מטעויות נפוצות לפי מבנה האיבר"""
+    factor, rest = term.as_independent(x, as_Add=False)
+    if not rest.has(x):
+        # ∫c dx = c
+        return [term]
+
+    # גזירה במקום אינטגרציה, והאינטגרנד עצמו
+    mistakes = [diff(term, x), term]
+
+    if rest == x or (rest.is_Pow and rest.base == x and rest.exp.is_number and rest.exp != -1):
+        exponent = 1 if rest == x else rest.exp
+        # העלאת החזקה בלי לחלק
+        mistakes.append(factor * x**(exponent + 1))
+
+    if rest.func in (sin, cos, exp):
+        inner = rest.args[0]
+        slope = diff(inner, x)
+        if not slope.has(x):
+            if rest.func == sin:
+                mistakes.append(factor * cos(inner) / slope)
+            elif rest.func == cos:
+                mistakes.append(-factor * sin(inner) / slope)
+            else:
+                # כלל החזקה על e^x: e^(x+1)/(x+1)
+                mistakes.append(factor * exp(inner + 1) / (inner + 1))
+            if slope != 1:
+                # שכחו לחלק בנגזרת הפנימית, או הכפילו בה במקום לחלק
+                correct = integrate(rest, x)
+                mistakes += [factor * correct * slope, factor * correct * slope**2]
+
+    if rest.is_Mul:
+        # אינטגרציה בחלקים: מכפלת האינטגרלים, או הגורם הראשון כאילו הוא קבוע
+        u, v = rest.as_two_terms()
+        integral_v = integrate(v, x)
+        mistakes += [factor * integrate(u, x) * integral_v, factor * u * integral_v]
+    return mistakes
+
+
+def integral_mistakes(func, integral, x):
+    """אינטגרלים שגויים מטעות באיבר אחד - שאר האיברים נשארים נכונים"""
+    func = sympify(func)
+    terms = Add.make_args(func)
+    if len(terms) == 1:
+        return _term_mistakes(func, x)
+    found = []
+    for term in terms:
+        correct = integrate(term, x)
+        found += [integral - correct + mistake for mistake in _term_mistakes(term, x)]
+    return found
+
+
+def _shape(expr, x):
+    """ערכי הביטוי עד כדי קבוע - שתי פונקציות קדומות שנבדלות בקבוע הן אותה תשובה"""
+    values = fingerprint(expr, x, SAMPLE_POINTS)
+    if values is None:
+        return None
+    # הפרשים בין נקודות סמוכות - הקבוע מתבטל
+    steps = [None if a is None or b is None else b - a for a, b in zip(values, values[1:])]
+    if sum(step is not None for step in steps) < 2:
+        return None
+    return steps
+
+
+def distinct_mistakes(func, integral, x):
+    """מסיחים ששונים נומרית (עד כדי קבוע) מהאינטגרל הנכון ואחד מהשני"""
+    correct = _shape(integral, x)
+    if correct is None:
+        return []
+    accepted, shapes = [], [correct]
+    for mistake in integral_mistakes(func, integral, x):
+        shape = _shape(mistake, x)
+        if shape is not None and all(differs(shape, other) for other in shapes):
+            accepted.append(mistake)
+            shapes.append(shape)
+    return accepted
@@ -1,10 +1,30 @@
 from .base_generator import BaseQuestionGenerator
-from sympy import integrate, diff, latex, sin, cos, exp, log, sqrt, simplify, pi, atan, ln
+from .integral_mutations import distinct_mistakes
+from .integration_steps import integration_steps, render_steps
+from .quadrature import agrees, simpson
+from collections import namedtuple
+from sympy import integrate, latex, sin, cos, exp, log, sqrt, simplify, pi, atan, ln, E, Float, Integer, Rational, lambdify
+from app_logging import sample_debug
+from metrics import metrics
+import logging
+import os
 import random
 
+logger = logging.getLogger(__name__)
+
+metrics.describe('calcmaster_definite_integral_mismatch_total',
+                 'Definite integral templates whose exact value disagrees with numeric quadrature')
+
+# אינטגרל מסוים מחושב: הפונקציה הקדומה, הערך המדויק, הערך כמספר, ו-F(b), F(a) למסיחים
+DefiniteIntegral = namedtuple('DefiniteIntegral', 'antiderivative exact value upper lower')
+
 class IntegralsGenerator(BaseQuestionGenerator):    
+    topic = 'integrals'
+    
     def __init__(self):
         super().__init__()
+        # חלק השאלות שהן אינטגרל מסוים (definite_cases) במקום אינטגרל לא מסוים
+        self.definite_share = float(os.environ.get('CALCMASTER_DEFINITE_INTEGRALS', 0.3))
         
         # רמת קושי קלה 🟢 - אינטגרלים בסיסיים
         self.easy_functions = [
@@ -41,6 +61,28 @@ class IntegralsGenerator(BaseQuestionGenerator):
             exp(self.x)*sin(self.x) # ∫e^x·sin(x) dx - בחלקים מורכב
         ]
         
+        # אינטגרלים מסוימים - (פונקציה, גבול תחתון, גבול עליון), בקטעים שבהם הפונקציה רציפה
+        self.definite_cases = {
+            'easy': [
+                (self.x, 0, 2), (self.x**2, 0, 3), (3*self.x**2, 1, 2), (4*self.x**3, 0, 1),
+                (sin(self.x), 0, pi), (cos(self.x), 0, pi/2), (exp(self.x), 0, 1),
+                (1/self.x, 1, E), (Integer(2), 1, 4)
+            ],
+            'medium': [
+                (2*self.x + 1, 0, 2), ((2*self.x + 1)**2, 0, 1),
+                (sin(2*self.x), 0, pi/2), (cos(2*self.x), 0, pi/4),
+                (exp(2*self.x), 0, 1), (exp(-self.x), 0, 1),
+                (1/(2*self.x + 1), 0, 1), (self.x*exp(self.x**2), 0, 1), (self.x/(self.x**2 + 1), 0, 1)
+            ],
+            'hard': [
+                (self.x*sin(self.x), 0, pi), (self.x*cos(self.x), 0, pi/2),
+                (self.x*exp(self.x), 0, 1), (self.x**2*exp(self.x), 0, 1),
+                (log(self.x), 1, E), (self.x*log(self.x), 1, E),
+                (1/(self.x**2 + 1), 0, 1), (1/sqrt(1 - self.x**2), 0, Rational(1, 2)),
+                (exp(self.x)*sin(self.x), 0, pi)
+            ],
+        }
+        
         # שם הרמות
         self.difficulty_names = {
             'easy': 'קל 🟢',
@@ -69,37 +111,143 @@ class IntegralsGenerator(BaseQuestionGenerator):
             functions_pool = self.easy_functions + self.medium_functions + self.hard_functions
         
         for i in range(count):
+            if self.definite_share > 0 and random.random() < self.definite_share:
+                question = self._definite_question(difficulty, i + 1)
+                if question is not None:
+                    questions.append(question)
+                    continue
+            
             func = random.choice(functions_pool)
             current_difficulty = self._identify_difficulty(func)
             
             try:
-                correct_integral = integrate(func, self.x)
-                correct_integral = self.normalize_expression(correct_integral)
-                correct_latex = f"\\( {latex(correct_integral)} + C \\)"
-                
-                print(f"פונקציה: {latex(func)} | קושי: {current_difficulty}")
-                print(f"אינטגרל: {latex(correct_integral)} + C")
-                
-                wrong_answers = self._generate_smart_wrong_answers(func, correct_integral, current_difficulty)
-                all_options = self.shuffle_options(correct_latex, wrong_answers)
-                explanation = self._generate_detailed_explanation(func, correct_integral, current_difficulty)
-                
-                question = self.format_question(
-                    question_text=f"מה האינטגרל של \\( \\int {latex(func)} \\, dx \\)? ({self.difficulty_names[current_difficulty]})",
-                    options=all_options,
-                    correct_answer=correct_latex,
-                    explanation=explanation,
-                    question_id=i + 1
-                )
+                with self.pool_function_timer(func, current_difficulty):
+                    correct_integral = self.cached('integral', func, lambda: self._compute_integral(func))
+                    with self.stage('latex'):
+                        correct_latex = f"\\( {self.math.plus_constant(correct_integral)} \\)"
+                    
+                    if sample_debug(logger):
+                        logger.debug("פונקציה: %s | קושי: %s | אינטגרל: %s + C",
+                                     latex(func), current_difficulty, latex(correct_integral))
+                    
+                    with self.stage('distractors'):
+                        wrong_answers = self._generate_smart_wrong_answers(func, correct_integral)
+                    all_options = self.shuffle_options(correct_latex, wrong_answers)
+                    with self.stage('explanation'):
+                        explanation = self._generate_detailed_explanation(func, correct_integral, current_difficulty)
+                    
+                    question = self.format_question(
+                        question_text=f"מה האינטגרל של \\( {self.math.integral(func)} \\)? ({self.difficulty_names[current_difficulty]})",
+                        options=all_options,
+                        correct_answer=correct_latex,
+                        explanation=explanation,
+                        question_id=i + 1
+                    )
                 
                 questions.append(question)
                 
             except Exception as e:
-                print(f"שגיאה בחישוב אינטגרל של {latex(func)}: {e}")
+                logger.warning("שגיאה בחישוב אינטגרל של %s: %s", func, e)
                 questions.append(self._create_simple_integral_question(i + 1))
         
         return questions
     
+    def _definite_question(self, difficulty, question_id):
+        """שאלת אינטגרל מסוים - None אם הערך המדויק לא עבר את הבדיקה הנומרית"""
+        level = difficulty if difficulty in self.definite_cases else random.choice(list(self.definite_cases))
+        func, lower, upper = random.choice(self.definite_cases[level])
+        
+        with self.pool_function_timer(func, level):
+            definite = self.cached('definite_integral', (func, lower, upper),
+                                   lambda: self._compute_definite_integral(func, lower, upper))
+            if definite is None:
+                return None
+            
+            with self.stage('latex'):
+                correct_answer = f"\\( {self.math.tex(self._rounded(definite.value))} \\)"
+                integral_tex = self.math.definite_integral(func, lower, upper)
+            with self.stage('distractors'):
+                wrong_answers = self._definite_wrong_answers(definite, correct_answer)
+            with self.stage('explanation'):
+                steps = self.cached('integration_steps', func, lambda: self._compute_steps(func))
+                approximation = "" if definite.exact.is_Integer else f" \\approx {definite.value:.3f}"
+                explanation = (f"פונקציה קדומה: \\( F(x) = {latex(definite.antiderivative)} \\). "
+                               f"{render_steps(steps)} "
+                               f"לפי המשפט היסודי: \\( F({latex(upper)}) - F({latex(lower)}) = {latex(definite.exact)}"
+                               f"{approximation} \\)").replace("  ", " ")
+            
+            return self.format_question(
+                question_text=f"מה הערך של \\( {integral_tex} \\)? ({self.difficulty_names[level]})",
+                options=self.shuffle_options(correct_answer, wrong_answers),
+                correct_answer=correct_answer,
+                explanation=explanation,
+                question_id=question_id
+            )
+    
+    def symbolic_entries(self):
+        entries = []
+        for func in self.easy_functions + self.medium_functions + self.hard_functions:
+            entries.append(('integral', func, lambda func=func: self._compute_integral(func)))
+            entries.append(('integration_steps', func, lambda func=func: self._compute_steps(func)))
+            entries.append(('integral_distractors', func, lambda func=func: self._compute_distractors(func)))
+        for cases in self.definite_cases.values():
+            for func, lower, upper in cases:
+                entries.append(('definite_integral', (func, lower, upper),
+                                lambda func=func, lower=lower, upper=upper:
+                                self._compute_definite_integral(func, lower, upper)))
+                entries.append(('integration_steps', func, lambda func=func: self._compute_steps(func)))
+        return entries
+    
+    def _compute_definite_integral(self, func, lower, upper):
+        """F(b) - F(a) מהפונקציה הקדומה השמורה, מאומת מול סימפסון; None אם יש סטייה"""
+        antiderivative = self.cached('integral', func, lambda: self._compute_integral(func))
+        with self.stage('symbolic'):
+            upper_value = antiderivative.subs(self.x, upper)
+            lower_value = antiderivative.subs(self.x, lower)
+            exact = simplify(upper_value - lower_value)
+        with self.stage('numeric'):
+            value = float(exact)
+            try:
+                numeric = simpson(lambdify(self.x, func, 'math'), float(lower), float(upper))
+            except (ValueError, ZeroDivisionError, OverflowError):
+                # הפונקציה לא מוגדרת באחת מנקודות הדגימה - הקטע לא מתאים לשאלה
+                numeric = float('nan')
+        if not agrees(value, numeric):
+            metrics.inc('calcmaster_definite_integral_mismatch_total')
+            logger.warning("⚠️ אינטגרל מסוים של %s מ-%s עד %s: ערך מדויק %s, נומרי %.6f",
+                           func, lower, upper, exact, numeric)
+            return None
+        return DefiniteIntegral(antiderivative, exact, value, float(upper_value), float(lower_value))
+    
+    @staticmethod
+    def _rounded(value):
+        """מספר להצגה - שלם אם הערך שלם, אחרת שלוש ספרות אחרי הנקודה"""
+        if abs(value - round(value)) < 1e-9:
+            return Integer(round(value))
+        return Float(round(value, 3))
+    
+    def _definite_wrong_answers(self, definite, correct_answer):
+        """מסיחים מספריים: טעויות נפוצות בהצבת הגבולות, ואז ערכים קרובים לתשובה"""
+        value = definite.value
+        mistakes = [-value, definite.upper, definite.upper + definite.lower, 2 * value, value / 2]
+        nearby = [value * factor for factor in (0.8, 0.9, 1.1, 1.2, 1.25)] + [value - 1, value + 1, value + 0.5]
+        random.shuffle(mistakes)
+        random.shuffle(nearby)
+        
+        wrong_answers = []
+        for candidate in mistakes[:2] + nearby + mistakes[2:]:
+            text = f"\\( {self.math.tex(self._rounded(candidate))} \\)"
+            if text != correct_answer and text not in wrong_answers:
+                wrong_answers.append(text)
+        return wrong_answers[:3]
+    
+    def _compute_integral(self, func):
+        """אינטגרציה ונרמול - החלק הסימבולי היקר שנשמר ב-cache לכל פונקציה"""
+        with self.stage('symbolic'):
+            integral = integrate(func, self.x)
+        with self.stage('normalize'):
+            return self.normalize_expression(integral)
+    
     def _identify_difficulty(self, func):
         """זיהוי רמת הקושי של פונקציה"""
         if func in self.easy_functions:
@@ -111,93 +259,36 @@ class IntegralsGenerator(BaseQuestionGenerator):
         else:
             return 'easy'  # ברירת מחדל
 
+    def _compute_steps(self, func):
+        """צעדי האינטגרציה להסבר - נגזרים מעץ הביטוי פעם אחת לכל פונקציה במאגר"""
+        with self.stage('symbolic'):
+            return integration_steps(func, self.x)
+    
     def _generate_detailed_explanation(self, func, integral, difficulty):
-        """יצירת הסבר מפורט לפי רמת קושי"""
-        base_explanation = f"האינטגרל של \\( {latex(func)} \\) הוא \\( {latex(integral)} + C \\)"
-        
-        func_str = str(func)
-        
-        if difficulty == 'easy':
-            if func == self.x:
-                return base_explanation + ". כלל החזקה: \\( \\int x^n dx = \\frac{x^{n+1}}{n+1} + C \\)"
-            elif 'sin' in func_str:
-                return base_explanation + ". \\( \\int \\sin(x) dx = -\\cos(x) + C \\)"
-            elif 'cos' in func_str:
-                return base_explanation + ". \\( \\int \\cos(x) dx = \\sin(x) + C \\)"
-            elif 'exp' in func_str:
-                return base_explanation + ". \\( \\int e^x dx = e^x + C \\)"
-            elif '1/x' in func_str:
-                return base_explanation + ". \\( \\int \\frac{1}{x} dx = \\ln|x| + C \\)"
-        
-        elif difficulty == 'medium':
-            if 'sin(2' in func_str or 'cos(2' in func_str:
-                return base_explanation + ". החלפת משתנה: \\( u = 2x, du = 2dx \\)"
-            elif 'exp(2' in func_str:
-                return base_explanation + ". החלפת משתנה: \\( u = 2x, du = 2dx \\)"
-            elif '2*x + 1' in func_str:
-                return base_explanation + ". החלפת משתנה: \\( u = 2x + 1, du = 2dx \\)"
-            else:
-                return base_explanation + ". שימוש בהחלפת משתנה או כלל השרשרת הפוך"
-        
-        elif difficulty == 'hard':
-            if '*sin(' in func_str or '*cos(' in func_str or '*exp(' in func_str:
-                return base_explanation + ". שימוש באינטגרציה בחלקים: \\( \\int u dv = uv - \\int v du \\)"
-            elif 'log(' in func_str:
-                return base_explanation + ". שימוש באינטגרציה בחלקים עם \\( u = \\ln(x), dv = dx \\)"
-            elif 'x**2 + 1' in func_str:
-                return base_explanation + ". אינטגרל טריגונומטרי: \\( \\int \\frac{1}{x^2+1} dx = \\arctan(x) + C \\)"
-            else:
-                return base_explanation + ". שימוש בשיטות אינטגרציה מתקדמות"
-        
-        return base_explanation
+        """הסבר מפורט: התוצאה ואחריה הצעדים השמורים של הפונקציה"""
+        steps = self.cached('integration_steps', func, lambda: self._compute_steps(func))
+        base_explanation = f"האינטגרל של \\( {self.math.tex(func)} \\) הוא \\( {self.math.plus_constant(integral)} \\)."
+        if not steps:
+            return base_explanation
+        return f"{base_explanation} {render_steps(steps)}"
 
-    def _generate_smart_wrong_answers(self, func, correct_integral, difficulty):
+    def _compute_distractors(self, func):
+        """מסיחים מטעויות נפוצות לפי מבנה האינטגרנד, מסוננים נומרית ומנורמלים - פעם אחת לכל פונקציה"""
+        integral = self.cached('integral', func, lambda: self._compute_integral(func))
+        with self.stage('symbolic'):
+            candidates = distinct_mistakes(func, integral, self.x)
+        with self.stage('normalize'):
+            return list(dict.fromkeys(f"\\( {self.math.plus_constant(self.normalize_expression(candidate))} \\)"
+                                      for candidate in candidates))
+    
+    def _generate_smart_wrong_answers(self, func, correct_integral):
         """יוצר תשובות שגויות חכמות לאינטגרלים - ללא כפילויות"""
-        wrong_answers = []
-        correct_latex = f"\\( {latex(correct_integral)} + C \\)"
-        
-        try:
-            derivative = diff(func, self.x)
-            derivative = self.normalize_expression(derivative)
-            derivative_latex = f"\\( {latex(derivative)} + C \\)"
-            if derivative_latex != correct_latex:
-                wrong_answers.append(derivative_latex)
-        except:
-            pass
-        
-        func_latex = f"\\( {latex(func)} + C \\)"
-        if func_latex != correct_latex and func_latex not in wrong_answers:
-            wrong_answers.append(func_latex)
-        
-        if difficulty == 'easy':
-            if func == self.x**2:
-                candidate = "\\( x^3 + C \\)"  
-                if candidate not in wrong_answers and candidate != correct_latex:
-                    wrong_answers.append(candidate)
-            elif func == self.x:
-                candidate = "\\( x^2 + C \\)"  
-                if candidate not in wrong_answers and candidate != correct_latex:
-                    wrong_answers.append(candidate)
-            elif func == 3*self.x**2:
-                candidate = "\\( 3x^3 + C \\)"  
-                if candidate not in wrong_answers and candidate != correct_latex:
-                    wrong_answers.append(candidate)
-        
-        elif difficulty == 'medium':
-            if 'sin(2' in str(func):
-                candidate = "\\( -\\cos(2x) + C \\)" 
-                if candidate not in wrong_answers and candidate != correct_latex:
-                    wrong_answers.append(candidate)
-            elif 'cos(2' in str(func):
-                candidate = "\\( \\sin(2x) + C \\)"  
-                if candidate not in wrong_answers and candidate != correct_latex:
-                    wrong_answers.append(candidate)
-        
-        elif difficulty == 'hard':
-            if '*' in str(func):
-                candidate = "\\( 0 + C \\)"  
-                if candidate not in wrong_answers and candidate != correct_latex:
-                    wrong_answers.append(candidate)
+        correct_latex = f"\\( {self.math.plus_constant(correct_integral)} \\)"
+        wrong_answers = [candidate for candidate in self.cached('integral_distractors', func,
+                                                                lambda: self._compute_distractors(func))
+                         if candidate != correct_latex]
+        if len(wrong_answers) >= 3:
+            return random.sample(wrong_answers, 3)
         
         common_wrong = [
             "\\( 0 + C \\)", 
@@ -219,22 +310,7 @@ class IntegralsGenerator(BaseQuestionGenerator):
             if wrong not in wrong_answers and wrong != correct_latex:
                 wrong_answers.append(wrong)
         
-        while len(wrong_answers) < 3:
-            backup_answers = [
-                f"\\( {random.randint(1,5)}x + C \\)",
-                f"\\( \\frac{{x^{random.randint(2,4)}}}{{{random.randint(2,4)}}} + C \\)",
-                f"\\( {random.randint(1,3)}x^{random.randint(2,3)} + C \\)",
-                "\\( -\\sin(x) + C \\)",
-                "\\( -\\cos(x) + C \\)"
-            ]
-            for backup in backup_answers:
-                if backup not in wrong_answers and backup != correct_latex:
-                    wrong_answers.append(backup)
-                    break
-            if len(wrong_answers) >= 3:
-                break
-        
-        return wrong_answers[:3]  
+        return wrong_answers
 
     def shuffle_options(self, correct_answer, wrong_answers):
  
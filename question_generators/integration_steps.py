@@ -0,0 +1,199 @@
+from collections import namedtuple
+from sympy import Abs, Mul, Poly, Symbol, asin, atan, cancel, cos, diff, exp, expand, factor, integrate, latex, log
+from sympy import preorder_traversal, simplify, sin, sqrt, sympify
+import logging
+
+logger = logging.getLogger(__name__)
+
+# צעד בהסבר: שם הכלל ושדות LaTeX מוכנים - רשימת הצעדים נשמרת ב-cache לכל פונקציה במאגר
+IntegrationStep = namedtuple('IntegrationStep', 'rule fields')
+
+# עומק מקסימלי של צעדים מקוננים (אינטגרציה בחלקים פעמיים, החלפה בתוך חלקים)
+MAX_DEPTH = 4
+
+_u = Symbol('u')
+
+STEP_TEMPLATES = {
+    'constant': "אינטגרל של קבוע: \\( \\int {integrand} \\, dx = {result} \\)",
+    'constant_factor': "מוציאים את הקבוע \\( {factor} \\) מחוץ לאינטגרל ומחשבים את \\( \\int {integrand} \\, dx \\)",
+    'sum': "אינטגרל של סכום הוא סכום האינטגרלים - מחשבים כל איבר בנפרד",
+    'power': ("כלל החזקה \\( \\int x^{{n}} \\, dx = \\frac{{x^{{n+1}}}}{{n+1}} \\) עם \\( n = {exponent} \\): "
+              "\\( \\int {integrand} \\, dx = {result} \\)"),
+    'log_rule': "\\( \\int \\frac{{1}}{{x}} \\, dx = \\ln|x| \\), ולכן \\( \\int {integrand} \\, dx = {result} \\)",
+    'table': "אינטגרל מיידי: \\( \\int {integrand} \\, dx = {result} \\)",
+    'expand': "פותחים סוגריים: \\( {integrand} = {expanded} \\)",
+    'substitution': ("החלפת משתנה \\( u = {u} \\), \\( du = {du} \\, dx \\): \\( \\int {integrand} \\, du = {result} \\), "
+                     "ומחזירים את \\( u \\): \\( {back} \\)"),
+    'parts': ("אינטגרציה בחלקים \\( \\int u \\, dv = uv - \\int v \\, du \\) עם \\( u = {u} \\), \\( dv = {dv} \\, dx \\): "
+              "\\( du = {du} \\, dx \\), \\( v = {v} \\), ונשאר לחשב \\( \\int {remaining} \\, dx \\)"),
+    'cyclic': ("אחרי שתי אינטגרציות בחלקים האינטגרל המקורי \\( I \\) חוזר: \\( I = {equation} \\), "
+               "מעבירים אגף ומקבלים \\( I = {result} \\)"),
+    'advanced': "אין כלל ישיר פשוט; התוצאה: \\( \\int {integrand} \\, dx = {result} \\)",
+}
+
+
+def _step(rule, **fields):
+    return IntegrationStep(rule, fields)
+
+
+def _table(x):
+    """אינטגרלים מיידיים"""
+    return {
+        sin(x): -cos(x),
+        cos(x): sin(x),
+        exp(x): exp(x),
+        1 / (x**2 + 1): atan(x),
+        1 / sqrt(1 - x**2): asin(x),
+    }
+
+
+def _is_linear(expr, x):
+    return expr != x and expr.has(x) and expr.is_polynomial(x) and Poly(expr, x).degree() == 1
+
+
+def _linear_inner(expr, x):
+    """a·x + b כשהביטוי הוא f(a·x + b) לפונקציה מיידית או חזקה - החלפה ליניארית"""
+    if expr.is_Pow and not expr.exp.has(x) and _is_linear(expr.base, x):
+        return expr.base
+    if expr.func in (sin, cos, exp) and _is_linear(expr.args[0], x):
+        return expr.args[0]
+    return None
+
+
+def _substitution(expr, x):
+    """u = g(x) כך שהאינטגרנד הוא h(u)·u' - בודקים את הארגומנטים והבסיסים שבעץ הביטוי"""
+    seen = set()
+    for node in preorder_traversal(expr):
+        if node.is_Pow:
+            candidate = node.base
+        elif node.is_Function:
+            candidate = node.args[0]
+        else:
+            continue
+        if candidate == x or not candidate.has(x) or candidate in seen:
+            continue
+        seen.add(candidate)
+        ratio = expr / diff(candidate, x)
+        for form in (ratio, factor(ratio)):
+            integrand = form.subs(candidate, _u)
+            if not integrand.has(x):
+                return candidate, integrand
+    return None
+
+
+def _parts_choice(expr, x):
+    """(u, dv) לפי LIATE: לוגריתם, אחריו פולינום; dv הוא שאר הגורמים"""
+    factors = Mul.make_args(expr)
+    logs = [f for f in factors if f.func == log]
+    if logs:
+        u = logs[0]
+    else:
+        polynomials = [f for f in factors if f.is_polynomial(x) and f.has(x)]
+        others = [f for f in factors if f not in polynomials]
+        if not polynomials or not others or not all(f.func in (sin, cos, exp) for f in others):
+            return None
+        u = Mul(*polynomials)
+    return u, cancel(expr / u)
+
+
+def _cyclic_parts(expr, x):
+    """e^x·sin(x) / e^x·cos(x): שתי אינטגרציות בחלקים והאינטגרל חוזר - פותרים עבור I"""
+    factors = Mul.make_args(expr)
+    if len(factors) != 2:
+        return None
+    trig = [f for f in factors if f.func in (sin, cos)]
+    exponential = [f for f in factors if f.func == exp]
+    if len(trig) != 1 or len(exponential) != 1:
+        return None
+
+    steps = []
+    boundary = []
+    remaining = expr
+    u = trig[0]
+    for _ in range(2):
+        dv = cancel(remaining / u)
+        du, v = diff(u, x), integrate(dv, x)
+        boundary.append(u * v)
+        next_remaining = simplify(v * du)
+        steps.append(_step('parts', u=latex(u), dv=latex(dv), du=latex(du), v=latex(v),
+                           remaining=latex(next_remaining)))
+        remaining = next_remaining
+        u = cancel(remaining.as_independent(x, as_Add=False)[1] / exponential[0])
+
+    # I = B1 - (B2 - ∫ k·I) = B1 - B2 + k·I
+    k = simplify(remaining / expr)
+    if k.has(x) or k == 1:
+        return None
+    result = (boundary[0] - boundary[1]) / (1 - k)
+    steps.append(_step('cyclic', equation=latex(boundary[0] - boundary[1] + k * Symbol('I')), result=latex(result)))
+    return steps
+
+
+def _steps(expr, x, depth):
+    if depth > MAX_DEPTH:
+        return [_step('advanced', integrand=latex(expr), result=latex(integrate(expr, x)))]
+
+    if not expr.has(x):
+        return [_step('constant', integrand=latex(expr), result=latex(expr * x))]
+
+    if expr.is_Add:
+        steps = [_step('sum')]
+        for term in expr.as_ordered_terms():
+            steps += _steps(term, x, depth + 1)
+        return steps
+
+    coeff, exponent = expr.as_coeff_exponent(x)
+    if not coeff.has(x) and exponent.is_number and exponent != 0:
+        if exponent == -1:
+            return [_step('log_rule', integrand=latex(expr), result=latex(coeff * log(Abs(x))))]
+        result = coeff * x**(exponent + 1) / (exponent + 1)
+        return [_step('power', exponent=latex(exponent), integrand=latex(expr), result=latex(result))]
+
+    factor_, rest = expr.as_independent(x, as_Add=False)
+    if factor_ != 1:
+        return [_step('constant_factor', factor=latex(factor_), integrand=latex(rest))] + _steps(rest, x, depth + 1)
+
+    table = _table(x)
+    if expr in table:
+        return [_step('table', integrand=latex(expr), result=latex(table[expr]))]
+
+    inner = _linear_inner(expr, x)
+    substitution = (inner, expr.subs(inner, _u) / diff(inner, x)) if inner is not None else None
+    if substitution is None and expr.is_polynomial(x):
+        expanded = expand(expr)
+        return [_step('expand', integrand=latex(expr), expanded=latex(expanded))] + _steps(expanded, x, depth + 1)
+    if substitution is None:
+        substitution = _substitution(expr, x)
+    if substitution is not None:
+        u, integrand = substitution
+        result = integrate(integrand, _u)
+        return [_step('substitution', u=latex(u), du=latex(diff(u, x)), integrand=latex(integrand),
+                      result=latex(result), back=latex(result.subs(_u, u)))]
+
+    cyclic = _cyclic_parts(expr, x)
+    if cyclic is not None:
+        return cyclic
+
+    parts = _parts_choice(expr, x)
+    if parts is not None:
+        u, dv = parts
+        du, v = diff(u, x), integrate(dv, x)
+        remaining = simplify(v * du)
+        return ([_step('parts', u=latex(u), dv=latex(dv), du=latex(du), v=latex(v), remaining=latex(remaining))]
+                + _steps(remaining, x, depth + 1))
+
+    return [_step('advanced', integrand=latex(expr), result=latex(integrate(expr, x)))]
+
+
+def integration_steps(func, x):
+    """רשימת הצעדים לחישוב ∫func dx, לפי מבנה הביטוי (לא לפי המחרוזת שלו)"""
+    try:
+        return _steps(sympify(func), x, 0)
+    except Exception as e:
+        logger.warning("⚠️ בניית צעדי אינטגרציה נכשלה עבור %s: %s", func, e)
+        return []
+
+
+def render_steps(steps):
+    """הצעדים כטקסט בעברית, משפט לכל צעד"""
+    return " ".join(STEP_TEMPLATES[step.rule].format(**step.fields) + "." for step in steps)
@@ -0,0 +1,166 @@
+from contextlib import nullcontext
+from sympy import Poly, cancel, fraction, limit, nan, oo, sign, simplify, sympify, zoo
+from sympy.core.sympify import SympifyError
+from metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('calcmaster_limit_strategy_total', 'Limits resolved, by the strategy that resolved them')
+metrics.describe('calcmaster_limit_mismatch_total', 'Computed limits that differ from the curated expected answer')
+
+# אסטרטגיה שלא הכריעה - ממשיכים לבאה (None פירושו שהגבול לא קיים)
+UNRESOLVED = object()
+
+# התשובה במאגר לגבול דו-צדדי שלא קיים
+NO_LIMIT = "לא קיים"
+
+
+def _is_value(value):
+    """ערך סופי או ±∞ בלי x - לא nan/zoo"""
+    return value is not None and value not in (nan, zoo) and not value.free_symbols
+
+
+def _no_stage(name):
+    return nullcontext()
+
+
+def _compute(cache_name, key, compute):
+    return compute()
+
+
+class LimitEngine:
+    """חישוב גבולות: אסטרטגיות זולות קודם, limit() המלא רק כשהן לא מכריעות
+
+    שני הגבולות החד-צדדיים מחושבים יחד ונשמרים כזוג לפי (ביטוי, נקודה) דרך
+    cached של המחולל, כך ש-'+', '-' ו-'+-' (דו-צדדי) חולקים חישוב אחד, נכנסים
+    ל-warm-up ומתאפסים ב-clear_caches. בנקודות באינסוף יש כיוון אחד בלבד.
+    """
+
+    def __init__(self, x, cached=None, stage=None):
+        self.x = x
+        self._cached = cached or _compute
+        self._stage = stage or _no_stage
+        self._strategies = (
+            ('substitution', self._substitute),
+            ('cancellation', self._cancel),
+            ('leading_term', self._leading_term),
+        )
+
+    def evaluate(self, expr, point, dir='+-'):
+        """ערך הגבול, או None אם הוא לא קיים (גבולות חד-צדדיים שונים) או שלא חושב"""
+        left, right = self.sides(expr, point)
+        if dir == '+':
+            return right
+        if dir == '-':
+            return left
+        return left if left == right else None
+
+    def sides(self, expr, point):
+        """(גבול משמאל, גבול מימין) - באינסוף שני האיברים שווים לגבול היחיד"""
+        return self._cached('limit_table', (expr, point), lambda: self.compute_sides(expr, point))
+
+    def compute_sides(self, expr, point):
+        """כמו sides, בלי cache"""
+        for name, strategy in self._strategies:
+            with self._stage('symbolic'):
+                try:
+                    value = strategy(expr, point)
+                except Exception:
+                    value = UNRESOLVED
+            if value is not UNRESOLVED:
+                metrics.inc('calcmaster_limit_strategy_total', strategy=name)
+                return value
+
+        with self._stage('symbolic'):
+            if point in (oo, -oo):
+                value = self._limit(expr, point, '-' if point == oo else '+')
+                result = (value, value)
+            else:
+                # קריאה דו-צדדית אחת; רק כשהצדדים שונים מחשבים כל צד בנפרד
+                value = self._limit(expr, point, '+-')
+                if value is not None:
+                    result = (value, value)
+                else:
+                    result = (self._limit(expr, point, '-'), self._limit(expr, point, '+'))
+        metrics.inc('calcmaster_limit_strategy_total',
+                    strategy='failed' if result == (None, None) else 'limit')
+        return result
+
+    def _limit(self, expr, point, dir):
+        try:
+            value = limit(expr, self.x, point, dir)
+        except ValueError:
+            # dir='+-' והגבולות החד-צדדיים שונים
+            return None
+        except Exception as e:
+            logger.warning("⚠️ limit() נכשל עבור %s ב-%s%s: %s", expr, point, dir, e)
+            return None
+        return value if _is_value(value) else None
+
+    def _substitute(self, expr, point):
+        """הצבה ישירה - לפונקציה רציפה בנקודה"""
+        if point in (oo, -oo):
+            return UNRESOLVED
+        value = expr.subs(self.x, point)
+        return (value, value) if _is_value(value) else UNRESOLVED
+
+    def _cancel(self, expr, point):
+        """פונקציה רציונלית: צמצום גורמים משותפים, או השוואת מעלות באינסוף"""
+        if not expr.is_rational_function(self.x):
+            return UNRESOLVED
+        reduced = cancel(expr)
+        if point not in (oo, -oo):
+            value = reduced.subs(self.x, point)
+            return (value, value) if _is_value(value) else UNRESOLVED
+
+        numerator, denominator = fraction(reduced)
+        numerator, denominator = Poly(numerator, self.x), Poly(denominator, self.x)
+        excess = numerator.degree() - denominator.degree()
+        ratio = numerator.LC() / denominator.LC()
+        if excess < 0:
+            value = sympify(0)
+        elif excess == 0:
+            value = ratio
+        else:
+            if point == -oo and excess % 2:
+                ratio = -ratio
+            value = sign(ratio) * oo
+        return value, value
+
+    def _leading_term(self, expr, point):
+        """האיבר המוביל c·h^k של הטור סביב הנקודה (h = x - a)"""
+        if point in (oo, -oo):
+            return UNRESOLVED
+        shifted = expr.subs(self.x, self.x + point)
+        coeff, exponent = shifted.as_leading_term(self.x).as_coeff_exponent(self.x)
+        if coeff.free_symbols or not exponent.is_Rational or not _is_value(coeff):
+            return UNRESOLVED
+        if exponent == 0:
+            return coeff, coeff
+        if exponent > 0:
+            return sympify(0), sympify(0)
+
+        # קוטב: מימין c·∞, משמאל תלוי בזוגיות החזקה (בחזקה שבורה הצד השמאלי לא מוגדר)
+        right = sign(coeff) * oo
+        if not exponent.is_Integer:
+            return None, right
+        return (right if exponent % 2 == 0 else -right), right
+
+    @staticmethod
+    def matches(value, expected_answer):
+        """האם הערך שחושב תואם לתשובה הצפויה במאגר; None אם אי אפשר להשוות"""
+        expected_answer = expected_answer.strip()
+        if expected_answer == NO_LIMIT:
+            return value is None
+        try:
+            expected = sympify(expected_answer.replace('∞', 'oo').replace('ln', 'log'))
+        except (SympifyError, SyntaxError, TypeError):
+            return None
+        if value is None:
+            return False
+        if value == expected:
+            return True
+        if not value.is_finite or not expected.is_finite:
+            return False
+        return simplify(value - expected) == 0
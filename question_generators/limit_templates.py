@@ -0,0 +1,237 @@
+from collections import namedtuple
+from fractions import Fraction
+from sympy import cos, exp, oo, sin, sqrt, symbols
+from .limit_engine import NO_LIMIT
+import random
+
+# מקרה גבול מתבנית: הכל מחרוזות מוכנות, expr() בונה את הביטוי ב-SymPy רק לבדיקה
+LimitCase = namedtuple('LimitCase', 'template func_tex point point_tex answer wrong method explanation difficulty expr '
+                                    'direction', defaults=('+-',))
+
+_x = symbols('x')
+
+
+def _fmt(value):
+    """Fraction -> '7' / '-3/2', כמו str() של Rational ב-SymPy"""
+    value = Fraction(value)
+    return str(value.numerator) if value.denominator == 1 else f"{value.numerator}/{value.denominator}"
+
+
+def _tex_number(value):
+    value = Fraction(value)
+    if value.denominator == 1:
+        return str(value.numerator)
+    sign = '-' if value < 0 else ''
+    return f"{sign}\\frac{{{abs(value.numerator)}}}{{{value.denominator}}}"
+
+
+def _poly_tex(coeffs):
+    """[(מקדם, חזקה)] - 'x^{2} - 3 x + 1'"""
+    parts = []
+    for coef, power in coeffs:
+        if coef == 0:
+            continue
+        magnitude = abs(coef)
+        if power == 0:
+            text = str(magnitude)
+        else:
+            body = 'x' if power == 1 else f'x^{{{power}}}'
+            text = body if magnitude == 1 else f'{magnitude} {body}'
+        if parts:
+            parts.append(f"{'-' if coef < 0 else '+'} {text}")
+        else:
+            parts.append(f"- {text}" if coef < 0 else text)
+    return ' '.join(parts) or '0'
+
+
+def _poly_expr(coeffs):
+    return sum(coef * _x**power for coef, power in coeffs)
+
+
+def _shift_tex(a):
+    """'x - a' עם סימן נכון"""
+    return f"x - {a}" if a > 0 else f"x + {-a}"
+
+
+def _nonzero(low, high):
+    return random.choice([n for n in range(low, high + 1) if n != 0])
+
+
+def _wrong(answer, *candidates):
+    """מסיחים ייחודיים ושונים מהתשובה, לפי הסדר"""
+    wrong = []
+    for candidate in candidates:
+        text = candidate if isinstance(candidate, str) else _fmt(candidate)
+        if text != answer and text not in wrong:
+            wrong.append(text)
+    return wrong
+
+
+# === קל 🟢 ===
+
+def polynomial_substitution():
+    a = _nonzero(-5, 5)
+    coeffs = [(_nonzero(-4, 4), 2), (random.randint(-6, 6), 1), (random.randint(-9, 9), 0)]
+    value = sum(coef * a**power for coef, power in coeffs)
+    answer = _fmt(value)
+    swapped = coeffs[0][0] * a * a - coeffs[1][0] * a + coeffs[2][0]
+    return LimitCase(
+        'polynomial_substitution', _poly_tex(coeffs), a, str(a), answer,
+        _wrong(answer, swapped, value + 1, value - 1, coeffs[2][0], NO_LIMIT),
+        "חזרה ישירה",
+        f"פולינום רציף בכל נקודה, לכן מציבים \\( x = {a} \\) ומקבלים \\( {_tex_number(value)} \\).",
+        'easy', lambda: _poly_expr(coeffs))
+
+
+def root_substitution():
+    root = random.randint(2, 9)
+    a = random.randint(-5, 9)
+    c = root * root - a
+    inner = _poly_tex([(1, 1), (c, 0)])
+    answer = _fmt(root)
+    return LimitCase(
+        'root_substitution', f"\\sqrt{{{inner}}}", a, str(a), answer,
+        _wrong(answer, root * root, -root, root + 1, NO_LIMIT),
+        "חזרה ישירה",
+        f"השורש רציף כשהביטוי שבתוכו חיובי: מציבים \\( x = {a} \\) ומקבלים \\( \\sqrt{{{root * root}}} = {root} \\).",
+        'easy', lambda: sqrt(_x + c))
+
+
+# === בינוני 🟡 - צורות 0/0 ===
+
+def difference_of_squares():
+    a = _nonzero(-9, 9)
+    answer = _fmt(2 * a)
+    return LimitCase(
+        'difference_of_squares', f"\\frac{{x^{{2}} - {a * a}}}{{{_shift_tex(a)}}}", a, str(a), answer,
+        _wrong(answer, a, a * a, 0, NO_LIMIT),
+        "פישוט",
+        f"צורת 0/0: \\( x^{{2}} - {a * a} = ({_shift_tex(a)})({_shift_tex(-a)}) \\), מצמצמים ומציבים "
+        f"\\( x = {a} \\) ב-\\( {_shift_tex(-a)} \\): מקבלים \\( {2 * a} \\).",
+        'medium', lambda: (_x**2 - a * a) / (_x - a))
+
+
+def difference_of_cubes():
+    a = _nonzero(-5, 5)
+    answer = _fmt(3 * a * a)
+    return LimitCase(
+        'difference_of_cubes', f"\\frac{{x^{{3}} {'-' if a > 0 else '+'} {abs(a**3)}}}{{{_shift_tex(a)}}}",
+        a, str(a), answer,
+        _wrong(answer, a * a, 2 * a * a, 3 * a, 0, NO_LIMIT),
+        "פישוט",
+        f"צורת 0/0: \\( x^{{3}} - a^{{3}} = (x - a)(x^{{2}} + a x + a^{{2}}) \\) עם \\( a = {a} \\); "
+        f"אחרי הצמצום מציבים ומקבלים \\( 3a^{{2}} = {3 * a * a} \\).",
+        'medium', lambda: (_x**3 - a**3) / (_x - a))
+
+
+def rationalization():
+    a = random.randint(1, 9)
+    value = Fraction(1, 2 * a)
+    answer = _fmt(value)
+    return LimitCase(
+        'rationalization', f"\\frac{{\\sqrt{{x + {a * a}}} - {a}}}{{x}}", 0, '0', answer,
+        _wrong(answer, Fraction(1, a), Fraction(a, 2), 2 * a, 0, NO_LIMIT),
+        "רציונליזציה",
+        f"צורת 0/0: כופלים בצמוד \\( \\sqrt{{x + {a * a}}} + {a} \\) ומקבלים "
+        f"\\( \\frac{{1}}{{\\sqrt{{x + {a * a}}} + {a}}} \\to \\frac{{1}}{{{2 * a}}} \\).",
+        'medium', lambda: (sqrt(_x + a * a) - a) / _x)
+
+
+def sine_ratio():
+    k = random.randint(2, 9)
+    m = random.choice([n for n in range(1, 10) if n != k])
+    value = Fraction(k, m)
+    answer = _fmt(value)
+    denominator = 'x' if m == 1 else f'{m} x'
+    return LimitCase(
+        'sine_ratio', f"\\frac{{\\sin{{\\left({k} x \\right)}}}}{{{denominator}}}", 0, '0', answer,
+        _wrong(answer, Fraction(m, k), 1, k, 0, NO_LIMIT),
+        "גבול טריגונומטרי",
+        f"לפי \\( \\lim_{{t \\to 0}} \\frac{{\\sin t}}{{t}} = 1 \\) עם \\( t = {k}x \\): "
+        f"\\( \\frac{{{k}}}{{{m}}} \\cdot \\frac{{\\sin {k}x}}{{{k}x}} \\to {_tex_number(value)} \\).",
+        'medium', lambda: sin(k * _x) / (m * _x))
+
+
+def cosine_ratio():
+    k = random.randint(1, 8)
+    value = Fraction(k * k, 2)
+    answer = _fmt(value)
+    argument = 'x' if k == 1 else f'{k} x'
+    return LimitCase(
+        'cosine_ratio', f"\\frac{{1 - \\cos{{\\left({argument} \\right)}}}}{{x^{{2}}}}", 0, '0', answer,
+        _wrong(answer, Fraction(k, 2), k * k, 0, NO_LIMIT),
+        "גבול טריגונומטרי",
+        f"לפי \\( 1 - \\cos t \\approx \\frac{{t^{{2}}}}{{2}} \\) עם \\( t = {argument} \\): "
+        f"\\( \\frac{{({argument})^{{2}}}}{{2 x^{{2}}}} \\to {_tex_number(value)} \\).",
+        'medium', lambda: (1 - cos(k * _x)) / _x**2)
+
+
+# === קשה 🔴 ===
+
+def exponential_ratio():
+    k = _nonzero(-6, 6)
+    answer = _fmt(k)
+    argument = 'x' if k == 1 else ('- x' if k == -1 else f'{k} x')
+    return LimitCase(
+        'exponential_ratio', f"\\frac{{e^{{{argument}}} - 1}}{{x}}", 0, '0', answer,
+        _wrong(answer, 1, -k, Fraction(1, k), 0, NO_LIMIT),
+        "L'Hospital או טור טיילור",
+        f"צורת 0/0: לפי לופיטל הגבול שווה ל-\\( {k} e^{{{k} \\cdot 0}} = {k} \\).",
+        'hard', lambda: (exp(k * _x) - 1) / _x)
+
+
+def rational_at_infinity():
+    n, m = random.randint(1, 3), random.randint(1, 3)
+    p, q = _nonzero(-6, 6), _nonzero(-6, 6)
+    numerator = [(p, n)] + [(random.randint(-5, 5), power) for power in range(n - 1, -1, -1)]
+    denominator = [(q, m)] + [(_nonzero(-5, 5) if power == 0 else random.randint(-5, 5), power)
+                              for power in range(m - 1, -1, -1)]
+    ratio = Fraction(p, q)
+    if n < m:
+        answer, reason = "0", "מעלת המונה קטנה ממעלת המכנה"
+    elif n == m:
+        answer, reason = _fmt(ratio), "המעלות שוות - הגבול הוא יחס המקדמים המובילים"
+    else:
+        answer = "∞" if ratio > 0 else "-∞"
+        reason = "מעלת המונה גדולה ממעלת המכנה - הסימן לפי יחס המקדמים המובילים"
+    return LimitCase(
+        'rational_at_infinity', f"\\frac{{{_poly_tex(numerator)}}}{{{_poly_tex(denominator)}}}",
+        oo, '\\infty', answer,
+        _wrong(answer, ratio, Fraction(q, p), 0, "∞", "-∞", NO_LIMIT),
+        "גבול לאינסוף - חלוקה בחזקה הגבוהה",
+        f"מחלקים מונה ומכנה ב-\\( x^{{{max(n, m)}}} \\): {reason}.",
+        'hard', lambda: _poly_expr(numerator) / _poly_expr(denominator))
+
+
+def one_sided_pole():
+    a = _nonzero(-6, 6)
+    c = _nonzero(-5, 5)
+    side = random.choice('+-')
+    positive = (c > 0) == (side == '+')
+    answer = "∞" if positive else "-∞"
+    side_name = "מימין" if side == '+' else "משמאל"
+    denominator_side = "מהצד החיובי" if side == '+' else "מהצד השלילי"
+    answer_tex = "\\infty" if positive else "-\\infty"
+    return LimitCase(
+        'one_sided_pole', f"\\frac{{{c}}}{{{_shift_tex(a)}}}", a, f"{a}^{{{side}}}", answer,
+        _wrong(answer, "-∞" if positive else "∞", 0, NO_LIMIT, c),
+        "גבול חד-צדדי",
+        f"כשמתקרבים ל-\\( {a} \\) {side_name}, המכנה שואף ל-0 {denominator_side}, "
+        f"ולכן השבר שואף ל-\\( {answer_tex} \\).",
+        'hard', lambda: c / (_x - a), direction=side)
+
+
+TEMPLATES = {
+    'easy': (polynomial_substitution, root_substitution),
+    'medium': (difference_of_squares, difference_of_cubes, rationalization, sine_ratio, cosine_ratio),
+    'hard': (exponential_ratio, rational_at_infinity, one_sided_pole),
+}
+
+
+def random_case(difficulty='mixed'):
+    """מקרה גבול חדש מתבנית אקראית; mixed - מכל הרמות"""
+    if difficulty in TEMPLATES:
+        templates = TEMPLATES[difficulty]
+    else:
+        templates = [template for group in TEMPLATES.values() for template in group]
+    return random.choice(templates)()
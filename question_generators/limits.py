@@ -1,12 +1,24 @@
 from .base_generator import BaseQuestionGenerator
-from sympy import latex, sin, cos, exp, sqrt, limit, oo, log, tan, simplify, sympify
+from sympy import latex, sin, cos, exp, sqrt, oo, log, tan, simplify, sympify
+from app_logging import sample_debug
+from metrics import metrics
+from .limit_engine import LimitEngine, NO_LIMIT
+from .limit_templates import random_case
+import logging
+import os
 import random
 
+logger = logging.getLogger(__name__)
+
 class LimitsGenerator(BaseQuestionGenerator):
     """מחולל שאלות גבולות עם רמות קושי"""
+    topic = 'limits'
     
     def __init__(self):
         super().__init__()
+        self.limit_engine = LimitEngine(self.x, cached=self.cached, stage=self.stage)
+        # חלק השאלות שנוצרות מתבניות פרמטריות (limit_templates) במקום מהמאגר הקבוע
+        self.parametric_share = float(os.environ.get('CALCMASTER_PARAMETRIC_LIMITS', 0.5))
         
         # רמת קושי קלה 🟢 - חזרות ישירות (רציפות)
         self.easy_cases = [
@@ -47,11 +59,23 @@ class LimitsGenerator(BaseQuestionGenerator):
             (exp(self.x)/self.x, oo, "∞", "L'Hospital"),
             (log(self.x)/self.x, oo, "0", "L'Hospital"),
             (self.x*exp(-self.x), oo, "0", "L'Hospital"),
-            (1/self.x, 0, "±∞", "גבול צדדי"),
-            (abs(self.x)/self.x, 0, "±1", "גבול צדדי"),
+            (1/self.x, 0, NO_LIMIT, "גבול צדדי"),
+            (abs(self.x)/self.x, 0, NO_LIMIT, "גבול צדדי"),
             ((exp(self.x) - 1)/self.x, 0, "1", "L'Hospital או טור טיילור")
         ]
         
+        # גבולות חד-צדדיים 🔴 (פונקציה, נקודה, כיוון, תשובה, שיטה) - נכללים ברמה הקשה
+        self.one_sided_cases = [
+            (1/self.x, 0, '+', "∞", "גבול חד-צדדי"),
+            (1/self.x, 0, '-', "-∞", "גבול חד-צדדי"),
+            (abs(self.x)/self.x, 0, '+', "1", "גבול חד-צדדי"),
+            (abs(self.x)/self.x, 0, '-', "-1", "גבול חד-צדדי"),
+            (1/(self.x - 2), 2, '-', "-∞", "גבול חד-צדדי"),
+            ((self.x + 1)/(self.x - 1), 1, '+', "∞", "גבול חד-צדדי"),
+            (1/self.x**2, 0, '-', "∞", "גבול חד-צדדי"),
+            (exp(1/self.x), 0, '-', "0", "גבול חד-צדדי")
+        ]
+        
         self.difficulty_names = {
             'easy': 'קל 🟢',
             'medium': 'בינוני 🟡', 
@@ -67,61 +91,115 @@ class LimitsGenerator(BaseQuestionGenerator):
         elif difficulty == 'medium':
             cases_pool = self.medium_cases
         elif difficulty == 'hard':
-            cases_pool = self.hard_cases
+            cases_pool = self.hard_cases + self.one_sided_cases
         else:  # mixed
-            cases_pool = self.easy_cases + self.medium_cases + self.hard_cases
+            cases_pool = self.easy_cases + self.medium_cases + self.hard_cases + self.one_sided_cases
         
         for i in range(count):
+            if self.parametric_share > 0 and random.random() < self.parametric_share:
+                questions.append(self._parametric_question(difficulty, i + 1))
+                continue
+            
             if len(cases_pool) > 0:
                 case = random.choice(cases_pool)
-                func, point, expected_answer, method = case
+                func, point, direction, expected_answer, method = self._case_parts(case)
                 current_difficulty = self._identify_case_difficulty(case)
             else:
                 func = 2*self.x + 1
                 point = 1
+                direction = '+-'
                 expected_answer = "3"
                 method = "חזרה ישירה"
                 current_difficulty = 'easy'
             
-            try:
-                if point == oo:
-                    calculated_result = limit(func, self.x, oo)
-                    point_str = "\\infty"
-                else:
-                    calculated_result = limit(func, self.x, point)
-                    point_str = str(point)
+            with self.pool_function_timer(func, current_difficulty):
+                correct_answer = self.cached('limit', (func, point, direction),
+                                             lambda: self._compute_limit(func, point, expected_answer, direction))
                 
-                if calculated_result is not None and str(calculated_result) != 'nan':
-                    correct_answer = str(calculated_result)
-                    if correct_answer == 'oo':
-                        correct_answer = "∞"
-                    elif correct_answer == '-oo':
-                        correct_answer = "-∞"
-                else:
-                    correct_answer = expected_answer
-                    
-            except:
-                correct_answer = expected_answer
-                point_str = str(point) if point != oo else "\\infty"
-            
-            print(f"פונקציה: {latex(func)} | נקודה: {point} | תוצאה: {correct_answer} | קושי: {current_difficulty}")
+                if sample_debug(logger):
+                    logger.debug("פונקציה: %s | נקודה: %s | תוצאה: %s | קושי: %s",
+                                 latex(func), point, correct_answer, current_difficulty)
+                
+                with self.stage('latex'):
+                    question_text = f"חשב את הגבול: \\( {self.math.limit(func, point, direction)} \\) ({self.difficulty_names[current_difficulty]})"
+                with self.stage('distractors'):
+                    wrong_answers = self._generate_wrong_answers(correct_answer, current_difficulty)
+                all_options = self.shuffle_options(correct_answer, wrong_answers)
+                with self.stage('explanation'):
+                    explanation = self._generate_detailed_explanation(func, point, correct_answer, method, current_difficulty,
+                                                                      direction)
+                
+                question = self.format_question(
+                    question_text=question_text,
+                    options=all_options,
+                    correct_answer=correct_answer,
+                    explanation=explanation,
+                    question_id=i + 1
+                )
             
-            question_text = f"חשב את הגבול: \\( \\lim_{{x \\to {point_str}}} {latex(func)} \\) ({self.difficulty_names[current_difficulty]})"
-            wrong_answers = self._generate_wrong_answers(correct_answer, current_difficulty)
-            all_options = self.shuffle_options(correct_answer, wrong_answers)
-            explanation = self._generate_detailed_explanation(func, point, correct_answer, method, current_difficulty)
+            questions.append(question)
+        
+        return questions
+    
+    def _parametric_question(self, difficulty, question_id):
+        """שאלה ממקרה פרמטרי - התשובה והמסיחים ידועים מהבנייה, בלי SymPy"""
+        with self.stage('parametric'):
+            case = random_case(difficulty)
+            wrong_answers = random.sample(case.wrong, 3) if len(case.wrong) >= 3 else list(case.wrong)
+            if len(wrong_answers) < 3:
+                extra = [w for w in self._generate_wrong_answers(case.answer, case.difficulty) if w not in wrong_answers]
+                wrong_answers += extra[:3 - len(wrong_answers)]
             
-            question = self.format_question(
-                question_text=question_text,
-                options=all_options,
-                correct_answer=correct_answer,
+            explanation = (f"כאשר \\( x \\to {case.point_tex} \\), הגבול של \\( {case.func_tex} \\) הוא "
+                           f"\\( {self._tex_answer(case.answer)} \\). {case.explanation}")
+            return self.format_question(
+                question_text=f"חשב את הגבול: \\( \\lim_{{x \\to {case.point_tex}}} {case.func_tex} \\) ({self.difficulty_names[case.difficulty]})",
+                options=self.shuffle_options(case.answer, wrong_answers),
+                correct_answer=case.answer,
                 explanation=explanation,
-                question_id=i + 1
+                question_id=question_id
             )
-            
-            questions.append(question)
+    
+    def symbolic_entries(self):
+        entries = []
+        for case in self.easy_cases + self.medium_cases + self.hard_cases + self.one_sided_cases:
+            func, point, direction, expected, _ = self._case_parts(case)
+            entries.append(('limit', (func, point, direction),
+                            lambda func=func, point=point, expected=expected, direction=direction:
+                            self._compute_limit(func, point, expected, direction)))
+        return entries
+    
+    @staticmethod
+    def _case_parts(case):
+        """(פונקציה, נקודה, כיוון, תשובה, שיטה) - למקרים הדו-צדדיים אין כיוון במאגר"""
+        if len(case) == 5:
+            return case
+        func, point, expected_answer, method = case
+        return func, point, '+-', expected_answer, method
+    
+    def _compute_limit(self, func, point, expected_answer, direction='+-'):
+        """הגבול דרך ה-limit engine, עם נפילה לתשובה הצפויה אם לא חושב; אי-התאמה אליה נרשמת בלוג"""
+        left, right = self.limit_engine.sides(func, point)
+        value = self.limit_engine.evaluate(func, point, direction)
+        if value is None and (direction != '+-' or left is None or right is None):
+            # צד שלא חושב - לא ידוע אם הגבול קיים
+            return expected_answer
         
-        return questions
+        correct_answer = self._format_limit(value)
+        if self.limit_engine.matches(value, expected_answer) is False:
+            logger.warning("⚠️ גבול של %s ב-%s%s: חושב %s, במאגר %s", func, point,
+                           '' if direction == '+-' else direction, correct_answer, expected_answer)
+            metrics.inc('calcmaster_limit_mismatch_total', generator=self.topic)
+        return correct_answer
+    
+    def _format_limit(self, value):
+        if value is None:
+            return NO_LIMIT
+        if value == oo:
+            return "∞"
+        if value == -oo:
+            return "-∞"
+        return str(value)
     
     def _identify_case_difficulty(self, case):
         """זיהוי רמת הקושי של מקרה"""
@@ -129,14 +207,19 @@ class LimitsGenerator(BaseQuestionGenerator):
             return 'easy'
         elif case in self.medium_cases:
             return 'medium'
-        elif case in self.hard_cases:
+        elif case in self.hard_cases or case in self.one_sided_cases:
             return 'hard'
         else:
             return 'easy'
     
-    def _generate_detailed_explanation(self, func, point, result, method, difficulty):
+    def _generate_detailed_explanation(self, func, point, result, method, difficulty, direction='+-'):
         point_str = str(point) if point != oo else "\\infty"
-        base_explanation = f"כאשר \\( x \\to {point_str} \\), הגבול של \\( {latex(func)} \\) הוא \\( {result} \\)"
+        if direction != '+-':
+            point_str = f"{point_str}^{{{direction}}}"
+        if result == NO_LIMIT:
+            base_explanation = f"כאשר \\( x \\to {point_str} \\), הגבול של \\( {latex(func)} \\) לא קיים"
+        else:
+            base_explanation = f"כאשר \\( x \\to {point_str} \\), הגבול של \\( {latex(func)} \\) הוא \\( {self._tex_answer(result)} \\)"
         
         if difficulty == 'easy':
             return base_explanation + f". {method} - הפונקציה רציפה בנקודה זו."
@@ -156,13 +239,25 @@ class LimitsGenerator(BaseQuestionGenerator):
                 return base_explanation + ". בגבולות לאינסוף, מחלקים במעלה הגבוהה ביותר."
             elif "L'Hospital" in method:
                 return base_explanation + ". צורת אי-וודאות, פותרים עם כלל לופיטל."
+            elif "חד-צדדי" in method:
+                side = "מימין" if direction == '+' else "משמאל"
+                return base_explanation + f". מתקרבים לנקודה {side} בלבד, ולכן בודקים את סימן הביטוי בצד הזה."
             elif "צדדי" in method:
+                left, right = self.limit_engine.sides(func, point)
+                if left is not None and right is not None and left != right:
+                    return base_explanation + (f". הגבול משמאל הוא \\( {self._tex_answer(self._format_limit(left))} \\)"
+                                               f" ומימין \\( {self._tex_answer(self._format_limit(right))} \\)"
+                                               " - הגבולות החד-צדדיים שונים.")
                 return base_explanation + ". צריך לבדוק גבולות צדדיים."
             else:
                 return base_explanation + f". {method}."
         
         return base_explanation
     
+    @staticmethod
+    def _tex_answer(answer):
+        return answer.replace("-∞", "-\\infty").replace("∞", "\\infty")
+    
     def _generate_wrong_answers(self, correct_answer, difficulty):
         """יוצר תשובות שגויות לגבולות לפי רמת קושי"""
         
@@ -0,0 +1,154 @@
+from sympy import latex, mathml, oo
+from metrics import metrics, env_flag
+import re
+import threading
+
+MATHML_NS = 'http://www.w3.org/1998/Math/MathML'
+
+# קטע LaTeX בתוך טקסט: \( ... \)
+INLINE_MATH_RE = re.compile(r'\\\(\s*(.*?)\s*\\\)', re.S)
+MFENCED_RE = re.compile(r'<mfenced(?P<attrs>[^>]*)>|</mfenced>')
+ATTR_RE = re.compile(r'(open|close)="([^"]*)"')
+
+# ישויות שהדפדפנים מציגים כ-ⅇ / ⅆ - מוחלפות באותיות רגילות כמו ב-MathJax
+ENTITY_REPLACEMENTS = {'&ExponentialE;': 'e', '&dd;': 'd', '&ImaginaryI;': 'i'}
+
+
+def to_mathml_core(markup):
+    """mfenced לא נתמך ב-MathML Core (Chrome) - ממירים לסוגריים מפורשים"""
+    for entity, replacement in ENTITY_REPLACEMENTS.items():
+        markup = markup.replace(entity, replacement)
+
+    closers = []
+
+    def replace(match):
+        if match.group(0) == '</mfenced>':
+            return f'<mo>{closers.pop()}</mo></mrow>'
+        attrs = dict(ATTR_RE.findall(match.group('attrs')))
+        closers.append(attrs.get('close', ')'))
+        return f'<mrow><mo>{attrs.get("open", "(")}</mo>'
+
+    return MFENCED_RE.sub(replace, markup)
+
+
+class MathRenderer:
+    """LaTeX + MathML מוכן מראש לכל ביטוי, שמור לפי טביעת הביטוי
+
+    המחוללים מקבלים את ה-LaTeX דרך tex()/function()/integral()/limit(), וכל קטע
+    שנבנה כך נרשם עם ה-MathML שלו. render() ממיר טקסט של שאלה/תשובה ל-MathML
+    רק אם כל קטעי ה-LaTeX בו מוכרים - אחרת הדפדפן ממשיך עם MathJax.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = env_flag('CALCMASTER_MATHML') if enabled is None else enabled
+        self._by_expr = {}
+        self._by_latex = {}
+        self._lock = threading.Lock()
+
+    def _register(self, latex_str, mathml_str):
+        with self._lock:
+            self._by_latex[latex_str] = mathml_str
+        return latex_str
+
+    def _render_expr(self, expr):
+        """(latex, mathml) לביטוי - מחושב פעם אחת לכל ביטוי"""
+        cached = self._by_expr.get(expr)
+        if cached is not None:
+            metrics.cache_hit('mathml')
+            return cached
+        metrics.cache_miss('mathml')
+        rendered = (latex(expr), to_mathml_core(mathml(expr, printer='presentation')))
+        with self._lock:
+            self._by_expr[expr] = rendered
+        return rendered
+
+    def tex(self, expr):
+        if not self.enabled:
+            return latex(expr)
+        return self._register(*self._render_expr(expr))
+
+    def plus_constant(self, expr):
+        """'F(x) + C' - תשובה לאינטגרל לא מסוים"""
+        if not self.enabled:
+            return f"{latex(expr)} + C"
+        tex, markup = self._render_expr(expr)
+        return self._register(f"{tex} + C", f'<mrow>{markup}<mo>+</mo><mi>C</mi></mrow>')
+
+    def function(self, expr, name='f'):
+        """'f(x) = ...' - כמו בטקסט השאלות"""
+        if not self.enabled:
+            return f"{name}(x) = {latex(expr)}"
+        tex, markup = self._render_expr(expr)
+        return self._register(f"{name}(x) = {tex}",
+                              f'<mrow><mi>{name}</mi><mo>(</mo><mi>x</mi><mo>)</mo><mo>=</mo>{markup}</mrow>')
+
+    def integral(self, expr):
+        """'\\int ... \\, dx'"""
+        if not self.enabled:
+            return f"\\int {latex(expr)} \\, dx"
+        tex, markup = self._render_expr(expr)
+        return self._register(f"\\int {tex} \\, dx",
+                              f'<mrow><mo>&#x222B;</mo>{markup}<mspace width="0.167em"/><mo>d</mo><mi>x</mi></mrow>')
+
+    def definite_integral(self, expr, lower, upper):
+        """'\\int_{a}^{b} ... \\, dx'"""
+        bounds = f"_{{{latex(lower)}}}^{{{latex(upper)}}}"
+        if not self.enabled:
+            return f"\\int{bounds} {latex(expr)} \\, dx"
+        tex, markup = self._render_expr(expr)
+        _, lower_markup = self._render_expr(lower)
+        _, upper_markup = self._render_expr(upper)
+        return self._register(f"\\int{bounds} {tex} \\, dx",
+                              f'<mrow><msubsup><mo>&#x222B;</mo>{lower_markup}{upper_markup}</msubsup>{markup}'
+                              f'<mspace width="0.167em"/><mo>d</mo><mi>x</mi></mrow>')
+
+    def limit(self, expr, point, dir='+-'):
+        """'\\lim_{x \\to a} ...', עם a^{+} / a^{-} לגבול חד-צדדי"""
+        point_tex = "\\infty" if point == oo else str(point)
+        side = '' if dir == '+-' else dir
+        if side:
+            point_tex = f"{point_tex}^{{{side}}}"
+        if not self.enabled:
+            return f"\\lim_{{x \\to {point_tex}}} {latex(expr)}"
+        tex, markup = self._render_expr(expr)
+        _, point_markup = self._render_expr(point)
+        if side:
+            point_markup = f'<msup>{point_markup}<mo>{side}</mo></msup>'
+        return self._register(f"\\lim_{{x \\to {point_tex}}} {tex}",
+                              f'<mrow><munder><mi>lim</mi><mrow><mi>x</mi><mo>&#x2192;</mo>{point_markup}</mrow>'
+                              f'</munder>{markup}</mrow>')
+
+    def render(self, text):
+        """טקסט עם כל קטעי ה-LaTeX מוחלפים ב-<math>, או None אם יש קטע לא מוכר"""
+        if not isinstance(text, str):
+            return None
+        missing = False
+
+        def replace(match):
+            nonlocal missing
+            markup = self._by_latex.get(match.group(1))
+            if markup is None:
+                missing = True
+                return match.group(0)
+            return f'<math xmlns="{MATHML_NS}">{markup}</math>'
+
+        rendered = INLINE_MATH_RE.sub(replace, text)
+        return None if missing else rendered
+
+    def render_question(self, question_text, options):
+        return {
+            'question': self.render(question_text),
+            'options': [self.render(option) for option in options],
+        }
+
+    def clear(self):
+        with self._lock:
+            self._by_expr.clear()
+            self._by_latex.clear()
+
+    def after_fork(self):
+        """נעילה חדשה בתהליך בן - זו שהועתקה אולי הוחזקה ברגע ה-fork"""
+        self._lock = threading.Lock()
+
+
+math_renderer = MathRenderer()
@@ -0,0 +1,95 @@
+import math
+
+# ברירות מחדל לסריקה: מספר נקודות ברשת ודיוק הליטוש
+GRID_SAMPLES = 512
+TOLERANCE = 1e-12
+
+
+def _value(f, t):
+    """f(t), או None כשהיא לא מוגדרת בנקודה"""
+    try:
+        value = f(t)
+    except (ValueError, ZeroDivisionError, OverflowError):
+        return None
+    if isinstance(value, complex) or not math.isfinite(value):
+        return None
+    return value
+
+
+def brent(f, a, b, fa=None, fb=None, tol=TOLERANCE, max_iter=100):
+    """שורש של f ב-[a, b] בשיטת Brent (חצייה + סקנט + אינטרפולציה ריבועית); f(a), f(b) בסימנים הפוכים"""
+    fa = f(a) if fa is None else fa
+    fb = f(b) if fb is None else fb
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if fa * fb > 0:
+        raise ValueError("root is not bracketed")
+
+    # b - הקירוב הנוכחי, a - הקודם, c - הקצה שסוגר איתו את השורש
+    c, fc = b, fb
+    d = e = b - a
+    for _ in range(max_iter):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, fa = b, fb
+            b, fb = c, fc
+            c, fc = a, fa
+        step_tol = 2 * 2.2e-16 * abs(b) + tol / 2
+        middle = (c - b) / 2
+        if abs(middle) <= step_tol or fb == 0:
+            return b
+
+        if abs(e) >= step_tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # סקנט
+                p, q = 2 * middle * s, 1 - s
+            else:
+                # אינטרפולציה ריבועית הפוכה
+                q, r = fa / fc, fb / fc
+                p = s * (2 * middle * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * middle * q - abs(step_tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = middle
+        else:
+            d = e = middle
+
+        a, fa = b, fb
+        b += d if abs(d) > step_tol else math.copysign(step_tol, middle)
+        fb = f(b)
+    return b
+
+
+def find_roots(f, a, b, samples=GRID_SAMPLES, tol=TOLERANCE):
+    """כל השורשים של f בקטע [a, b] שנתפסים בסריקת רשת: החלפת סימן בין נקודות סמוכות
+    מלוטשת ב-Brent, ואפס מדויק בנקודת רשת נלקח כמו שהוא. שורשים כפולים (בלי
+    החלפת סימן) ושורשים צפופים מרווח הרשת עלולים להתפספס.
+    """
+    step = (b - a) / samples
+    grid = [a + i * step for i in range(samples)] + [b]
+    values = [_value(f, t) for t in grid]
+
+    roots = []
+    for (left, f_left), (right, f_right) in zip(zip(grid, values), zip(grid[1:], values[1:])):
+        if f_left is None or f_right is None:
+            continue
+        if f_left == 0:
+            root = left
+        elif f_left * f_right < 0:
+            root = brent(f, left, right, f_left, f_right, tol=tol)
+        else:
+            continue
+        if not roots or root - roots[-1] > tol * 10:
+            roots.append(root)
+    if values[-1] == 0 and (not roots or b - roots[-1] > tol * 10):
+        roots.append(b)
+    return roots
@@ -0,0 +1,70 @@
+from collections import namedtuple
+from sympy import Poly, roots
+from sympy.polys.polyerrors import PolynomialError
+import logging
+
+logger = logging.getLogger(__name__)
+
+MINIMUM = 'min'
+MAXIMUM = 'max'
+INFLECTION = 'inflection'
+
+KIND_NAMES = {
+    MINIMUM: 'מינימום',
+    MAXIMUM: 'מקסימום',
+    INFLECTION: 'נקודת פיתול',
+}
+
+# נקודה קריטית מסווגת: x, הערך f(x) והסוג (מינימום/מקסימום/פיתול)
+CriticalPoint = namedtuple('CriticalPoint', 'x value kind')
+
+# ניתוח פולינום: הנגזרת (ביטוי), הנקודות הקריטיות הממשיות ממוינות, ומקדמי f מהחזקה הגבוהה
+PolynomialAnalysis = namedtuple('PolynomialAnalysis', 'derivative points coeffs')
+
+
+def _classify(derivatives, point):
+    """מבחן הנגזרת השנייה; כשהיא מתאפסת - הנגזרת הראשונה שלא מתאפסת קובעת"""
+    for order, derivative in enumerate(derivatives, start=2):
+        value = derivative.eval(point)
+        if value == 0:
+            continue
+        if order % 2:
+            return INFLECTION
+        return MINIMUM if value.is_positive else MAXIMUM
+    return None
+
+
+def analyze_polynomial(func, x):
+    """נקודות קריטיות של פולינום במקדמים רציונליים בלי solve, או None כשזה לא פולינום כזה
+
+    הפונקציה נשמרת כמערך מקדמים (Poly), הנגזרת נגזרת ישירות על המקדמים ו-roots
+    מוצא את שורשיה בנוסחאות סגורות. אם roots לא מצא את כל השורשים או שלא ברור
+    אם שורש ממשי - מחזירים None והקורא חוזר למסלול הכללי.
+    """
+    try:
+        poly = Poly(func, x)
+    except PolynomialError:
+        return None
+    if poly.degree() < 1 or not (poly.domain.is_ZZ or poly.domain.is_QQ):
+        return None
+
+    first = poly.diff(x)
+    if first.is_zero:
+        return None
+    derivatives = [first.diff(x)]
+    while not derivatives[-1].is_zero:
+        derivatives.append(derivatives[-1].diff(x))
+
+    found = roots(first)
+    if sum(found.values()) < first.degree():
+        return None
+    if any(root.is_real is None for root in found):
+        return None
+
+    points = []
+    for root in sorted((root for root in found if root.is_real), key=float):
+        kind = _classify(derivatives, root)
+        if kind is None:
+            return None
+        points.append(CriticalPoint(root, poly.eval(root), kind))
+    return PolynomialAnalysis(first.as_expr(), points, poly.all_coeffs())
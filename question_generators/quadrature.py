@@ -0,0 +1,18 @@
+import math
+
+# מספר הקטעים בכלל סימפסון - שגיאה בסדר h^4, מספיק לבדיקה של אינטגרנדים חלקים
+SIMPSON_PANELS = 256
+
+
+def simpson(f, a, b, panels=SIMPSON_PANELS):
+    """אינטגרל מסוים של f מ-a עד b בכלל סימפסון המורכב - כל הנקודות מחושבות במעבר אחד"""
+    if panels % 2:
+        panels += 1
+    h = (b - a) / panels
+    values = [f(a + i * h) for i in range(panels + 1)]
+    return h / 3 * (values[0] + values[-1] + 4 * math.fsum(values[1:-1:2]) + 2 * math.fsum(values[2:-1:2]))
+
+
+def agrees(exact, numeric, tolerance=1e-6):
+    """האם הערך הסגור תואם לחישוב הנומרי - סטייה יחסית (או מוחלטת ליד 0)"""
+    return abs(exact - numeric) <= tolerance * max(1.0, abs(exact))
@@ -0,0 +1,73 @@
+import secrets
+import time
+
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+from metrics import metrics
+
+PACK_MAX_AGE = 14 * 24 * 3600
+MAX_PACK_QUIZZES = 20
+QUESTIONS_PER_QUIZ = 10
+PACK_TOPICS = ('derivatives', 'integrals', 'limits', 'criticalpoints', 'general')
+PACK_DIFFICULTIES = ('easy', 'medium', 'hard', 'mixed')
+
+
+class QuizPacks:
+    """חבילות של מבחנים מוכנים מראש לתרגול בלי חיבור
+
+    הטוקן החתום מזהה את החבילה ואת המשתמש, כך שתוצאות שמסונכרנות אחר כך
+    ניתנות לשיוך לחבילה אמיתית שהשרת הנפיק.
+    """
+
+    def __init__(self, secret_key, generation_pool, max_age=PACK_MAX_AGE):
+        self.generation_pool = generation_pool
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='calcmaster-quiz-pack')
+
+    def _build_quiz(self, topic, difficulty):
+        """מבחן אחד - כמו ב-API: 15 שאלות, בלי כפילויות, 10 ראשונות"""
+        quiz = []
+        seen = set()
+        for question in self.generation_pool.generate(topic, difficulty, QUESTIONS_PER_QUIZ + 5):
+            if not question or not question.get('question') or question['question'] in seen:
+                continue
+            seen.add(question['question'])
+            quiz.append(question)
+        return quiz[:QUESTIONS_PER_QUIZ]
+
+    def build(self, user_id, topic, difficulty, quizzes):
+        if topic not in PACK_TOPICS or difficulty not in PACK_DIFFICULTIES:
+            raise ValueError(f"Unknown topic/difficulty: {topic}/{difficulty}")
+        quizzes = max(1, min(int(quizzes), MAX_PACK_QUIZZES))
+
+        with metrics.timer('calcmaster_generation_stage_seconds', generator='app', stage='quiz_pack'):
+            pack_quizzes = [self._build_quiz(topic, difficulty) for _ in range(quizzes)]
+
+        pack_id = secrets.token_urlsafe(12)
+        created_at = int(time.time())
+        return {
+            'pack_id': pack_id,
+            'user_id': user_id,
+            'token': self._serializer.dumps({
+                'pack_id': pack_id,
+                'user_id': user_id,
+                'topic': topic,
+                'difficulty': difficulty,
+                'quizzes': quizzes,
+            }),
+            'topic': topic,
+            'difficulty': difficulty,
+            'created_at': created_at,
+            'expires_at': created_at + self.max_age,
+            'quizzes': pack_quizzes,
+        }
+
+    def verify(self, token, user_id):
+        """פרטי החבילה, או None אם הטוקן לא חתום כראוי, פג תוקפו או שייך למשתמש אחר"""
+        try:
+            claims = self._serializer.loads(token, max_age=self.max_age)
+        except (BadSignature, SignatureExpired):
+            return None
+        if claims.get('user_id') != user_id:
+            return None
+        return claims
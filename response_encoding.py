@@ -0,0 +1,101 @@
+import gzip
+import json
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from metrics import metrics, env_flag
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# תשובות קטנות מזה לא שוות את זמן הדחיסה
+COMPRESS_MIN_BYTES = 512
+COMPRESSIBLE_PREFIXES = ('/api/questions', '/api/stats')
+SIZE_BUCKETS = (256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+
+metrics.describe('calcmaster_response_bytes', 'JSON response body size, before (identity) and after compression')
+metrics.set_buckets('calcmaster_response_bytes', SIZE_BUCKETS)
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """JSON קומפקטי ב-UTF-8 גם ב-debug - עברית בלי \\uXXXX, ו-orjson כשהוא מותקן"""
+
+    ensure_ascii = False
+    compact = True
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj), mimetype=self.mimetype)
+
+    def encode(self, obj):
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default,
+                                    option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass  # למשל מספר שלם גדול מ-64 ביט - ה-json הרגיל מטפל בזה
+        return json.dumps(obj, default=self.default, ensure_ascii=False, sort_keys=self.sort_keys,
+                          separators=(',', ':')).encode('utf-8')
+
+
+def negotiate_encoding(accept_encodings):
+    """בחירת קידוד לפי Accept-Encoding - brotli עדיף כשהספרייה מותקנת"""
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+class ResponseCompressor:
+    """דחיסת gzip/brotli לתשובות ה-JSON של השאלות והסטטיסטיקות (after_request)"""
+
+    def __init__(self, app=None, min_size=COMPRESS_MIN_BYTES, gzip_level=6, brotli_quality=5,
+                 prefixes=COMPRESSIBLE_PREFIXES):
+        self.enabled = env_flag('CALCMASTER_COMPRESSION', True)
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.prefixes = prefixes
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress)
+
+    def compress(self, response):
+        if (not request.path.startswith(self.prefixes) or response.status_code != 200
+                or response.mimetype != 'application/json' or response.direct_passthrough
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        data = response.get_data()
+        endpoint = request.endpoint or 'unknown'
+        metrics.observe('calcmaster_response_bytes', len(data), endpoint=endpoint, encoding='identity')
+        response.vary.add('Accept-Encoding')
+
+        encoding = negotiate_encoding(request.accept_encodings) if self.enabled else None
+        if encoding is None or len(data) < self.min_size:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.gzip_level)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        metrics.observe('calcmaster_response_bytes', len(compressed), endpoint=endpoint, encoding=encoding)
+
+        # אותו ETag לשני הייצוגים - מותר רק כ-weak
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
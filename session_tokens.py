@@ -0,0 +1,42 @@
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+import os
+
+SESSION_MAX_AGE = 30 * 24 * 3600  # כמו ב-create_session
+
+# הסוד שמופיע בקוד (app.secret_key) - ידוע לכולם ולכן אסור לחתום בו טוקנים
+INSECURE_DEFAULT_SECRET = 'your-secret-key-change-this-in-production'
+
+
+def signing_secret():
+    """CALCMASTER_SESSION_SECRET, או None כשהוא חסר או שווה לסוד שבקוד"""
+    secret = os.environ.get('CALCMASTER_SESSION_SECRET', '').strip()
+    if not secret or secret == INSECURE_DEFAULT_SECRET:
+        return None
+    return secret
+
+
+class StatelessSessionTokens:
+    """טוקני session חתומים שנושאים את פרטי המשתמש - בלי חיפוש בטבלת user_sessions
+
+    הטוקן תקף עד שפג תוקפו: התנתקות מוחקת אותו מה-cookie בלבד, ושינוי
+    בפרטי המשתמש (או השבתתו) ייכנס לתוקף רק בהתחברות הבאה.
+    """
+
+    def __init__(self, secret_key, max_age=SESSION_MAX_AGE):
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='calcmaster-session')
+
+    def issue(self, user):
+        return self._serializer.dumps({
+            'id': user['id'],
+            'username': user['username'],
+            'email': user['email'],
+            'display_name': user['display_name'],
+        })
+
+    def load(self, token):
+        """מחזיר את פרטי המשתמש, או None אם הטוקן לא חתום כראוי או שפג תוקפו"""
+        try:
+            return self._serializer.loads(token, max_age=self.max_age)
+        except (BadSignature, SignatureExpired):
+            return None
@@ -65,6 +65,7 @@ def recreate_database():
             email TEXT UNIQUE NOT NULL,
             password_hash TEXT NOT NULL,
             salt TEXT NOT NULL,
+            hash_scheme TEXT DEFAULT 'pbkdf2_sha256$100000',
             display_name TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             last_login TIMESTAMP,
@@ -96,6 +97,7 @@ def recreate_database():
             total_questions INTEGER DEFAULT 0,
             total_correct INTEGER DEFAULT 0,
             average_score REAL DEFAULT 0,
+            result_version INTEGER DEFAULT 0,
             last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
@@ -0,0 +1,81 @@
+// תרגול בלי חיבור: רישום ה-Service Worker, הורדת חבילות מבחנים וסנכרון תוצאות
+
+// החבילות ותור התוצאות שייכים למשתמש המחובר - מזהה אותו מול השרת לפני שניגשים אליהם
+async function registerOfflineSupport() {
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js')
+            .catch(err => console.warn('רישום Service Worker נכשל:', err));
+    }
+    if (typeof indexedDB === 'undefined') return;
+    window.addEventListener('online', syncOfflineResults);
+    if (navigator.onLine) {
+        await identifyOfflineUser();
+        syncOfflineResults();
+    }
+}
+
+async function identifyOfflineUser() {
+    try {
+        const response = await fetch('/api/auth/me');
+        if (response.ok) {
+            const body = await response.json();
+            await OfflineStore.setCurrentUser(body.user.id);
+        } else if (response.status === 401) {
+            await OfflineStore.clearAll();
+        }
+    } catch (err) {
+        // בלי חיבור נשאר המשתמש האחרון שזוהה
+        console.warn('זיהוי המשתמש לתרגול אופליין נכשל:', err);
+    }
+}
+
+async function syncOfflineResults() {
+    if (typeof indexedDB === 'undefined') return;
+    try {
+        const { synced, rejected } = await OfflineStore.flushResults();
+        if (synced) {
+            console.log(`✅ סונכרנו ${synced} תוצאות שנשמרו בלי חיבור`);
+        }
+        if (rejected) {
+            console.warn(`⚠️ ${rejected} תוצאות שנשמרו בלי חיבור נדחו בשרת:`,
+                await OfflineStore.rejectedResults());
+        }
+    } catch (err) {
+        console.warn('סנכרון תוצאות נכשל:', err);
+    }
+}
+
+// apiUrl הוא הכתובת שממנה השאלון טוען שאלות - ה-Service Worker מגיש ממנה את החבילה כשאין חיבור
+async function downloadQuizPack(apiUrl, topic, difficulty, quizzes = 5) {
+    const response = await fetch(`/api/questions/pack/${topic}/${difficulty}?quizzes=${quizzes}`);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const pack = await response.json();
+    await OfflineStore.savePack(apiUrl, pack);
+    return OfflineStore.countQuizzes(apiUrl);
+}
+
+function setupOfflinePackButton(apiUrl, topic, difficulty) {
+    const button = document.getElementById('offline-pack-btn');
+    const status = document.getElementById('offline-pack-status');
+    if (!button || typeof indexedDB === 'undefined') return;
+
+    const showCount = count => {
+        status.textContent = count ? `💾 ${count} מבחנים שמורים לתרגול בלי חיבור` : '';
+    };
+
+    button.style.display = 'inline-block';
+    OfflineStore.countQuizzes(apiUrl).then(showCount).catch(() => {});
+
+    button.addEventListener('click', async () => {
+        button.disabled = true;
+        status.textContent = '⏳ מכין חבילת מבחנים...';
+        try {
+            showCount(await downloadQuizPack(apiUrl, topic, difficulty));
+        } catch (err) {
+            console.error('❌ שגיאה בהורדת חבילה:', err);
+            status.textContent = '❌ ההורדה נכשלה, נסה שוב';
+        } finally {
+            button.disabled = false;
+        }
+    });
+}
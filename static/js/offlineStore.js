@@ -0,0 +1,192 @@
+// אחסון IndexedDB לחבילות מבחנים ולתוצאות שעוד לא סונכרנו - משותף לדף ול-Service Worker
+
+const OfflineStore = (() => {
+    const DB_NAME = 'calcmaster-offline';
+    // v2: חבילות ותוצאות נשמרות עם המשתמש שלהן. רשומות v1 בלי משתמש נמחקות -
+    // אי אפשר לדעת למי הן שייכות
+    const DB_VERSION = 2;
+    const SYNC_BATCH_SIZE = 100;  // כמו MAX_SYNC_BATCH בשרת
+    const STORES = ['quizzes', 'outbox', 'rejected', 'meta'];
+    let dbPromise = null;
+
+    function openDb() {
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                const request = indexedDB.open(DB_NAME, DB_VERSION);
+                request.onupgradeneeded = () => {
+                    const db = request.result;
+                    Array.from(db.objectStoreNames).forEach(name => db.deleteObjectStore(name));
+                    const quizzes = db.createObjectStore('quizzes', { keyPath: 'id', autoIncrement: true });
+                    quizzes.createIndex('user_url', ['user_id', 'url']);
+                    const outbox = db.createObjectStore('outbox', { keyPath: 'id', autoIncrement: true });
+                    outbox.createIndex('user_id', 'user_id');
+                    // תוצאות שהשרת דחה בסנכרון - נשמרות לדיווח ולא נשלחות שוב
+                    const rejected = db.createObjectStore('rejected', { keyPath: 'id' });
+                    rejected.createIndex('user_id', 'user_id');
+                    db.createObjectStore('meta');
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+        }
+        return dbPromise;
+    }
+
+    // מריץ פעולות על store בטרנזקציה אחת; מחזיר את מה ש-work שם ב-result.value.
+    // עם רשימת stores, work מקבל את הטרנזקציה עצמה
+    async function transaction(storeName, mode, work) {
+        const db = await openDb();
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(storeName, mode);
+            const result = {};
+            work(Array.isArray(storeName) ? tx : tx.objectStore(storeName), result);
+            tx.oncomplete = () => resolve(result.value);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    }
+
+
+    // המשתמש המחובר לפי הדף האחרון שנטען עם חיבור - ה-Service Worker קורא אותו מכאן
+    function setCurrentUser(userId) {
+        return transaction('meta', 'readwrite', store => {
+            store.put(userId, 'current_user');
+        });
+    }
+
+    function currentUser() {
+        return transaction('meta', 'readonly', (store, result) => {
+            store.get('current_user').onsuccess = event => {
+                result.value = event.target.result ?? null;
+            };
+        });
+    }
+
+    // ביציאה מהחשבון: חבילות, תור התוצאות והמשתמש הנוכחי נמחקים
+    function clearAll() {
+        return transaction(STORES, 'readwrite', tx => {
+            STORES.forEach(name => tx.objectStore(name).clear());
+        });
+    }
+
+    function savePack(url, pack) {
+        return transaction('quizzes', 'readwrite', (store, result) => {
+            pack.quizzes.forEach((questions, index) => {
+                store.add({
+                    user_id: pack.user_id,
+                    url,
+                    pack_id: pack.pack_id,
+                    pack_token: pack.token,
+                    quiz_index: index,
+                    expires_at: pack.expires_at,
+                    questions
+                });
+            });
+            result.value = pack.quizzes.length;
+        });
+    }
+
+    // שולף (ומוחק) את המבחן הבא של המשתמש הנוכחי שעוד בתוקף לכתובת; מבחנים שפג תוקפם נמחקים בדרך
+    async function takeQuiz(url) {
+        const userId = await currentUser();
+        if (userId === null) return undefined;
+        const now = Date.now() / 1000;
+        return transaction('quizzes', 'readwrite', (store, result) => {
+            store.index('user_url').openCursor(IDBKeyRange.only([userId, url])).onsuccess = event => {
+                const cursor = event.target.result;
+                if (!cursor) return;
+                const quiz = cursor.value;
+                cursor.delete();
+                if (quiz.expires_at > now) {
+                    result.value = quiz;
+                } else {
+                    cursor.continue();
+                }
+            };
+        });
+    }
+
+    async function countQuizzes(url) {
+        const userId = await currentUser();
+        if (userId === null) return 0;
+        return transaction('quizzes', 'readonly', (store, result) => {
+            store.index('user_url').count(IDBKeyRange.only([userId, url])).onsuccess = event => {
+                result.value = event.target.result;
+            };
+        });
+    }
+
+    // בלי משתמש ידוע אין למי לשייך את התוצאה - זורק, והקורא מחזיר שגיאה במקום "נשמר"
+    async function queueResult(payload) {
+        const userId = await currentUser();
+        if (userId === null) throw new Error('no current user');
+        return transaction('outbox', 'readwrite', store => {
+            store.add({ user_id: userId, payload, queued_at: Date.now() });
+        });
+    }
+
+    function pendingResults(userId) {
+        return transaction('outbox', 'readonly', (store, result) => {
+            store.index('user_id').getAll(IDBKeyRange.only(userId), SYNC_BATCH_SIZE).onsuccess = event => {
+                result.value = event.target.result;
+            };
+        });
+    }
+
+    // תוצאות שנשמרו יוצאות מהתור; תוצאות שנדחו עוברות ל-rejected עם סיבת הדחייה
+    function settleResults(pending, rejected) {
+        const errors = new Map(rejected.map(item => [item.index, item.error]));
+        return transaction(['outbox', 'rejected'], 'readwrite', tx => {
+            const outbox = tx.objectStore('outbox');
+            const rejectedStore = tx.objectStore('rejected');
+            pending.forEach((item, index) => {
+                outbox.delete(item.id);
+                if (errors.has(index)) {
+                    rejectedStore.put({ ...item, error: errors.get(index), rejected_at: Date.now() });
+                }
+            });
+        });
+    }
+
+    async function rejectedResults() {
+        const userId = await currentUser();
+        if (userId === null) return [];
+        return transaction('rejected', 'readonly', (store, result) => {
+            store.index('user_id').getAll(IDBKeyRange.only(userId)).onsuccess = event => {
+                result.value = event.target.result;
+            };
+        });
+    }
+
+    // שליחת התוצאות של המשתמש הנוכחי ב-batch ל-/api/save-result; מחזיר כמה נשמרו וכמה נדחו.
+    // השרת מסרב (409) אם המשתמש המחובר אינו המשתמש ששמר את התוצאות
+    async function flushResults() {
+        const counts = { synced: 0, rejected: 0 };
+        const userId = await currentUser();
+        if (userId === null) return counts;
+        for (;;) {
+            const pending = await pendingResults(userId);
+            if (!pending || pending.length === 0) return counts;
+
+            const response = await fetch('/api/save-result', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ user_id: userId, results: pending.map(item => item.payload) })
+            });
+            // 401/409/הפניה להתחברות או שגיאת שרת - ננסה שוב בסנכרון הבא
+            if (!response.ok || response.redirected) return counts;
+
+            const body = await response.json();
+            const rejected = body.rejected || [];
+            rejected.forEach(item => console.warn('תוצאה נדחתה בסנכרון:', item));
+            await settleResults(pending, rejected);
+            counts.synced += pending.length - rejected.length;
+            counts.rejected += rejected.length;
+        }
+    }
+
+    return {
+        setCurrentUser, currentUser, clearAll, savePack, takeQuiz, countQuizzes,
+        queueResult, flushResults, rejectedResults
+    };
+})();
@@ -7,7 +7,117 @@ let quizStartTime = null;
 let currentTopic = null;
 let currentDifficulty = null;
 
+// MathML שהוכן בשרת (CALCMASTER_MATHML) מוצג ישירות, בלי typesetting של MathJax
+const supportsMathML = typeof window !== 'undefined' && 'MathMLElement' in window;
+
+function displayMath(question, text) {
+    if (!supportsMathML || !question.mathml) return text;
+    if (text === question.question) return question.mathml.question || text;
+    const index = question.options.indexOf(text);
+    return (index >= 0 && question.mathml.options[index]) || text;
+}
+
+// MathJax רק על האלמנטים שנשאר בהם LaTeX שלא הומר מראש
+function typesetIfNeeded(element) {
+    if (!window.MathJax || !MathJax.typesetPromise) return;
+    const hasTex = el => el.textContent.includes('\\(') || el.textContent.includes('\\[');
+    if (!hasTex(element)) return;
+
+    const targets = Array.from(element.querySelectorAll(
+        '.question-text, .option-text, .math-expression, .explanation-text'
+    )).filter(hasTex);
+    MathJax.typesetPromise(targets.length ? targets : [element]);
+}
+
+// === טעינה מוקדמת של המבחן הבא ===
+
+const PREFETCH_TTL_MS = 10 * 60 * 1000;  // כמו תוקף ההזמנה בשרת
+const PREFETCH_STORAGE_PREFIX = 'calcmaster:nextQuiz:';
+const prefetchedQuizzes = {};
+let currentApiUrl = null;
+let currentContainerId = null;
+let currentPackToken = null;  // מבחן מחבילת אופליין - נשלח עם התוצאה לאימות בשרת
+
+function whenIdle(callback) {
+    if ('requestIdleCallback' in window) {
+        requestIdleCallback(callback, { timeout: 5000 });
+    } else {
+        setTimeout(callback, 1000);
+    }
+}
+
+function storePrefetchedQuiz(apiUrl, data) {
+    const entry = { data, expires: Date.now() + PREFETCH_TTL_MS };
+    prefetchedQuizzes[apiUrl] = entry;
+    try {
+        sessionStorage.setItem(PREFETCH_STORAGE_PREFIX + apiUrl, JSON.stringify(entry));
+    } catch (err) {
+        // sessionStorage מלא או חסום - נשאר רק בזיכרון
+    }
+}
+
+function takePrefetchedQuiz(apiUrl) {
+    let entry = prefetchedQuizzes[apiUrl];
+    delete prefetchedQuizzes[apiUrl];
+    try {
+        const stored = sessionStorage.getItem(PREFETCH_STORAGE_PREFIX + apiUrl);
+        sessionStorage.removeItem(PREFETCH_STORAGE_PREFIX + apiUrl);
+        if (!entry && stored) entry = JSON.parse(stored);
+    } catch (err) {
+        // מתעלמים - פשוט נטען מהשרת
+    }
+    if (!entry || entry.expires < Date.now()) return null;
+    return entry.data;
+}
+
+function canPrefetch(apiUrl) {
+    // מבחן אישי תלוי בתוצאה של המבחן הנוכחי
+    return apiUrl && identifyTopicFromUrl(apiUrl) !== 'personalized';
+}
+
+// בזמן המבחן: קריאה זולה שמבקשת מהשרת ליצור את המבחן הבא ברקע
+function reserveNextQuiz(apiUrl) {
+    if (!canPrefetch(apiUrl)) return;
+    whenIdle(() => {
+        fetch('/api/questions/reserve', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ url: apiUrl })
+        }).catch(() => {});
+    });
+}
+
+// בסיום: מורידים את המבחן שכבר מוכן בשרת, כך ש"שאלון חדש" נפתח מיד
+function prefetchNextQuiz(apiUrl) {
+    if (!canPrefetch(apiUrl) || prefetchedQuizzes[apiUrl]) return;
+    whenIdle(async () => {
+        try {
+            const response = await fetch(apiUrl);
+            if (!response.ok) return;
+            storePrefetchedQuiz(apiUrl, await response.json());
+        } catch (err) {
+            console.warn('שגיאה בטעינה מוקדמת של המבחן הבא:', err);
+        }
+    });
+}
+
+function startNextQuiz() {
+    if (currentContainerId && currentApiUrl) {
+        populateQuizFromApi(currentContainerId, currentApiUrl);
+    } else {
+        location.reload();
+    }
+}
+
+// מזהה ייחודי לתוצאה - השרת מתעלם משליחה חוזרת שלה (סנכרון אופליין)
+function newClientResultId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
 async function populateQuizFromApi(containerId, apiUrl) {
+    currentContainerId = containerId;
+    currentApiUrl = apiUrl;
     const container = document.getElementById(containerId);
     container.innerHTML = `
     <div class="loading-wrapper">
@@ -21,12 +131,17 @@ async function populateQuizFromApi(containerId, apiUrl) {
     currentDifficulty = identifyDifficultyFromUrl(apiUrl);
 
     try {
-        const response = await fetch(apiUrl);
-        if (!response.ok) throw new Error(`HTTP ${response.status}`);
-        const responseData = await response.json();
+        let responseData = takePrefetchedQuiz(apiUrl);
+        if (!responseData) {
+            const response = await fetch(apiUrl);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            responseData = await response.json();
+        }
 
+        currentPackToken = null;
         if (responseData.questions && responseData.quiz_info) {
             questions = responseData.questions;
+            currentPackToken = responseData.quiz_info.pack_token || null;
             const descElement = document.getElementById('topic-description');
             if (descElement && responseData.quiz_info.explanation) {
                 descElement.textContent = responseData.quiz_info.explanation;
@@ -56,6 +171,7 @@ async function populateQuizFromApi(containerId, apiUrl) {
         correctCount = 0;
 
         showCurrentQuestion(container);
+        reserveNextQuiz(apiUrl);
     } catch (err) {
         container.innerHTML = `
             <div class="error">
@@ -110,12 +226,12 @@ function showCurrentQuestion(container) {
             </div>
 
             <div class="question-container">
-                <h2 class="question-text">${question.question}</h2>
+                <h2 class="question-text">${displayMath(question, question.question)}</h2>
                 <div class="options-container">
                     ${question.options.map((option, index) => `
                         <button class="option-btn" onclick="selectAnswer(${index}, '${option.replace(/'/g, "&apos;")}')">
                             <span class="option-letter">${String.fromCharCode(65 + index)}</span>
-                            <span class="option-text">${option}</span>
+                            <span class="option-text">${displayMath(question, option)}</span>
                         </button>
                     `).join('')}
                 </div>
@@ -126,9 +242,7 @@ function showCurrentQuestion(container) {
         </div>
     `;
 
-    if (window.MathJax && MathJax.typesetPromise) {
-        MathJax.typesetPromise([container]);
-    }
+    typesetIfNeeded(container);
 }
 
 function cleanForComparison(text) {
@@ -166,7 +280,7 @@ feedback.innerHTML = `
         <div class="correct-answer highlighted-box">
             <div class="section-title">✔️ התשובה הנכונה:</div>
             <div class="explanation-text">
-                <span class="math-expression">${question.correct}</span>
+                <span class="math-expression">${displayMath(question, question.correct)}</span>
             </div>
         </div>
 
@@ -175,7 +289,7 @@ feedback.innerHTML = `
             <div class="highlighted-box">
                 <div class="section-title">🚫 מה בחרת:</div>
                 <div class="explanation-text">
-                    <span class="math-expression">${selectedOption}</span>
+                    <span class="math-expression">${displayMath(question, selectedOption)}</span>
                 </div>
             </div>
 
@@ -221,7 +335,7 @@ feedback.innerHTML = `
         </div>` : `
         <div class="highlighted-box success-explanation">
             <div class="section-title">✨ למה זה נכון:</div>
-            <div class="explanation-text">
+            <div class="explanation-text" id="success-explanation">
                 ${question.explanation || detailedAnalysis?.successReason || 'השתמשת בכלל הנכון וביצעת את החישוב בצורה מדויקת!'}
             </div>
         </div>`}
@@ -234,8 +348,28 @@ feedback.innerHTML = `
 
     feedback.classList.remove('hidden');
 
-    if (window.MathJax && MathJax.typesetPromise) {
-        MathJax.typesetPromise([feedback]);
+    typesetIfNeeded(feedback);
+
+    if (isCorrect && !question.explanation && question.explanation_id) {
+        loadDeferredExplanation(question);
+    }
+}
+
+// ההסבר נשלח בנפרד מהשאלה (explanations=lazy) - טוענים אותו רק כשצריך להציג
+async function loadDeferredExplanation(question) {
+    try {
+        const response = await fetch(`/api/questions/explanation/${question.explanation_id}`);
+        if (!response.ok) return;
+        const data = await response.json();
+        question.explanation = data.explanation;
+
+        const element = document.getElementById('success-explanation');
+        if (element && questions[currentQuestionIndex] === question) {
+            element.innerHTML = data.explanation;
+            typesetIfNeeded(element);
+        }
+    } catch (err) {
+        console.warn('שגיאה בטעינת הסבר:', err);
     }
 }
 
@@ -585,6 +719,7 @@ function showResults(container) {
     const percentage = Math.round((correctCount / totalQuestions) * 100);
 
     saveQuizResult(currentTopic, correctCount, totalQuestions, timeSpent, percentage);
+    prefetchNextQuiz(currentApiUrl);
 
     // הכנת ציון וחוות דעת
     let gradeInfo = getGradeInfo(percentage);
@@ -616,7 +751,7 @@ function showResults(container) {
             </div>`}
             
             <div class="result-actions">
-                <button onclick="location.reload()" class="restart-btn">שאלון חדש</button>
+                <button onclick="startNextQuiz()" class="restart-btn">שאלון חדש</button>
                 <button onclick="location.href='/'" class="home-btn">דף הבית</button>
                 <button onclick="location.href='/quiz_summary'" class="stats-btn">📊 הסטטיסטיקות שלי</button>
             </div>
@@ -682,12 +817,14 @@ async function saveQuizResult(topic, score, totalQuestions, timeSpent, percentag
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 topic, score, total_questions: totalQuestions, time_spent: timeSpent,
-                details: { percentage, difficulty: currentDifficulty || 'mixed', date: new Date().toISOString() }
+                details: { percentage, difficulty: currentDifficulty || 'mixed', date: new Date().toISOString() },
+                client_result_id: newClientResultId(),
+                pack_token: currentPackToken || undefined
             })
         });
         if (response.ok) {
             const result = await response.json();
-            console.log('✅ תוצאה נשמרה:', result);
+            console.log(result.queued ? '💾 אין חיבור - התוצאה תסונכרן בהמשך:' : '✅ תוצאה נשמרה:', result);
         } else {
             console.error('❌ שגיאה בשמירת תוצאה');
         }
@@ -730,6 +867,7 @@ function showResults(container) {
     const percentage = Math.round((correctCount / totalQuestions) * 100);
 
     saveQuizResult(currentTopic, correctCount, totalQuestions, timeSpent, percentage);
+    prefetchNextQuiz(currentApiUrl);
 
     // הכנת ציון וחוות דעת
     let gradeInfo = getGradeInfo(percentage);
@@ -761,7 +899,7 @@ function showResults(container) {
             </div>`}
             
             <div class="result-actions">
-                <button onclick="location.reload()" class="restart-btn">שאלון חדש</button>
+                <button onclick="startNextQuiz()" class="restart-btn">שאלון חדש</button>
                 <button onclick="location.href='/'" class="home-btn">דף הבית</button>
                 <button onclick="location.href='/quiz_summary'" class="stats-btn">📊 הסטטיסטיקות שלי</button>
             </div>
@@ -827,12 +965,14 @@ async function saveQuizResult(topic, score, totalQuestions, timeSpent, percentag
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 topic, score, total_questions: totalQuestions, time_spent: timeSpent,
-                details: { percentage, difficulty: currentDifficulty || 'mixed', date: new Date().toISOString() }
+                details: { percentage, difficulty: currentDifficulty || 'mixed', date: new Date().toISOString() },
+                client_result_id: newClientResultId(),
+                pack_token: currentPackToken || undefined
             })
         });
         if (response.ok) {
             const result = await response.json();
-            console.log('✅ תוצאה נשמרה:', result);
+            console.log(result.queued ? '💾 אין חיבור - התוצאה תסונכרן בהמשך:' : '✅ תוצאה נשמרה:', result);
         } else {
             console.error('❌ שגיאה בשמירת תוצאה');
         }
@@ -0,0 +1,155 @@
+// Service Worker: מעטפת האתר מה-cache, מבחנים מחבילות אופליין ותור תוצאות כשאין חיבור
+importScripts('/static/js/offlineStore.js');
+
+// v2: גרסה 1 שמרה גם דפים אישיים (בית, סיכום) - ה-activate מוחק אותה
+const SHELL_CACHE = 'calcmaster-shell-v2';
+const SHELL_ASSETS = [
+    '/static/js/quizEngine.js',
+    '/static/js/offlineStore.js',
+    '/static/js/offline.js',
+    '/static/css/stylestopics.css'
+];
+// דפים שנשמרים לשימוש בלי חיבור - רק כאלה שזהים לכל משתמש (הנתונים נטענים מה-API).
+// דפים עם פרטי המשתמש לא נשמרים, כדי שמשתמש אחר באותו דפדפן לא יקבל אותם
+const SHELL_PAGES = ['/quiz'];
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(SHELL_ASSETS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys
+                .filter(key => key.startsWith('calcmaster-shell-') && key !== SHELL_CACHE)
+                .map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+function jsonResponse(body, status) {
+    return new Response(JSON.stringify(body), {
+        status,
+        headers: { 'Content-Type': 'application/json' }
+    });
+}
+
+function isQuizRequest(url) {
+    const path = url.pathname;
+    return path.startsWith('/api/questions/')
+        && !path.startsWith('/api/questions/pack/')
+        && !path.startsWith('/api/questions/explanation/')
+        && path !== '/api/questions/reserve';
+}
+
+function isShellRequest(url) {
+    return url.pathname.startsWith('/static/') || SHELL_PAGES.includes(url.pathname);
+}
+
+// דף השאלון וקבצים סטטיים: קודם רשת (ועדכון ה-cache), בלי חיבור - מה-cache
+async function networkFirst(request) {
+    const cache = await caches.open(SHELL_CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok && !response.redirected) {
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (err) {
+        // דף השאלון זהה לכל נושא - הפרמטרים נקראים ב-JS
+        const cached = await cache.match(request, { ignoreSearch: request.mode === 'navigate' });
+        if (cached) return cached;
+        throw err;
+    }
+}
+
+// שאלות: קודם רשת, בלי חיבור - המבחן הבא מהחבילה השמורה לאותה כתובת
+async function quizFromNetworkOrPack(request, url) {
+    try {
+        return await fetch(request);
+    } catch (err) {
+        const quiz = await OfflineStore.takeQuiz(url.pathname);
+        if (!quiz) {
+            return jsonResponse({ error: 'אין חיבור לשרת ואין מבחנים שמורים לנושא הזה' }, 503);
+        }
+        return jsonResponse({
+            questions: quiz.questions,
+            quiz_info: {
+                quiz_type: 'offline',
+                pack_token: quiz.pack_token,
+                pack_quiz: quiz.quiz_index,
+                total_questions: quiz.questions.length
+            }
+        }, 200);
+    }
+}
+
+// שמירת תוצאה: בלי חיבור נכנסת לתור ב-IndexedDB ומסונכרנת ב-batch כשהחיבור חוזר
+async function saveResultOrQueue(request) {
+    const payload = await request.clone().json().catch(() => null);
+    if (!payload || Array.isArray(payload.results)) {
+        return fetch(request);  // סנכרון batch - לא נכנס שוב לתור
+    }
+
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            OfflineStore.flushResults().catch(() => {});
+        }
+        return response;
+    } catch (err) {
+        try {
+            await OfflineStore.queueResult(payload);
+        } catch (queueErr) {
+            return jsonResponse({ error: 'אין חיבור לשרת - התוצאה לא נשמרה' }, 503);
+        }
+        if (self.registration.sync) {
+            self.registration.sync.register('sync-results').catch(() => {});
+        }
+        return jsonResponse({
+            success: true,
+            queued: true,
+            message: 'אין חיבור - התוצאה תישמר כשהחיבור יחזור'
+        }, 202);
+    }
+}
+
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (url.origin !== self.location.origin) return;
+
+    // יציאה מהחשבון: החבילות ותור התוצאות של המשתמש לא נשארים בדפדפן
+    if (url.pathname === '/logout') {
+        event.waitUntil(OfflineStore.clearAll());
+        return;
+    }
+
+    if (event.request.method === 'POST' && url.pathname === '/api/save-result') {
+        event.respondWith(saveResultOrQueue(event.request));
+        return;
+    }
+    if (event.request.method !== 'GET') return;
+
+    if (isQuizRequest(url)) {
+        event.respondWith(quizFromNetworkOrPack(event.request, url));
+    } else if (isShellRequest(url)) {
+        event.respondWith(networkFirst(event.request));
+    }
+});
+
+// Background Sync (כשנתמך) והודעה מהדף כשהחיבור חוזר
+self.addEventListener('sync', event => {
+    if (event.tag === 'sync-results') {
+        event.waitUntil(OfflineStore.flushResults());
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data === 'sync-results') {
+        event.waitUntil(OfflineStore.flushResults());
+    }
+});
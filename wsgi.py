@@ -0,0 +1,16 @@
+import gc
+import os
+
+# מאחורי gunicorn היצירה רצה כברירת מחדל בתהליך נפרד לכל worker, כדי שבקשות
+# התחברות ושמירה לא ימתינו ל-SymPy; CALCMASTER_GENERATION_WORKERS=0 מבטל
+os.environ.setdefault('CALCMASTER_GENERATION_WORKERS', '1')
+
+from app import create_app
+
+# נקודת כניסה לייצור: gunicorn -c gunicorn.conf.py wsgi:application
+# עם preload_app הקובץ נטען פעם אחת בתהליך הראשי - המאגרים מחושבים כאן ועוברים
+# לכל ה-workers ב-fork (copy-on-write), ו-gunicorn.conf.py מפעיל את השירותים אחרי ה-fork
+application = create_app(warm_up=True, start_services=False)
+
+# האובייקטים שנבנו עד כאן לא ייסרקו ע"י ה-GC ב-workers - הדפים שלהם נשארים משותפים
+gc.freeze()